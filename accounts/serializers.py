@@ -1,7 +1,9 @@
+import re
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from telemetry.models import Project
+from telemetry.retention import MAX_RETENTION_DAYS, POLICIES
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -64,7 +66,7 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Project
-        fields = ('id', 'name', 'api_key', 'owner', 'owner_username', 'created_at')
+        fields = ('id', 'name', 'api_key', 'owner', 'owner_username', 'route_rules', 'retention_policies', 'created_at')
         read_only_fields = ('id', 'api_key', 'owner', 'created_at')
 
     def validate_name(self, value):
@@ -83,6 +85,38 @@ class ProjectSerializer(serializers.ModelSerializer):
         
         return value
 
+    def validate_route_rules(self, value):
+        """Validate that route rules are pattern/template pairs with valid regexes."""
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Route rules must be a list.")
+
+        for rule in value:
+            if not isinstance(rule, dict) or not rule.get('pattern') or not rule.get('template'):
+                raise serializers.ValidationError("Each rule needs a 'pattern' and a 'template'.")
+            try:
+                re.compile(rule['pattern'])
+            except re.error as e:
+                raise serializers.ValidationError(f"Invalid pattern {rule['pattern']!r}: {e}")
+
+        return value
+
+    def validate_retention_policies(self, value):
+        """Validate that retention overrides map known tables to a number of days."""
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Retention policies must be an object.")
+
+        for policy, days in value.items():
+            if policy not in POLICIES:
+                raise serializers.ValidationError(
+                    f"Unknown retention policy {policy!r}; expected one of {', '.join(POLICIES)}."
+                )
+            if not isinstance(days, int) or isinstance(days, bool) or not 1 <= days <= MAX_RETENTION_DAYS:
+                raise serializers.ValidationError(
+                    f"Retention for {policy!r} must be a whole number of days between 1 and {MAX_RETENTION_DAYS}."
+                )
+
+        return value
+
     def create(self, validated_data):
         """Create a new project for the authenticated user."""
         validated_data['owner'] = self.context['request'].user
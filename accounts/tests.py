@@ -1,3 +1,29 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from rest_framework import serializers
 
-# Create your tests here.
+from .serializers import ProjectSerializer
+
+
+class RouteRulesValidationTests(SimpleTestCase):
+
+    def validate(self, value):
+        return ProjectSerializer().validate_route_rules(value)
+
+    def test_accepts_pattern_template_pairs(self):
+        rules = [{'pattern': r'/files/.+', 'template': '/files/{path}'}]
+        self.assertEqual(self.validate(rules), rules)
+        self.assertEqual(self.validate([]), [])
+
+    def test_rejects_malformed_rules(self):
+        for value in (
+            {'pattern': r'/files/.+', 'template': '/files/{path}'},
+            [{'pattern': r'/files/.+'}],
+            [{'pattern': '', 'template': '/files/{path}'}],
+            ['/files/.+'],
+        ):
+            with self.subTest(value=value), self.assertRaises(serializers.ValidationError):
+                self.validate(value)
+
+    def test_rejects_invalid_patterns(self):
+        with self.assertRaisesMessage(serializers.ValidationError, "Invalid pattern '/files/('"):
+            self.validate([{'pattern': '/files/(', 'template': '/files/{path}'}])
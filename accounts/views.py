@@ -9,8 +9,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 from .serializers import RegisterSerializer, UserSerializer, ProjectSerializer
+from telemetry import api_keys, overview
 from telemetry.models import Project
 
 
@@ -212,13 +214,24 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """Return only projects owned by the authenticated user."""
         return Project.objects.filter(owner=self.request.user)
 
+    @action(detail=False)
+    def overview(self, request):
+        """
+        Health of every project the user owns: latest request rate, p95 and
+        error rate, plus error count and top error over the last 24 hours.
+        """
+        return Response(overview.for_owner(request.user, timezone.now()))
+
     @action(detail=True, methods=['post'])
     def regenerate_key(self, request, pk=None):
         """Regenerate API key for a project."""
         import uuid
         project = self.get_object()
+        old_key = project.api_key
         project.api_key = uuid.uuid4()
         project.save()
+        # The old key must stop authenticating right away, in every process.
+        api_keys.forget(old_key)
         
         serializer = self.get_serializer(project)
         return Response({
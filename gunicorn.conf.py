@@ -0,0 +1,43 @@
+# gunicorn.conf.py
+
+"""
+gunicorn settings for the web process; loaded automatically when gunicorn
+starts in the project directory.
+
+With preload_app the application is imported and warmed up once in the
+master (see telemetry/warmup.py), and workers are forked from it, so they
+start ready to serve and share the loaded code and caches copy-on-write.
+Set GUNICORN_PRELOAD=false to load the application in every worker instead
+(needed for --reload).
+"""
+
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+
+def _warm_up():
+    from django.conf import settings
+
+    if settings.STARTUP_WARMUP:
+        from telemetry import warmup
+
+        warmup.warm_web()
+
+
+def when_ready(server):
+    # Runs in the master before the first workers are forked.
+    if preload_app:
+        _warm_up()
+
+
+def post_fork(server, worker):
+    # Psycopg connection pools belong to the process that opened them.
+    from main.celery import discard_inherited_connection_pools
+
+    discard_inherited_connection_pools()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        _warm_up()
@@ -2,6 +2,7 @@
 
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
@@ -13,4 +14,36 @@ app = Celery('main')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def discard_inherited_connection_pools(**kwargs):
+    """
+    Drops any psycopg connection pool a prefork child inherited from the
+    parent process. Its sockets and maintenance threads belong to the parent,
+    so each child lazily opens a pool of its own instead. Celery's Django
+    fixup already does the same for plain persistent connections.
+    """
+    from django.conf import settings
+
+    if not settings.DB_POOL:
+        return
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    # Not pool.close(): that would also close the parent's connections.
+    DatabaseWrapper._connection_pools.clear()
+
+
+@worker_init.connect
+def warm_up_worker(**kwargs):
+    """
+    Loads the task modules and caches in the worker's main process, before
+    the pool forks its children (see telemetry/warmup.py).
+    """
+    from django.conf import settings
+
+    if settings.STARTUP_WARMUP:
+        from telemetry import warmup
+
+        warmup.warm_worker()
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -53,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'telemetry.middleware.DogfoodMiddleware',  # No-op unless DOGFOOD_ENABLED
+    'telemetry.middleware.ReplicaRoutingMiddleware',  # No-op unless DB_REPLICA_HOSTS
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +88,15 @@ WSGI_APPLICATION = 'main.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection reuse: persistent connections kept for DB_CONN_MAX_AGE seconds (0 closes
+# them after every request/task), or with DB_POOL=True a psycopg 3 connection pool
+# per process (requires `pip install "psycopg[binary,pool]"`)
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() == 'true'
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))  # Seconds to wait for a free connection
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -93,9 +105,43 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
         'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # Reuse connections across requests and tasks instead of reconnecting each time;
+        # a connection is checked before it is reused after an error or a restart.
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': DB_POOL_TIMEOUT,
+            },
+        } if DB_POOL else {},
     }
 }
 
+# Read replicas (see telemetry/replicas.py): comma-separated host[:port] list of hot standbys
+# of the primary, using the same database name and credentials
+DB_REPLICA_HOSTS = [host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', '5'))  # Lagging replicas fall back to the primary
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('DB_REPLICA_LAG_CHECK_SECONDS', '5'))
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', '30'))  # Primary pin after a write
+
+DB_REPLICAS = []
+for index, address in enumerate(DB_REPLICA_HOSTS, start=1):
+    replica_host, _, replica_port = address.rpartition(':')
+    if not replica_port.isdigit():  # No port given
+        replica_host, replica_port = address, DATABASES['default']['PORT']
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['telemetry.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,12 +196,106 @@ REDIS_PORT = os.environ.get('REDIS_PORT', '6379')
 REDIS_DB = os.environ.get('REDIS_DB', '0')
 REDIS_URL = os.environ.get('REDIS_URL', f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}")
 
+# Shared cache for computed API responses, in its own Redis database by default
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', f"redis://{REDIS_HOST}:{REDIS_PORT}/1"),
+    }
+}
+OVERVIEW_CACHE_SECONDS = int(os.environ.get('OVERVIEW_CACHE_SECONDS', '60'))
+# How long a resolved API key is trusted without asking the database (see telemetry/api_keys.py)
+API_KEY_CACHE_SECONDS = int(os.environ.get('API_KEY_CACHE_SECONDS', '60'))
+
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', REDIS_URL)
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Queues: ingest and error grouping are many small, latency-sensitive tasks and get
+# their own workers, so long aggregation or maintenance runs cannot starve them.
+# The per-minute compaction has its own queue too: a retention cleanup may run
+# for up to RETENTION_MAX_RUN_SECONDS and would otherwise hold it back.
+# Each queue's worker pool is started separately (see Procfile).
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'telemetry.tasks.process_performance_log': {'queue': 'ingest'},
+    'telemetry.tasks.process_error_log': {'queue': 'errors'},
+    'telemetry.tasks.aggregate_performance_logs': {'queue': 'aggregation'},
+    'telemetry.tasks.aggregate_window_shard': {'queue': 'aggregation'},
+    'telemetry.tasks.finalize_aggregation_window': {'queue': 'aggregation'},
+    'telemetry.tasks.detect_latency_regressions': {'queue': 'aggregation'},
+    'telemetry.tasks.compact_performance_samples': {'queue': 'compaction'},
+    'telemetry.tasks.cleanup_old_raw_logs': {'queue': 'maintenance'},
+}
+# Acknowledge after the task finishes, so a crashed worker's tasks are redelivered
+# instead of lost (tasks must tolerate running twice; error ingestion is keyed by
+# event id). Workers reserve tasks per process according to the prefetch
+# multiplier, which the Procfile raises for the small ingest tasks. The broker's
+# visibility timeout is set with the retention settings below.
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.environ.get('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+# Tasks are fire-and-forget; only the aggregation shards, whose results feed
+# the chord callback, store a result.
+CELERY_TASK_IGNORE_RESULT = True
+
+
+# Raw performance storage: 'rows' keeps full PerformanceLog rows, 'compact' writes
+# narrow PerformanceSample rows which can optionally be packed into per-minute blocks.
+PERFORMANCE_STORAGE = os.environ.get('PERFORMANCE_STORAGE', 'rows')
+PERFORMANCE_BLOCKS_ENABLED = os.environ.get('PERFORMANCE_BLOCKS_ENABLED', 'False').lower() == 'true'
+PERFORMANCE_BLOCK_DELAY_MINUTES = int(os.environ.get('PERFORMANCE_BLOCK_DELAY_MINUTES', '2'))
+
+# Aggregation into aligned 5-minute windows (see telemetry/aggregation.py): windows are
+# re-aggregated until this many minutes after they close, to pick up late data
+AGGREGATION_LATENESS_MINUTES = int(os.environ.get('AGGREGATION_LATENESS_MINUTES', '10'))
+# Caps how many missed windows a single run catches up on
+AGGREGATION_MAX_WINDOWS_PER_RUN = int(os.environ.get('AGGREGATION_MAX_WINDOWS_PER_RUN', '12'))
+# Each window is aggregated as this many parallel subtasks, sharded by project id
+AGGREGATION_SHARDS = int(os.environ.get('AGGREGATION_SHARDS', '4'))
+# Apdex threshold T recorded for every endpoint; latency SLOs add their own thresholds
+APDEX_THRESHOLD_MS = int(os.environ.get('APDEX_THRESHOLD_MS', '500'))
+
+# Retention (see telemetry/retention.py): default days kept per table, overridable per project
+RETENTION_DAYS = {
+    'performance_logs': int(os.environ.get('RETENTION_PERFORMANCE_LOG_DAYS', '30')),
+    'error_logs': int(os.environ.get('RETENTION_ERROR_LOG_DAYS', '30')),
+    'aggregated_metrics': int(os.environ.get('RETENTION_AGGREGATED_METRIC_DAYS', '395')),
+    'grouped_errors': int(os.environ.get('RETENTION_GROUPED_ERROR_DAYS', '90')),
+}
+RETENTION_CHUNK_SIZE = int(os.environ.get('RETENTION_CHUNK_SIZE', '10000'))  # Primary keys per delete
+RETENTION_MAX_ROWS_PER_SECOND = int(os.environ.get('RETENTION_MAX_ROWS_PER_SECOND', '5000'))  # 0 = unthrottled
+RETENTION_MAX_RUN_SECONDS = int(os.environ.get('RETENTION_MAX_RUN_SECONDS', '3600'))  # Later runs resume from a checkpoint
+
+# With late acks (see CELERY_TASK_ACKS_LATE), Redis redelivers any task not acknowledged within
+# the visibility timeout, including tasks still running or waiting in a worker's prefetch buffer.
+# Keep it well above the longest task, the retention run.
+CELERY_VISIBILITY_TIMEOUT_SECONDS = int(os.environ.get('CELERY_VISIBILITY_TIMEOUT_SECONDS', str(RETENTION_MAX_RUN_SECONDS * 3)))
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': CELERY_VISIBILITY_TIMEOUT_SECONDS}
+
+# Cold storage (see telemetry/archive.py): when enabled, expired raw performance and error
+# logs are written to compressed segment files under ARCHIVE_ROOT before retention deletes them
+ARCHIVE_ENABLED = os.environ.get('ARCHIVE_ENABLED', 'False').lower() == 'true'
+ARCHIVE_ROOT = os.environ.get('ARCHIVE_ROOT', str(BASE_DIR / 'archive'))
+ARCHIVE_MAX_DAYS_PER_RUN = int(os.environ.get('ARCHIVE_MAX_DAYS_PER_RUN', '7'))
+
+# Self-instrumentation exposed at /metrics (see telemetry/instrumentation.py)
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'True').lower() == 'true'
+INSTRUMENTATION_FLUSH_SECONDS = float(os.environ.get('INSTRUMENTATION_FLUSH_SECONDS', '5'))
+METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN', '')
+
+# Dogfooding: record Pensieve's own requests into a reserved internal project
+DOGFOOD_ENABLED = os.environ.get('DOGFOOD_ENABLED', 'False').lower() == 'true'
+DOGFOOD_PROJECT_NAME = os.environ.get('DOGFOOD_PROJECT_NAME', 'pensieve-internal')
+DOGFOOD_EXCLUDED_PATHS = ['/static/', '/media/', '/metrics']
+
+# In-process ingest buffer used by trusted, in-process producers such as dogfooding
+INGEST_BUFFER_MAX_EVENTS = int(os.environ.get('INGEST_BUFFER_MAX_EVENTS', '200'))
+INGEST_BUFFER_MAX_AGE_SECONDS = float(os.environ.get('INGEST_BUFFER_MAX_AGE_SECONDS', '10'))
+
+# Start-up warm-up of web and Celery workers, done before they fork (see telemetry/warmup.py)
+STARTUP_WARMUP = os.environ.get('STARTUP_WARMUP', 'True').lower() == 'true'
 
 # Celery Beat Settings
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
@@ -167,9 +307,13 @@ CELERY_BEAT_SCHEDULE = {
     'cleanup-old-raw-logs-daily': {
         'task': 'telemetry.tasks.cleanup_old_raw_logs',
         'schedule': 86400.0,  # 24 hours
-        'options': {'queue' : 'low_priority'}, # Optional: run on a different queue
     },
 }
+if PERFORMANCE_BLOCKS_ENABLED:
+    CELERY_BEAT_SCHEDULE['compact-performance-samples-every-minute'] = {
+        'task': 'telemetry.tasks.compact_performance_samples',
+        'schedule': 60.0,  # 1 minute
+    }
 
 # REST Framework Settings
 REST_FRAMEWORK = {
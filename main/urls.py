@@ -20,10 +20,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import include
 
+from telemetry.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),  # Home, auth, and dashboard pages
     path('api/', include('telemetry.urls')),  # Telemetry API endpoints
+    path('metrics', metrics_view, name='metrics'),  # Pensieve's own instrumentation
 ]
 
 # Serve static and media files during development
@@ -1,9 +1,13 @@
 from django.contrib import admin
 
-from telemetry.models import GroupedError, Project, PerformanceLog, ErrorLog
+from telemetry.models import ArchiveSegment, Endpoint, GroupedError, Project, PerformanceLog, ErrorLog, RegressionEvent, ServiceLevelObjective
 
 # Register your models here.
 admin.site.register(Project)
+admin.site.register(Endpoint)
 admin.site.register(PerformanceLog)
 admin.site.register(ErrorLog)
-admin.site.register(GroupedError)
\ No newline at end of file
+admin.site.register(GroupedError)
+admin.site.register(RegressionEvent)
+admin.site.register(ArchiveSegment)
+admin.site.register(ServiceLevelObjective)
\ No newline at end of file
@@ -0,0 +1,239 @@
+# telemetry/aggregation.py
+
+"""
+Aggregation of raw performance data into aligned 5-minute windows.
+
+Windows start on wall-clock multiples of five minutes (12:00, 12:05, ...),
+so every run writes to the same AggregatedMetric rows for a given window.
+Each window has an AggregationWindow row whose watermark records when its
+raw data was last read. A window is re-aggregated until its watermark is
+past the window end plus AGGREGATION_LATENESS_MINUTES, which picks up
+samples that were written late (queue lag, buffered producers, slow
+commits). After that the window is final.
+
+Each window is split into AGGREGATION_SHARDS shards by project id hash. The
+scheduled task runs the shards as a Celery chord, so adding worker processes
+shortens aggregation, and the chord callback finalizes the window only once
+every shard has succeeded.
+"""
+
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max
+
+from . import breakdown, histograms, instrumentation, slo, storage
+from .endpoints import resolve_overall_endpoint_id
+from .models import AggregatedMetric, AggregationWindow, Project
+
+WINDOW = timedelta(minutes=5)
+
+
+def window_start(when):
+    """Floors a datetime to the start of its aligned 5-minute window."""
+    seconds = int(when.timestamp()) % int(WINDOW.total_seconds())
+    return when.replace(microsecond=0) - timedelta(seconds=seconds)
+
+
+def windows_between(start, end):
+    """Yields the starts of the aligned windows overlapping [start, end)."""
+    current = window_start(start)
+    while current < end:
+        yield current
+        current += WINDOW
+
+
+def lateness():
+    return timedelta(minutes=settings.AGGREGATION_LATENESS_MINUTES)
+
+
+def due_windows(now):
+    """
+    Returns the starts of the windows an aggregation run at `now` should
+    (re-)aggregate, oldest first:
+
+    - closed windows after the newest one aggregated so far, which also fills
+      the gaps left by missed Beat runs (at most AGGREGATION_MAX_WINDOWS_PER_RUN,
+      the rest are picked up by the next runs), and
+    - already aggregated windows that are still within the lateness allowance.
+    """
+    latest_closed = window_start(now) - WINDOW
+
+    newest = AggregationWindow.objects.aggregate(newest=Max('start'))['newest']
+    first_new = newest + WINDOW if newest else latest_closed
+    new = []
+    start = first_new
+    while start <= latest_closed and len(new) < settings.AGGREGATION_MAX_WINDOWS_PER_RUN:
+        new.append(start)
+        start += WINDOW
+
+    reopened = AggregationWindow.objects.filter(
+        start__lte=latest_closed,
+        watermark__lt=F('start') + (WINDOW + lateness()),
+    ).values_list('start', flat=True)
+
+    return sorted(set(new) | set(reopened))
+
+
+def shard_of(project_id, shards):
+    """Maps a project to one of `shards` aggregation shards by its UUID."""
+    return uuid.UUID(str(project_id)).int % shards
+
+
+def shard_project_ids(shard, shards):
+    """Returns the ids of the projects that belong to `shard`, or None when there is only one shard."""
+    if shards == 1:
+        return None
+    return [
+        project_id
+        for project_id in Project.objects.values_list('id', flat=True)
+        if shard_of(project_id, shards) == shard
+    ]
+
+
+def open_window(start):
+    """
+    Makes sure the window has a bookkeeping row before its shards run. A new
+    row's watermark is the window start, so the window counts as unfinished
+    (and is retried by later runs) until finalize_window advances it.
+    """
+    AggregationWindow.objects.get_or_create(start=start, defaults={'watermark': start})
+
+
+def aggregate_shard(start, shard=0, shards=1):
+    """
+    (Re-)aggregates one shard's projects for the window starting at `start`.
+
+    Metrics are upserted, so running a window again converges on the same
+    rows. A transaction-level advisory lock per (window, shard) serializes
+    concurrent runs of the same slice. Endpoints without raw data in the
+    window (e.g. past raw retention) keep their stored metrics.
+
+    Returns {'samples': ..., 'series': ...} for the finalizer.
+    """
+    end = start + WINDOW
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, %s)",
+                [int(start.timestamp() // WINDOW.total_seconds()), shard],
+            )
+
+        # Load every sample in the window as per-endpoint NumPy columns,
+        # whichever storage layout (rows, compact samples or blocks) holds them
+        project_ids = shard_project_ids(shard, shards)
+        window = storage.load_window(start, end, project_ids)
+        thresholds = slo.thresholds_by_series(project_ids)
+        samples_by_project = defaultdict(list)
+        threshold_counts = []
+        breakdowns = []
+
+        for endpoint_id, samples in window.items():
+            samples_by_project[samples['project_id']].append(samples)
+            threshold_counts += slo.threshold_counts(
+                samples['project_id'], endpoint_id, start, samples['duration_ms'],
+                thresholds.get((samples['project_id'], endpoint_id), ()),
+            )
+            breakdowns.append(breakdown.summarize(samples['project_id'], endpoint_id, start, samples))
+
+            AggregatedMetric.objects.update_or_create(
+                project_id=samples['project_id'],
+                endpoint_id=endpoint_id,
+                timestamp=start,
+                defaults={
+                    **summarize_durations(samples['duration_ms']),
+                    **summarize_status_codes(samples['status_code']),
+                    'histogram': histograms.encode(samples['duration_ms']),
+                },
+            )
+
+        # Save the project-wide numbers against each project's special `__overall__` endpoint
+        for project_id, parts in samples_by_project.items():
+            overall_endpoint_id = resolve_overall_endpoint_id(project_id)
+            durations = np.concatenate([part['duration_ms'] for part in parts])
+            AggregatedMetric.objects.update_or_create(
+                project_id=project_id,
+                endpoint_id=overall_endpoint_id,
+                timestamp=start,
+                defaults={
+                    **summarize_durations(durations),
+                    **summarize_status_codes(np.concatenate([part['status_code'] for part in parts])),
+                    'histogram': histograms.encode(durations),
+                },
+            )
+            threshold_counts += slo.threshold_counts(
+                project_id, overall_endpoint_id, start, durations, thresholds.get((project_id, None), ()),
+            )
+            breakdowns.append(breakdown.summarize(project_id, overall_endpoint_id, start, {
+                name: np.concatenate([part[name] for part in parts])
+                for name in ('duration_ms', *breakdown.COMPONENTS)
+            }))
+
+        # Satisfied / tolerating / frustrated counts for Apdex and latency SLOs
+        slo.save_threshold_counts(threshold_counts)
+        # Where the time went, for the series whose requests reported a breakdown
+        breakdown.save([row for row in breakdowns if row is not None])
+
+        # Invalidates the cached overviews of the projects that got new numbers
+        Project.objects.filter(id__in=samples_by_project).update(data_version=F('data_version') + 1)
+
+    sample_count = sum(len(samples['duration_ms']) for samples in window.values())
+    instrumentation.AGGREGATION_SAMPLES.inc(sample_count)
+    return {'samples': sample_count, 'series': len(window)}
+
+
+def finalize_window(start, now, results):
+    """Records that every shard of the window has folded in data ingested up to `now`."""
+    sample_count = sum(result['samples'] for result in results)
+    series_count = sum(result['series'] for result in results)
+
+    with transaction.atomic():
+        window_row, _ = AggregationWindow.objects.select_for_update().get_or_create(
+            start=start, defaults={'watermark': start},
+        )
+        window_row.watermark = max(window_row.watermark, now)
+        window_row.runs += 1
+        window_row.sample_count = sample_count
+        window_row.series_count = series_count
+        window_row.save()
+
+    instrumentation.AGGREGATION_LAST_SAMPLES.set(sample_count)
+    instrumentation.AGGREGATION_LAST_SERIES.set(series_count)
+    return sample_count
+
+
+def aggregate_window(start, now, shards=1):
+    """
+    Aggregates every shard of a window in this process, one after another,
+    and finalizes it. Used by the backfill and benchmark commands; the
+    scheduled task fans the shards out to workers instead.
+
+    Returns the number of raw samples read.
+    """
+    open_window(start)
+    results = [aggregate_shard(start, shard, shards) for shard in range(shards)]
+    return finalize_window(start, now, results)
+
+
+def summarize_durations(durations):
+    """Calculates the stored summary numbers for an array of durations using NumPy."""
+    return {
+        'request_count': len(durations),
+        'avg_duration_ms': int(np.mean(durations)),
+        'p50_duration_ms': int(np.percentile(durations, 50)), # Median
+        'p95_duration_ms': int(np.percentile(durations, 95)),
+    }
+
+
+STATUS_CLASSES = (2, 3, 4, 5)
+
+
+def summarize_status_codes(status_codes):
+    """Counts an array of status codes per class (2xx, 3xx, 4xx, 5xx) in one pass."""
+    counts = np.bincount(np.asarray(status_codes) // 100, minlength=10)
+    return {f'status_{status_class}xx_count': int(counts[status_class]) for status_class in STATUS_CLASSES}
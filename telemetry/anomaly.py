@@ -0,0 +1,192 @@
+# telemetry/anomaly.py
+
+"""
+Incremental latency regression detection over the aggregated p95 series.
+
+Each endpoint keeps an exponentially weighted mean and variance of log(p95)
+in a SeriesBaseline row. After every aggregation window the new p95 values are
+scored against those baselines in one vectorized pass, regression and recovery
+events are recorded, and the baselines are folded forward. Working in log
+space makes the score relative, so a 20ms -> 40ms jump weighs the same as
+200ms -> 400ms.
+"""
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Min
+
+from .models import AggregatedMetric, AggregationWindow, RegressionEvent, SeriesBaseline
+
+# Weight of the newest window in the baseline; ~10 windows of memory.
+EWMA_ALPHA = 0.1
+# While regressed the baseline adapts much more slowly, so a lasting shift
+# eventually becomes the new normal (and is reported as a recovery).
+EWMA_ALPHA_REGRESSED = 0.02
+
+# Standard deviations above the baseline that open / close a regression.
+REGRESSION_SCORE = 4.0
+RECOVERY_SCORE = 1.5
+# The p95 must also be at least this much slower than the baseline, which
+# keeps very stable series from alerting on tiny absolute changes.
+MIN_RELATIVE_INCREASE = 0.25
+
+# Windows a baseline needs before it is trusted, and the minimum traffic in
+# a window for its p95 to be worth scoring.
+WARMUP_WINDOWS = 12
+MIN_REQUESTS = 20
+
+# Floor on the standard deviation of log(p95), i.e. roughly 5% jitter.
+MIN_STDDEV = 0.05
+
+# Transaction-level advisory lock (single-key space, apart from aggregation's
+# two-key locks) held while baselines are read and written.
+BASELINE_LOCK = 3303
+
+
+def score_window(values, counts, mean, variance, windows, in_regression):
+    """
+    Scores one window for many series at once.
+
+    `values` are the window's log(p95) values and the other arrays hold each
+    series' baseline state, index-aligned. Returns the z-scores and boolean
+    arrays of the series that start or end a regression in this window.
+    """
+    stddev = np.maximum(np.sqrt(variance), MIN_STDDEV)
+    scores = (values - mean) / stddev
+
+    trusted = (windows >= WARMUP_WINDOWS) & (counts >= MIN_REQUESTS)
+    started = (
+        trusted
+        & ~in_regression
+        & (scores >= REGRESSION_SCORE)
+        & (values - mean >= np.log1p(MIN_RELATIVE_INCREASE))
+    )
+    ended = in_regression & (counts >= MIN_REQUESTS) & (scores <= RECOVERY_SCORE)
+    return scores, started, ended
+
+
+def update_baselines(values, mean, variance, regressed):
+    """Folds one window into each series' EWMA mean and variance."""
+    alpha = np.where(regressed, EWMA_ALPHA_REGRESSED, EWMA_ALPHA)
+    diff = values - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (variance + diff * increment)
+
+
+def lock_baselines():
+    """Serializes baseline updates until the end of the current transaction."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [BASELINE_LOCK])
+
+
+@transaction.atomic
+def detect_regressions(timestamp):
+    """
+    Evaluates the aggregation window starting at `timestamp` against every
+    series baseline, records RegressionEvents and advances the baselines.
+    Windows a series has already been evaluated for are skipped, so running
+    this twice for the same window is harmless. Concurrent calls wait for
+    each other, so none of them works from stale baselines.
+
+    Returns the number of events recorded.
+    """
+    lock_baselines()
+    AggregationWindow.objects.filter(start=timestamp).update(scored=True)
+
+    rows = list(
+        AggregatedMetric.objects
+        .filter(timestamp=timestamp)
+        .order_by('endpoint_id')
+        .values_list('endpoint_id', 'project_id', 'request_count', 'p95_duration_ms')
+    )
+    if not rows:
+        return 0
+
+    endpoint_ids, project_ids, counts, p95 = (np.array(column) for column in zip(*rows))
+    values = np.log(np.maximum(p95, 1).astype(np.float64))
+
+    baselines = list(
+        SeriesBaseline.objects
+        .filter(endpoint__metrics__timestamp=timestamp)
+        .order_by('endpoint_id')
+        .values_list('endpoint_id', 'mean', 'variance', 'windows', 'last_window', 'in_regression')
+    )
+
+    # Series without a baseline start one from this window's value.
+    mean = values.copy()
+    variance = np.zeros(len(rows))
+    windows = np.zeros(len(rows), dtype=np.int64)
+    in_regression = np.zeros(len(rows), dtype=bool)
+    pending = np.ones(len(rows), dtype=bool)
+
+    if baselines:
+        known_ids, known_mean, known_variance, known_windows, last_window, known_regression = zip(*baselines)
+        positions = np.searchsorted(endpoint_ids, known_ids)
+        mean[positions] = known_mean
+        variance[positions] = known_variance
+        windows[positions] = known_windows
+        in_regression[positions] = known_regression
+        pending[positions] = np.array([window < timestamp for window in last_window])
+
+    scores, started, ended = score_window(values, counts, mean, variance, windows, in_regression)
+    started &= pending
+    ended &= pending
+
+    regressed = (in_regression | started) & ~ended
+    # Fresh baselines start at this window's value, so they fold in unchanged.
+    new_mean, new_variance = update_baselines(values, mean, variance, in_regression | started)
+
+    events = [
+        RegressionEvent(
+            project_id=project_ids[i],
+            endpoint_id=int(endpoint_ids[i]),
+            kind=RegressionEvent.REGRESSION if started[i] else RegressionEvent.RECOVERY,
+            timestamp=timestamp,
+            p95_duration_ms=int(p95[i]),
+            baseline_p95_ms=round(float(np.exp(mean[i]))),
+            score=round(float(scores[i]), 2),
+        )
+        for i in np.flatnonzero(started | ended)
+    ]
+    RegressionEvent.objects.bulk_create(events)
+
+    SeriesBaseline.objects.bulk_create(
+        [
+            SeriesBaseline(
+                endpoint_id=int(endpoint_ids[i]),
+                mean=float(new_mean[i]),
+                variance=float(new_variance[i]),
+                windows=int(windows[i]) + 1,
+                last_window=timestamp,
+                in_regression=bool(regressed[i]),
+            )
+            for i in np.flatnonzero(pending)
+        ],
+        batch_size=5000,
+        update_conflicts=True,
+        unique_fields=['endpoint'],
+        update_fields=['mean', 'variance', 'windows', 'last_window', 'in_regression'],
+    )
+    return len(events)
+
+
+@transaction.atomic
+def detect_due_windows():
+    """
+    Scores every aggregated window that has not been scored yet, oldest
+    first. Stops before the oldest window whose aggregation has not finished
+    (its shards are retried by later runs): scoring a newer window first
+    would move the baselines past it, and it would then be skipped for good.
+
+    Returns {window start: events recorded}.
+    """
+    lock_baselines()
+    windows = AggregationWindow.objects.filter(scored=False, runs__gt=0)
+    unfinished = AggregationWindow.objects.filter(runs=0).aggregate(oldest=Min('start'))['oldest']
+    if unfinished is not None:
+        windows = windows.filter(start__lt=unfinished)
+
+    return {
+        start: detect_regressions(start)
+        for start in windows.order_by('start').values_list('start', flat=True)
+    }
@@ -0,0 +1,40 @@
+# telemetry/api_keys.py
+
+"""
+API key -> project id lookups for the X-API-KEY views.
+
+Resolved ids are kept in the shared Django cache, so dropping an entry takes
+effect in every process at once: rotating a key (ProjectViewSet.regenerate_key)
+and deleting a project forget the old key, and API_KEY_CACHE_SECONDS bounds
+how long anything else, such as a change made directly in the database, can
+go unnoticed. Unknown keys are never cached.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Project
+
+
+def cache_key(api_key):
+    return f"api-key:{str(api_key).lower()}"
+
+
+def resolve_project_id(api_key):
+    """Returns the id of the project with this API key; raises Project.DoesNotExist for an unknown key."""
+    key = cache_key(api_key)
+    project_id = cache.get(key)
+    if project_id is None:
+        project_id = Project.objects.only('id').get(api_key=api_key).id
+        cache.set(key, project_id, settings.API_KEY_CACHE_SECONDS)
+    return project_id
+
+
+def forget(api_key):
+    """Drops a key from the cache, e.g. after it was rotated or its project deleted."""
+    cache.delete(cache_key(api_key))
+
+
+def forget_deleted_project(sender, instance, **kwargs):
+    """post_delete receiver for Project."""
+    forget(instance.api_key)
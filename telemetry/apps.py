@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class TelemetryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'telemetry'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+
+        from .api_keys import forget_deleted_project
+        from .instrumentation import connect_celery_signals
+        from .models import Project
+
+        connect_celery_signals()
+        post_delete.connect(forget_deleted_project, sender=Project, dispatch_uid='telemetry.forget_deleted_project')
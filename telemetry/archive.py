@@ -0,0 +1,363 @@
+# telemetry/archive.py
+
+"""
+Cold storage for expired raw telemetry.
+
+Before retention deletes raw performance or error data, each expired day is
+written out as one segment file per project under ARCHIVE_ROOT:
+
+    <kind>/<project id>/<YYYY-MM-DD>.seg
+
+A segment is columnar. A fixed prelude (magic, format version, header length)
+is followed by a JSON header and one zlib-compressed blob per column. The
+header lists each blob's offset and length. Timestamps are microseconds since
+the epoch, sorted and delta-encoded. Text columns store the UTF-8 byte length
+of every value followed by the concatenated values.
+
+Every segment also gets an ArchiveSegment row (project, day, time range,
+endpoints), so lookups only open the files they need. Readers memory-map the
+file and decompress only the columns a query touches.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Min
+
+from . import storage
+from .models import ArchiveDay, ArchiveSegment, ErrorLog, PerformanceBlock, PerformanceLog, PerformanceSample
+
+MAGIC = b'PSEG'
+FORMAT_VERSION = 1
+PRELUDE = struct.Struct('<4sBI')  # magic, format version, header length
+
+TEXT = 'text'
+COLUMNS = {
+    ArchiveSegment.PERFORMANCE: {
+        'timestamp': '<i8',
+        'endpoint_id': '<i4',
+        'status_code': '<u2',
+        'duration_ms': '<u4',
+    },
+    ArchiveSegment.ERRORS: {
+        'timestamp': '<i8',
+        'endpoint_id': '<i4',  # -1 when unknown
+        'group_id': '<i8',  # -1 when ungrouped
+        'url': TEXT,
+        'method': TEXT,
+        'error_type': TEXT,
+        'error_message': TEXT,
+        'traceback': TEXT,
+    },
+}
+
+# The retention policy whose expiry triggers archiving each kind.
+POLICIES = {ArchiveSegment.PERFORMANCE: 'performance_logs', ArchiveSegment.ERRORS: 'error_logs'}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(when):
+    return (when - EPOCH) // ONE_MICROSECOND
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def day_start(day):
+    return datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+
+
+# Segment files
+
+def encode_column(name, values, dtype):
+    if dtype == TEXT:
+        encoded = [value.encode('utf-8') for value in values]
+        lengths = np.fromiter((len(value) for value in encoded), dtype='<u4', count=len(encoded))
+        raw = lengths.tobytes() + b''.join(encoded)
+    else:
+        column = np.asarray(values, dtype=dtype)
+        if name == 'timestamp':
+            column = np.diff(column, prepend=column.dtype.type(0))
+        raw = column.tobytes()
+    return zlib.compress(raw)
+
+
+def write_segment(path, header, columns):
+    """
+    Writes a segment file atomically (via a temporary file and rename) and
+    returns its size in bytes. `columns` maps names to equal-length sequences
+    in the order of the kind's COLUMNS.
+    """
+    blobs, offset = [], 0
+    header = {**header, 'columns': {}}
+    for name, dtype in COLUMNS[header['kind']].items():
+        blob = encode_column(name, columns[name], dtype)
+        header['columns'][name] = {'dtype': dtype, 'offset': offset, 'length': len(blob)}
+        blobs.append(blob)
+        offset += len(blob)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix('.tmp')
+    with open(temporary, 'wb') as f:
+        f.write(PRELUDE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temporary, path)
+    return path.stat().st_size
+
+
+class Segment:
+    """A memory-mapped segment file; columns are decompressed on first access."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = PRELUDE.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} segment file")
+        self.header = json.loads(self._map[PRELUDE.size:PRELUDE.size + header_length])
+        self._data_start = PRELUDE.size + header_length
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._columns.clear()
+        self._map.close()
+        self._file.close()
+
+    @property
+    def rows(self):
+        return self.header['rows']
+
+    def _raw(self, name):
+        spec = self.header['columns'][name]
+        start = self._data_start + spec['offset']
+        with memoryview(self._map) as view:
+            return zlib.decompress(view[start:start + spec['length']])
+
+    def column(self, name):
+        """Returns a column as a NumPy array (numeric) or a list of str (text)."""
+        if name not in self._columns:
+            dtype = self.header['columns'][name]['dtype']
+            raw = self._raw(name)
+            if dtype == TEXT:
+                lengths = np.frombuffer(raw, dtype='<u4', count=self.rows)
+                ends = np.cumsum(lengths, dtype=np.int64) + lengths.nbytes
+                starts = ends - lengths
+                values = [raw[start:end].decode('utf-8') for start, end in zip(starts, ends)]
+            else:
+                values = np.frombuffer(raw, dtype=dtype)
+                if name == 'timestamp':
+                    values = np.cumsum(values)
+            self._columns[name] = values
+        return self._columns[name]
+
+    def take(self, name, indexes):
+        column = self.column(name)
+        if isinstance(column, list):
+            return [column[i] for i in indexes]
+        return column[indexes]
+
+
+# Archiving
+
+def _performance_rows(start, end):
+    """Yields (project_id, endpoint_id, timestamp, status_code, duration_ms) from every storage layout."""
+    yield from (
+        PerformanceLog.objects
+        .filter(timestamp__gte=start, timestamp__lt=end)
+        .values_list('project_id', 'endpoint_id', 'timestamp', 'status_code', 'duration_ms')
+        .iterator(chunk_size=10000)
+    )
+    yield from (
+        PerformanceSample.objects
+        .filter(timestamp__gte=start, timestamp__lt=end)
+        .values_list('endpoint__project_id', 'endpoint_id', 'timestamp', 'status_code', 'duration_ms')
+        .iterator(chunk_size=10000)
+    )
+    blocks = (
+        PerformanceBlock.objects
+        .filter(minute__gte=start, minute__lt=end)
+        .values_list('endpoint__project_id', 'endpoint_id', 'minute', 'version', 'count', 'data')
+        .iterator(chunk_size=1000)
+    )
+    for project_id, endpoint_id, minute, version, count, data in blocks:
+        # Blocks only keep the minute, which becomes every sample's timestamp.
+        columns = storage.unpack_block(data, count, version)
+        for status_code, duration_ms in zip(columns['status_code'].tolist(), columns['duration_ms'].tolist()):
+            yield project_id, endpoint_id, minute, status_code, duration_ms
+
+
+def _collect_performance(start, end):
+    projects = defaultdict(lambda: {
+        'timestamp': array('q'), 'endpoint_id': array('i'), 'status_code': array('H'), 'duration_ms': array('I'),
+    })
+    for project_id, endpoint_id, timestamp, status_code, duration_ms in _performance_rows(start, end):
+        columns = projects[project_id]
+        columns['timestamp'].append(to_micros(timestamp))
+        columns['endpoint_id'].append(endpoint_id)
+        columns['status_code'].append(status_code)
+        columns['duration_ms'].append(duration_ms)
+    return projects
+
+
+def _collect_errors(start, end):
+    projects = defaultdict(lambda: {name: [] for name in COLUMNS[ArchiveSegment.ERRORS]})
+    rows = (
+        ErrorLog.objects
+        .filter(timestamp__gte=start, timestamp__lt=end)
+        .values_list(
+            'project_id', 'timestamp', 'endpoint_id', 'group_id',
+            'url', 'method', 'error_type', 'error_message', 'traceback',
+        )
+        .iterator(chunk_size=2000)
+    )
+    for project_id, timestamp, endpoint_id, group_id, *text in rows:
+        columns = projects[project_id]
+        columns['timestamp'].append(to_micros(timestamp))
+        columns['endpoint_id'].append(-1 if endpoint_id is None else endpoint_id)
+        columns['group_id'].append(-1 if group_id is None else group_id)
+        for name, value in zip(('url', 'method', 'error_type', 'error_message', 'traceback'), text):
+            columns[name].append(value)
+    return projects
+
+
+COLLECTORS = {ArchiveSegment.PERFORMANCE: _collect_performance, ArchiveSegment.ERRORS: _collect_errors}
+
+
+def archive_day(kind, day):
+    """
+    Writes one segment per project for a day of raw data and records it.
+    Re-running a day overwrites its segments, so an interrupted day is
+    simply archived again. Returns the number of rows archived.
+    """
+    start = day_start(day)
+    root = Path(settings.ARCHIVE_ROOT)
+    total = segments = 0
+
+    for project_id, columns in COLLECTORS[kind](start, start + timedelta(days=1)).items():
+        timestamps = np.asarray(columns['timestamp'], dtype=np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        columns = {
+            name: [values[i] for i in order] if isinstance(values, list) else np.asarray(values)[order]
+            for name, values in columns.items()
+        }
+        endpoint_ids = sorted({int(endpoint_id) for endpoint_id in np.unique(columns['endpoint_id']) if endpoint_id >= 0})
+
+        relative_path = f"{kind}/{project_id}/{day.isoformat()}.seg"
+        header = {'kind': kind, 'project_id': str(project_id), 'day': day.isoformat(), 'rows': len(order)}
+        size = write_segment(root / relative_path, header, columns)
+
+        ArchiveSegment.objects.update_or_create(
+            project_id=project_id, kind=kind, day=day,
+            defaults={
+                'start': from_micros(columns['timestamp'][0]),
+                'end': from_micros(columns['timestamp'][-1]),
+                'row_count': len(order),
+                'endpoint_ids': endpoint_ids,
+                'path': relative_path,
+                'size_bytes': size,
+            },
+        )
+        total += len(order)
+        segments += 1
+
+    ArchiveDay.objects.update_or_create(kind=kind, day=day, defaults={'row_count': total, 'segment_count': segments})
+    return total
+
+
+def _oldest_day(kind):
+    """The day of the oldest raw row of a kind (insert-ordered, so the lowest key is the oldest)."""
+    if kind == ArchiveSegment.ERRORS:
+        candidates = [ErrorLog.objects.order_by('pk').values_list('timestamp', flat=True).first()]
+    else:
+        candidates = [
+            PerformanceLog.objects.order_by('pk').values_list('timestamp', flat=True).first(),
+            PerformanceSample.objects.order_by('pk').values_list('timestamp', flat=True).first(),
+            PerformanceBlock.objects.aggregate(oldest=Min('minute'))['oldest'],
+        ]
+    candidates = [when for when in candidates if when is not None]
+    return min(candidates).astimezone(dt_timezone.utc).date() if candidates else None
+
+
+def archived_through(kind):
+    """Returns the moment up to which every day of a kind has been archived, or None."""
+    last = ArchiveDay.objects.filter(kind=kind).aggregate(last=Max('day'))['last']
+    if last is None:
+        return None
+    return day_start(last + timedelta(days=1))
+
+
+def archive_until(kind, until, deadline):
+    """
+    Archives whole days of a kind, oldest first, that end at or before `until`,
+    at most ARCHIVE_MAX_DAYS_PER_RUN per call and stopping at `deadline`
+    (a time.monotonic() value). Returns (rows, complete).
+    """
+    through = archived_through(kind)
+    day = through.date() if through else _oldest_day(kind)
+    if day is None:
+        return 0, True
+
+    total = days = 0
+    while day_start(day + timedelta(days=1)) <= until:
+        if days >= settings.ARCHIVE_MAX_DAYS_PER_RUN or time.monotonic() >= deadline:
+            return total, False
+        total += archive_day(kind, day)
+        day += timedelta(days=1)
+        days += 1
+    return total, True
+
+
+# Queries
+
+def query(project_id, kind, start, end, endpoint_ids=None):
+    """
+    Reads archived rows of a project in [start, end), optionally only for the
+    given endpoints, oldest first. Returns a dict of column name -> values.
+    """
+    segments = ArchiveSegment.objects.filter(project_id=project_id, kind=kind, start__lt=end, end__gte=start)
+    if endpoint_ids is not None:
+        segments = segments.filter(endpoint_ids__overlap=list(endpoint_ids))
+
+    start_micros, end_micros = to_micros(start), to_micros(end)
+    names = list(COLUMNS[kind])
+    parts = {name: [] for name in names}
+
+    for relative_path in segments.order_by('start').values_list('path', flat=True):
+        with Segment(Path(settings.ARCHIVE_ROOT) / relative_path) as segment:
+            timestamps = segment.column('timestamp')
+            first, last = np.searchsorted(timestamps, [start_micros, end_micros])
+            indexes = np.arange(first, last)
+            if endpoint_ids is not None:
+                indexes = indexes[np.isin(segment.column('endpoint_id')[first:last], list(endpoint_ids))]
+            for name in names:
+                parts[name].append(segment.take(name, indexes))
+
+    result = {}
+    for name, dtype in COLUMNS[kind].items():
+        if dtype == TEXT:
+            result[name] = [value for part in parts[name] for value in part]
+        else:
+            result[name] = np.concatenate(parts[name]) if parts[name] else np.array([], dtype=dtype)
+    return result
@@ -0,0 +1,115 @@
+# telemetry/breakdown.py
+
+"""
+Per-request time breakdowns.
+
+Clients may report, next to duration_ms, how much of it went to the
+database (db_ms, plus db_queries), to the cache (cache_ms) and to outgoing
+calls (external_ms). Every component is optional. The raw layouts keep them
+as nullable columns (rows and compact samples) or as extra packed columns
+(block layout 2, where MISSING marks a component a request did not report).
+
+Aggregation rolls them up per endpoint and window into TimeBreakdown rows:
+the average and p95 of each component over the requests that reported it
+(with their count), and of the application time left over (duration minus
+the reported components) over the requests that reported any. A high average query count
+points at N+1 queries, a high external p95 at a slow dependency, without
+ever storing traces.
+"""
+
+import numpy as np
+from django.db.models import F, Max, Sum
+
+from .models import TimeBreakdown
+
+COMPONENTS = ('db_ms', 'db_queries', 'cache_ms', 'external_ms')
+# The components that are time spent outside the application code.
+TIME_COMPONENTS = ('db_ms', 'cache_ms', 'external_ms')
+
+# Marks a component a request did not report in the uint32 columns.
+MISSING = int(np.iinfo(np.uint32).max)
+
+# TimeBreakdown (average, p95) fields per component, including the derived application time.
+FIELDS = {
+    'db_ms': ('db_avg_ms', 'db_p95_ms'),
+    'db_queries': ('db_queries_avg', 'db_queries_p95'),
+    'cache_ms': ('cache_avg_ms', 'cache_p95_ms'),
+    'external_ms': ('external_avg_ms', 'external_p95_ms'),
+    'app_ms': ('app_avg_ms', 'app_p95_ms'),
+}
+# TimeBreakdown field counting the requests behind each component's average.
+COUNT_FIELDS = {
+    'db_ms': 'db_count',
+    'db_queries': 'db_queries_count',
+    'cache_ms': 'cache_count',
+    'external_ms': 'external_count',
+    'app_ms': 'sample_count',
+}
+
+
+def _summarize(values):
+    if not len(values):
+        return None, None
+    return round(float(np.mean(values)), 2), int(np.percentile(values, 95))
+
+
+def summarize(project_id, endpoint_id, timestamp, samples):
+    """
+    Builds the (unsaved) TimeBreakdown row of one series and window from its
+    sample columns, or returns None when no request reported a breakdown.
+    """
+    reported = {name: samples[name] != MISSING for name in COMPONENTS}
+    any_reported = np.logical_or.reduce(list(reported.values()))
+    if not any_reported.any():
+        return None
+
+    row = TimeBreakdown(
+        project_id=project_id, endpoint_id=endpoint_id, timestamp=timestamp, sample_count=int(any_reported.sum()),
+    )
+    for name in COMPONENTS:
+        avg_field, p95_field = FIELDS[name]
+        setattr(row, COUNT_FIELDS[name], int(reported[name].sum()))
+        average, p95 = _summarize(samples[name][reported[name]])
+        setattr(row, avg_field, average)
+        setattr(row, p95_field, p95)
+
+    # Whatever the reported components do not account for was spent in the application.
+    outside = sum(
+        np.where(reported[name], samples[name], 0).astype(np.int64) for name in TIME_COMPONENTS
+    )
+    app = np.maximum(samples['duration_ms'].astype(np.int64) - outside, 0)[any_reported]
+    row.app_avg_ms, row.app_p95_ms = _summarize(app)
+    return row
+
+
+def save(rows):
+    """Upserts TimeBreakdown rows, so re-aggregating a window replaces them."""
+    fields = [*COUNT_FIELDS.values(), *(field for pair in FIELDS.values() for field in pair)]
+    TimeBreakdown.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['endpoint', 'timestamp'], update_fields=fields,
+    )
+
+
+def rollup():
+    """
+    Aggregate expressions combining TimeBreakdown rows: averages weighted by
+    the number of requests that reported each component in each window, and
+    the highest window p95 of each component.
+    """
+    expressions = {'requests': Sum('sample_count')}
+    for name, (avg_field, p95_field) in FIELDS.items():
+        expressions[f'{name}_weighted'] = Sum(F(avg_field) * F(COUNT_FIELDS[name]))
+        expressions[f'{name}_samples'] = Sum(COUNT_FIELDS[name])
+        expressions[f'{name}_p95'] = Max(p95_field)
+    return expressions
+
+
+def combined(row):
+    """Turns the values of a rollup() aggregation into {component: {'avg': ..., 'p95': ...}}."""
+    return {
+        name: {
+            'avg': round(row[f'{name}_weighted'] / row[f'{name}_samples'], 2) if row[f'{name}_samples'] else None,
+            'p95': row[f'{name}_p95'],
+        }
+        for name in FIELDS
+    }
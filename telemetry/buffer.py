@@ -0,0 +1,77 @@
+# telemetry/buffer.py
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .endpoints import resolve_endpoint_id
+from .tasks import process_error_log
+
+logger = logging.getLogger(__name__)
+
+
+class IngestBuffer:
+    """
+    Collects already-trusted telemetry events in process memory and writes
+    them in batches, skipping HTTP, API-key lookup and serializer validation.
+
+    Events are flushed once `max_events` are waiting or the oldest has waited
+    `max_age` seconds. Stored timestamps are the flush time, so they may lag
+    the request by up to `max_age`.
+    """
+
+    def __init__(self, max_events, max_age):
+        self.max_events = max_events
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._performance = []
+        self._errors = []
+        self._oldest = None
+
+    def add_performance(self, project_id, payload):
+        """Queues a payload shaped like PerformanceLogSerializer data, with the URL already a route template."""
+        with self._lock:
+            self._performance.append((project_id, payload))
+            self._oldest = self._oldest or time.monotonic()
+
+    def add_error(self, project_id, payload):
+        """Queues a payload shaped like ErrorLogSerializer data."""
+        with self._lock:
+            self._errors.append((project_id, payload))
+            self._oldest = self._oldest or time.monotonic()
+
+    def is_due(self):
+        if self._oldest is None:
+            return False
+        pending = len(self._performance) + len(self._errors)
+        return pending >= self.max_events or time.monotonic() - self._oldest >= self.max_age
+
+    def flush(self):
+        """Writes every queued event; a failed batch is logged and dropped."""
+        from . import storage  # NumPy-backed; only needed once there is something to write
+
+        with self._lock:
+            performance, self._performance = self._performance, []
+            errors, self._errors = self._errors, []
+            self._oldest = None
+
+        try:
+            events_by_project = {}
+            for project_id, payload in performance:
+                endpoint_id = resolve_endpoint_id(project_id, payload['method'], payload['url'])
+                events_by_project.setdefault(project_id, []).append((endpoint_id, payload))
+            for project_id, events in events_by_project.items():
+                storage.save_performance_events(project_id, events)
+            for project_id, payload in errors:
+                # Run the grouping logic in-process rather than through the broker.
+                process_error_log(project_id, payload)
+        except Exception:
+            logger.exception("Could not flush %d buffered telemetry events", len(performance) + len(errors))
+
+
+ingest_buffer = IngestBuffer(
+    max_events=settings.INGEST_BUFFER_MAX_EVENTS,
+    max_age=settings.INGEST_BUFFER_MAX_AGE_SECONDS,
+)
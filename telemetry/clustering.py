@@ -0,0 +1,154 @@
+# telemetry/clustering.py
+
+"""
+Grouping of incoming errors.
+
+An error's fingerprint is its type, message and traceback with volatile
+values (addresses, UUIDs, numbers, e-mail addresses, quoted values other
+than frame file names and identifiers) replaced by placeholders; identical
+fingerprints share a group through an exact hash lookup. Errors whose
+fingerprints still differ slightly (an unusual interpolated value, a renamed
+local, a shifted frame) are matched to an existing group through MinHash
+signatures over shingles of the fingerprint's tokens, indexed with
+locality-sensitive hashing: the signature is cut into BANDS bands, every
+band is hashed into an ErrorSignatureBand row, and only groups sharing at
+least one band bucket with the new error are compared. Candidates are looked
+up through an index, so matching does not slow down as a project accumulates
+groups.
+
+With 16 bands of 4 rows, pairs with Jaccard similarity 0.8 become
+candidates with probability ~0.999 and pairs at 0.3 with ~0.12; candidates
+are then only accepted above SIMILARITY_THRESHOLD.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+from .models import ErrorSignatureBand, GroupedError
+
+BANDS = 16
+ROWS = 4
+PERMUTATIONS = BANDS * ROWS
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.7
+
+# Universal hashing (a * x + b) mod PRIME over 32-bit token hashes; a < 2**31
+# keeps the products within uint64. Fixed seed: signatures must agree across processes.
+PRIME = (1 << 32) + 15
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 1 << 31, PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, PERMUTATIONS, dtype=np.uint64)
+
+SIGNATURE_DTYPE = np.dtype('<u8')
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][\w.]*')
+
+
+def _mask_quoted(match):
+    """
+    Masks a quoted value, except the file of a traceback frame (File "...")
+    and quoted identifiers such as attribute names or dict keys, which say
+    which code failed rather than which data it failed on.
+    """
+    frame_file, quoted = match.groups()
+    if frame_file or _IDENTIFIER.fullmatch(quoted[1:-1]):
+        return match.group(0)
+    return '[VALUE]'
+
+
+_VOLATILE = [
+    (re.compile(r'0x[0-9a-fA-F]+'), '0xADDRESS'),
+    (re.compile(r'[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}'), '[UUID]'),
+    (re.compile(r'\S+@\S+\.\w+'), '[EMAIL]'),
+    (re.compile(r"(File )?('[^'\n]*'|\"[^\"\n]*\")"), _mask_quoted),
+    (re.compile(r'\b\d+(\.\d+)?\b'), '[NUMBER]'),
+]
+_TOKEN = re.compile(r'\[\w+\]|\w+|[^\w\s]')
+
+
+def fingerprint(error_type, error_message, traceback):
+    """The error's identity with volatile values replaced by placeholders."""
+    text = f"{error_type}:{error_message}:{traceback}"
+    for pattern, placeholder in _VOLATILE:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def fingerprint_hash(fingerprint_text):
+    return hashlib.sha256(fingerprint_text.encode('utf-8')).hexdigest()
+
+
+def _stable_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def signature(fingerprint_text):
+    """MinHash signature (PERMUTATIONS uint64 values) of the fingerprint's token shingles."""
+    tokens = _TOKEN.findall(fingerprint_text)
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {' '.join(tokens)}
+    else:
+        shingles = {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+    hashes = np.array([_stable_hash(shingle) for shingle in shingles], dtype=np.uint64)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % PRIME).min(axis=1)
+
+
+def pack(signature_values):
+    return signature_values.astype(SIGNATURE_DTYPE).tobytes()
+
+
+def unpack(data):
+    return np.frombuffer(data, dtype=SIGNATURE_DTYPE)
+
+
+def band_buckets(signature_values):
+    """One bucket id per band: a signed 64-bit hash of the band's rows."""
+    rows = signature_values.astype(SIGNATURE_DTYPE).reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for band in rows
+    ]
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(first == second))
+
+
+def find_similar(project_id, url, error_type, signature_values):
+    """
+    Returns the project's group most similar to the signature (same route and
+    error type, similarity at least SIMILARITY_THRESHOLD), or None.
+    """
+    buckets = band_buckets(signature_values)
+    matches = (
+        ErrorSignatureBand.objects
+        .filter(project_id=project_id, bucket__in=buckets)
+        .values_list('band', 'bucket', 'group_id')
+    )
+    # A bucket id only counts as a match in the band it was computed for.
+    candidate_ids = {group_id for band, bucket, group_id in matches if buckets[band] == bucket}
+    if not candidate_ids:
+        return None
+
+    best, best_score = None, SIMILARITY_THRESHOLD
+    candidates = GroupedError.objects.filter(id__in=candidate_ids, endpoint__path=url, error_type=error_type).exclude(signature=b'')
+    for group in candidates.only('id', 'signature'):
+        score = similarity(signature_values, unpack(group.signature))
+        if score >= best_score:
+            best, best_score = group, score
+    return best
+
+
+def index_group(group, signature_values):
+    """Stores a group's signature and its band buckets, replacing any earlier ones."""
+    group.signature = pack(signature_values)
+    group.save(update_fields=['signature'])
+    ErrorSignatureBand.objects.filter(group=group).delete()
+    ErrorSignatureBand.objects.bulk_create([
+        ErrorSignatureBand(project_id=group.project_id, group=group, band=band, bucket=bucket)
+        for band, bucket in enumerate(band_buckets(signature_values))
+    ])
@@ -0,0 +1,68 @@
+# telemetry/endpoints.py
+
+from django.db import transaction
+
+from .models import Endpoint
+
+# Per-process cache of (project_id, method, path) -> endpoint id.
+# Endpoints are never renamed, so entries only go stale when a project is deleted.
+# Ids are cached once the surrounding transaction commits: a row created in a
+# transaction that rolls back must not stay behind in the cache.
+_endpoint_ids = {}
+MAX_CACHED_ENDPOINTS = 50_000
+
+
+def normalize_method(method):
+    """HTTP methods are stored upper case; a missing method becomes ''."""
+    return (method or '').upper()
+
+
+def resolve_endpoint_id(project_id, method, path):
+    """Returns the id of the project's endpoint, creating it on first sight."""
+    method = normalize_method(method)
+    key = (str(project_id), method, path)
+    endpoint_id = _endpoint_ids.get(key)
+    if endpoint_id is not None:
+        return endpoint_id
+
+    endpoint, _ = Endpoint.objects.get_or_create(
+        project_id=project_id, method=method, path=path
+    )
+    transaction.on_commit(lambda: _remember(key, endpoint.id))
+    return endpoint.id
+
+
+def _remember(key, endpoint_id):
+    if len(_endpoint_ids) >= MAX_CACHED_ENDPOINTS:
+        _endpoint_ids.clear()
+    _endpoint_ids[key] = endpoint_id
+
+
+def resolve_overall_endpoint_id(project_id):
+    """Returns the id of the project's `__overall__` series endpoint."""
+    return resolve_endpoint_id(project_id, '', Endpoint.OVERALL)
+
+
+def matching(project_id, path, method=None):
+    """
+    The project's endpoints a `path` and `method` query parameter select, the
+    one rule every read API uses: no path selects the project-wide series, a
+    missing method selects every method of the route. Methods compare case
+    insensitively, which also finds endpoints recorded before ingest upper-cased
+    them (see migration 0028).
+    """
+    endpoints = Endpoint.objects.filter(project_id=project_id)
+    if not path:
+        return endpoints.filter(path=Endpoint.OVERALL)
+    endpoints = endpoints.filter(path=path)
+    if method:
+        endpoints = endpoints.filter(method__iexact=method)
+    return endpoints
+
+
+def warm(limit=MAX_CACHED_ENDPOINTS):
+    """Fills the cache with the most recently created endpoints; returns how many were loaded."""
+    rows = Endpoint.objects.order_by('-id').values_list('project_id', 'method', 'path', 'id')[:limit]
+    for project_id, method, path, endpoint_id in rows:
+        _endpoint_ids[(str(project_id), method, path)] = endpoint_id
+    return len(_endpoint_ids)
@@ -0,0 +1,114 @@
+# telemetry/error_rates.py
+
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection
+from django.db.models import Sum
+
+from .models import ErrorBucket
+
+RESOLUTIONS = {'minute': ErrorBucket.MINUTE, 'hour': ErrorBucket.HOUR}
+
+# Minute buckets only feed sparklines and trending, so they are kept briefly.
+MINUTE_BUCKET_RETENTION = timedelta(days=2)
+
+# "Trending now" compares the last few minutes against the hourly rate of the
+# preceding day.
+TRENDING_WINDOW_MINUTES = 15
+TRENDING_BASELINE_HOURS = 24
+
+
+def floor_to(when, resolution):
+    """Floors a datetime to the start of its bucket."""
+    seconds = int(when.timestamp()) % resolution
+    return when.replace(microsecond=0) - timedelta(seconds=seconds)
+
+
+def record_occurrence(group_id, when, count=1):
+    """Adds `count` occurrences of a grouped error to its minute and hour buckets."""
+    table = ErrorBucket._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (group_id, resolution, bucket_start, count)
+            VALUES (%s, %s, %s, %s), (%s, %s, %s, %s)
+            ON CONFLICT (group_id, resolution, bucket_start)
+            DO UPDATE SET count = {table}.count + EXCLUDED.count
+            """,
+            [
+                group_id, ErrorBucket.MINUTE, floor_to(when, ErrorBucket.MINUTE), count,
+                group_id, ErrorBucket.HOUR, floor_to(when, ErrorBucket.HOUR), count,
+            ],
+        )
+
+
+def series(group_ids, resolution, points, now):
+    """
+    Returns (start, {group_id: ndarray}) with `points` consecutive bucket
+    counts per group, ending with the bucket that contains `now`.
+    Buckets without occurrences are zero.
+    """
+    start = floor_to(now, resolution) - timedelta(seconds=resolution * (points - 1))
+    counts = {group_id: np.zeros(points, dtype=np.int64) for group_id in group_ids}
+
+    buckets = ErrorBucket.objects.filter(
+        group_id__in=counts, resolution=resolution, bucket_start__gte=start,
+    ).values_list('group_id', 'bucket_start', 'count')
+    for group_id, bucket_start, count in buckets:
+        index = int((bucket_start - start).total_seconds()) // resolution
+        if index < points:
+            counts[group_id][index] = count
+
+    return start, counts
+
+
+def trending(project_id, now, limit=10):
+    """
+    Ranks a project's grouped errors by how far their recent occurrences
+    exceed what their baseline rate predicts.
+
+    The score is a Poisson-style z-score, (recent - expected) / sqrt(expected + 1),
+    so a brand new error with a handful of hits and a chronic error that
+    suddenly doubles both surface. Returns up to `limit` dicts of group_id,
+    recent_count, expected_count and score, highest score first.
+    """
+    recent_start = floor_to(now, ErrorBucket.MINUTE) - timedelta(minutes=TRENDING_WINDOW_MINUTES - 1)
+    recent = dict(
+        ErrorBucket.objects
+        .filter(group__project_id=project_id, resolution=ErrorBucket.MINUTE, bucket_start__gte=recent_start)
+        .values_list('group_id')
+        .annotate(total=Sum('count'))
+    )
+    if not recent:
+        return []
+
+    baseline_end = floor_to(now, ErrorBucket.HOUR)
+    baseline = dict(
+        ErrorBucket.objects
+        .filter(
+            group_id__in=recent,
+            resolution=ErrorBucket.HOUR,
+            bucket_start__gte=baseline_end - timedelta(hours=TRENDING_BASELINE_HOURS),
+            bucket_start__lt=baseline_end,
+        )
+        .values_list('group_id')
+        .annotate(total=Sum('count'))
+    )
+
+    group_ids = list(recent)
+    recent_counts = np.array([recent[group_id] for group_id in group_ids], dtype=np.float64)
+    expected = np.array([baseline.get(group_id, 0) for group_id in group_ids], dtype=np.float64)
+    expected *= TRENDING_WINDOW_MINUTES / (TRENDING_BASELINE_HOURS * 60)
+    scores = (recent_counts - expected) / np.sqrt(expected + 1)
+
+    ranked = np.argsort(-scores, kind='stable')[:limit]
+    return [
+        {
+            'group_id': group_ids[i],
+            'recent_count': int(recent_counts[i]),
+            'expected_count': round(float(expected[i]), 2),
+            'score': round(float(scores[i]), 2),
+        }
+        for i in ranked
+    ]
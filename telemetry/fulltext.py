@@ -0,0 +1,115 @@
+# telemetry/fulltext.py
+
+"""
+Full-text search over grouped errors.
+
+Every GroupedError carries a weighted tsvector of its error type (A), the
+messages of its errors (B) and its first traceback (C), indexed with GIN.
+It is written when the group is created and extended with the message of
+each new variant that joins the group, so searching only touches groups
+(never the error instances) and a match costs one index lookup.
+
+The 'simple' configuration is used on purpose: identifiers, file names and
+exception names must match as written, not stemmed as English words.
+
+Results are ordered by rank (or recency) and paginated with an opaque
+keyset cursor holding the sort value and id of the last row returned, so
+later pages cost the same as the first. Highlights are computed only for the
+rows of the page.
+"""
+
+import base64
+import json
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Cast
+from django.utils.dateparse import parse_datetime
+
+from .models import GroupedError
+
+CONFIG = 'simple'
+SORT_RANK = 'rank'
+SORT_RECENT = 'recent'
+
+# Markers around matched words in highlights; deliberately not HTML.
+START_SEL = '«'
+STOP_SEL = '»'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def document():
+    """The search vector of a group, computed from its own columns."""
+    return (
+        SearchVector('error_type', weight='A', config=CONFIG)
+        + SearchVector('error_message', weight='B', config=CONFIG)
+        + SearchVector('traceback', weight='C', config=CONFIG)
+    )
+
+
+def index_group(group_id):
+    GroupedError.objects.filter(id=group_id).update(search_vector=document())
+
+
+def with_variant(error_message):
+    """An update expression appending a new variant's message to a group's search vector."""
+    return CombinedExpression(
+        F('search_vector'), '||', SearchVector(Value(error_message or ''), weight='B', config=CONFIG),
+        output_field=SearchVectorField(),
+    )
+
+
+def encode_cursor(sort, row):
+    value = row.rank if sort == SORT_RANK else row.last_seen.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, row.id]).encode()).decode()
+
+
+def decode_cursor(sort, cursor):
+    try:
+        value, group_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = float(value) if sort == SORT_RANK else parse_datetime(value)
+        group_id = int(group_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if value is None:
+        raise InvalidCursor("Invalid cursor")
+    return value, group_id
+
+
+def search(project_id, text, sort=SORT_RANK, cursor=None, limit=25):
+    """
+    Returns (groups, next_cursor): one page of the project's groups matching
+    `text` (websearch syntax: words, "quoted phrases", -exclusions, or), each
+    annotated with `rank` and `headline_message` / `headline_traceback`.
+    """
+    query = SearchQuery(text, search_type='websearch', config=CONFIG)
+    groups = (
+        GroupedError.objects
+        .filter(project_id=project_id, search_vector=query)
+        # As double precision, so the rank round-trips exactly through the cursor.
+        .annotate(rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+    )
+
+    order_field = 'rank' if sort == SORT_RANK else 'last_seen'
+    if cursor:
+        value, group_id = decode_cursor(sort, cursor)
+        groups = groups.filter(Q(**{f'{order_field}__lt': value}) | Q(**{order_field: value, 'id__lt': group_id}))
+
+    page = list(groups.order_by(f'-{order_field}', '-id').only('id', 'last_seen')[:limit + 1])
+    next_cursor = encode_cursor(sort, page[limit - 1]) if len(page) > limit else None
+    page = page[:limit]
+
+    # Highlights are expensive over long tracebacks, so only the page's rows get them.
+    highlighted = GroupedError.objects.filter(id__in=[group.id for group in page]).select_related('endpoint').annotate(
+        headline_message=SearchHeadline('error_message', query, config=CONFIG, start_sel=START_SEL, stop_sel=STOP_SEL),
+        headline_traceback=SearchHeadline(
+            'traceback', query, config=CONFIG, start_sel=START_SEL, stop_sel=STOP_SEL, max_fragments=3,
+        ),
+    ).in_bulk()
+    for group in page:
+        highlighted[group.id].rank = group.rank
+    return [highlighted[group.id] for group in page], next_cursor
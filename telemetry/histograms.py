@@ -0,0 +1,82 @@
+# telemetry/histograms.py
+
+"""
+Fixed log-scale latency histograms.
+
+Every AggregatedMetric row stores the window's durations counted into the
+same BUCKETS buckets, whose upper edges grow by a factor of sqrt(2) from
+1.4 ms to 65.5 s (the last bucket holds everything slower). The counts are
+packed as little-endian uint32, so a row's histogram is 132 bytes and any
+number of rows sum with one vectorized NumPy operation.
+"""
+
+import numpy as np
+
+from .models import AggregatedMetric
+
+# Exclusive upper edges in milliseconds: bucket i holds EDGES_MS[i - 1] <= duration < EDGES_MS[i].
+EDGES_MS = 2 ** (np.arange(1, 33) / 2)
+BUCKETS = len(EDGES_MS) + 1
+DTYPE = np.dtype('<u4')
+
+
+def encode(durations):
+    """Counts an array of durations (ms) into the fixed buckets; returns the packed counts."""
+    indexes = np.searchsorted(EDGES_MS, durations, side='right')
+    return np.bincount(indexes, minlength=BUCKETS).astype(DTYPE).tobytes()
+
+
+def decode(data):
+    """Unpacks a stored histogram into an array of BUCKETS counts (zeros when nothing was stored)."""
+    if not data:
+        return np.zeros(BUCKETS, dtype=DTYPE)
+    return np.frombuffer(data, dtype=DTYPE)
+
+
+def percentile(counts, q):
+    """
+    Estimates the q-th percentile (0-100) of the durations behind summed
+    histogram counts as the upper edge of the bucket it falls in; None
+    without samples or when it falls in the open last bucket.
+    """
+    total = int(np.sum(counts))
+    if not total:
+        return None
+    index = int(np.searchsorted(np.cumsum(counts), total * q / 100))
+    return float(EDGES_MS[index]) if index < len(EDGES_MS) else None
+
+
+def bucket_bounds():
+    """[lower, upper) bounds of every bucket in ms; the last bucket's upper bound is None."""
+    lowers = [0.0, *EDGES_MS.tolist()]
+    uppers = [*EDGES_MS.tolist(), None]
+    return [
+        [round(lower, 2), round(upper, 2) if upper is not None else None]
+        for lower, upper in zip(lowers, uppers)
+    ]
+
+
+def heatmap(endpoint_ids, since, until, step):
+    """
+    Sums the window histograms of one or more endpoints into a dense matrix of
+    ceil((until - since) / step) rows (time, oldest first) by BUCKETS columns
+    (duration). `since` should be aligned to `step`.
+    """
+    step_seconds = step.total_seconds()
+    rows = int(np.ceil((until - since).total_seconds() / step_seconds))
+    matrix = np.zeros((rows, BUCKETS), dtype=np.int64)
+
+    stored = list(
+        AggregatedMetric.objects
+        .filter(endpoint_id__in=endpoint_ids, timestamp__gte=since, timestamp__lt=until)
+        .exclude(histogram=b'')
+        .values_list('timestamp', 'histogram')
+    )
+    if not stored:
+        return matrix
+
+    timestamps, blobs = zip(*stored)
+    offsets = np.array([timestamp.timestamp() for timestamp in timestamps]) - since.timestamp()
+    histograms = np.frombuffer(b''.join(blobs), dtype=DTYPE).reshape(len(blobs), BUCKETS)
+    np.add.at(matrix, (offsets // step_seconds).astype(np.intp), histograms)
+    return matrix
@@ -0,0 +1,318 @@
+# telemetry/instrumentation.py
+
+"""
+Lightweight self-instrumentation for Pensieve's own hot paths.
+
+Observations are added to a per-process buffer (a dict update under a lock)
+and a background thread flushes it to Redis with one pipelined round trip
+every INSTRUMENTATION_FLUSH_SECONDS, so a slow or unavailable Redis never
+holds up the request or task that recorded them. Every gunicorn and Celery
+process adds into the same Redis hashes, so the /metrics endpoint reports
+totals for the deployment.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) shared by all histograms.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Separates metric name, label string and bucket bound in Redis hash fields.
+FIELD_SEPARATOR = '\x1f'
+
+
+def _label_string(labels):
+    if not labels:
+        return ''
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in sorted(labels.items())
+    )
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class MetricsUnavailable(Exception):
+    """Raised by Registry.render when Redis cannot be read."""
+
+
+class Registry:
+    """Holds metric definitions and the buffered observations of this process."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._client = None
+        self._reset()
+
+    def _reset(self):
+        """Drops buffered data; called in forked children so the parent's values are not counted twice."""
+        # Settings are read once: LazySettings attribute access costs more than the observation itself.
+        self.enabled = settings.INSTRUMENTATION_ENABLED
+        self.flush_seconds = settings.INSTRUMENTATION_FLUSH_SECONDS
+        self._counters = {}
+        self._gauges = {}
+        self._client = None
+        # Threads do not survive a fork, so each process starts its own on first use.
+        self._flusher = None
+
+    @property
+    def counters_key(self):
+        return f"{self.prefix}:counters"
+
+    @property
+    def gauges_key(self):
+        return f"{self.prefix}:gauges"
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Imported on first flush: redis (with redis.asyncio) is slow to import
+            # and most modules import this one only to declare metrics.
+            import redis
+
+            self._client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1)
+        return self._client
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def add(self, *increments):
+        """Adds one or more (field, amount) pairs to the buffered counters."""
+        if not self.enabled:
+            return
+        counters = self._counters
+        with self._lock:
+            for field, amount in increments:
+                counters[field] = counters.get(field, 0) + amount
+        if self._flusher is None:
+            self._start_flusher()
+
+    def set(self, field, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[field] = value
+        if self._flusher is None:
+            self._start_flusher()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_periodically, name='instrumentation-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Instrumentation flush failed")
+
+    def flush(self):
+        """Pushes buffered observations to Redis; they are kept for the next try if Redis is down."""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            gauges, self._gauges = self._gauges, {}
+
+        if not counters and not gauges:
+            return
+
+        import redis
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for field, amount in counters.items():
+                pipe.hincrbyfloat(self.counters_key, field, amount)
+            if gauges:
+                pipe.hset(self.gauges_key, mapping=gauges)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Could not flush instrumentation to Redis: %s", e)
+            with self._lock:
+                for field, amount in counters.items():
+                    self._counters[field] = self._counters.get(field, 0) + amount
+                for field, value in gauges.items():
+                    self._gauges.setdefault(field, value)
+
+    def render(self):
+        """
+        Renders the deployment-wide values in the Prometheus text exposition
+        format. Raises MetricsUnavailable when Redis cannot be read.
+        """
+        import redis
+
+        self.flush()
+        try:
+            counters = {k.decode(): float(v) for k, v in self.client.hgetall(self.counters_key).items()}
+            gauges = {k.decode(): float(v) for k, v in self.client.hgetall(self.gauges_key).items()}
+        except redis.RedisError as e:
+            raise MetricsUnavailable(str(e)) from e
+
+        samples = {}  # metric name -> {label string -> value, or {bound: count, 'sum': total}}
+        for field, value in list(counters.items()) + list(gauges.items()):
+            name, labels, bound = field.split(FIELD_SEPARATOR)
+            series = samples.setdefault(name, {})
+            if bound:
+                series.setdefault(labels, {})[bound if bound == 'sum' else float(bound)] = value
+            else:
+                series[labels] = value
+
+        lines = []
+        for name in sorted(samples):
+            metric = self.metrics.get(name)
+            if metric is not None:
+                lines.append(f"# HELP {name} {metric.documentation}")
+                lines.append(f"# TYPE {name} {metric.type}")
+            for labels, value in sorted(samples[name].items()):
+                if isinstance(value, dict):
+                    buckets = metric.buckets if isinstance(metric, Histogram) else ()
+                    lines.extend(Histogram.render_series(name, labels, value, buckets))
+                else:
+                    lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name, documentation, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+        self._fields = {}
+
+    def field(self, labels, bound=''):
+        # Building the field string dominates the cost of an observation, so memoize it.
+        key = (tuple(labels.items()), bound)
+        field = self._fields.get(key)
+        if field is None:
+            bound = bound if isinstance(bound, str) else _format_bound(bound)
+            field = f"{self.name}{FIELD_SEPARATOR}{_label_string(labels)}{FIELD_SEPARATOR}{bound}"
+            self._fields[key] = field
+        return field
+
+
+class Counter(Metric):
+    """A monotonically increasing total, summed across processes."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add((self.field(labels), amount))
+
+
+class Gauge(Metric):
+    """A point-in-time value; the most recent write from any process wins."""
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        self.registry.set(self.field(labels), value)
+
+
+class Histogram(Metric):
+    """A distribution over fixed buckets, summed across processes."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, registry)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        bound = self.buckets[bisect_left(self.buckets, value)]
+        self.registry.add((self.field(labels, bound), 1), (self.field(labels, 'sum'), value))
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def render_series(name, labels, values, buckets=()):
+        """Turns stored per-bucket counts into cumulative Prometheus histogram lines."""
+        observed_sum = values.pop('sum', 0.0)
+        label_prefix = f"{labels}," if labels else ''
+        wrapped = f"{{{labels}}}" if labels else ''
+
+        total = 0
+        lines = []
+        for bound in sorted(set(buckets) | set(values) | {float('inf')}):
+            total += values.get(bound, 0)
+            lines.append(f'{name}_bucket{{{label_prefix}le="{_format_bound(bound)}"}} {total}')
+        lines.append(f"{name}_sum{wrapped} {observed_sum}")
+        lines.append(f"{name}_count{wrapped} {total}")
+        return lines
+
+
+REGISTRY = Registry(prefix='pensieve:metrics')
+os.register_at_fork(after_in_child=REGISTRY._reset)
+atexit.register(REGISTRY.flush)
+
+
+# Ingest
+INGEST_REQUESTS = Counter('pensieve_ingest_requests_total', "Ingest requests by payload type and response status.")
+INGEST_DURATION = Histogram('pensieve_ingest_duration_seconds', "Time spent in IngestView per request.")
+INGEST_SERIALIZER_DURATION = Histogram('pensieve_ingest_serializer_duration_seconds', "Time spent validating ingest payloads.")
+
+# Celery tasks
+TASK_QUEUE_LAG = Histogram('pensieve_task_queue_lag_seconds', "Time between publishing a task and a worker starting it.")
+TASK_DURATION = Histogram('pensieve_task_duration_seconds', "Task run time.")
+TASK_FAILURES = Counter('pensieve_task_failures_total', "Tasks that raised an exception.")
+
+# Aggregation and retention
+AGGREGATION_SAMPLES = Counter('pensieve_aggregation_samples_total', "Raw samples read by aggregation runs.")
+AGGREGATION_LAST_SAMPLES = Gauge('pensieve_aggregation_last_run_samples', "Raw samples read by the latest aggregation run.")
+AGGREGATION_LAST_SERIES = Gauge('pensieve_aggregation_last_run_series', "Endpoint series written by the latest aggregation run.")
+CLEANUP_DELETED_ROWS = Counter('pensieve_cleanup_deleted_rows_total', "Rows removed by raw log cleanup, by table.")
+
+
+# Celery hooks: stamp publish time on outgoing messages and time every task run.
+_task_started = {}
+
+
+def _before_task_publish(headers=None, **kwargs):
+    if headers is not None:
+        headers['sent_at'] = time.time()
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    sent_at = getattr(task.request, 'sent_at', None)
+    if sent_at:
+        TASK_QUEUE_LAG.observe(max(time.time() - sent_at, 0), task=task.name)
+
+
+def _task_postrun(task_id=None, task=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.observe(time.perf_counter() - started, task=task.name)
+
+
+def _task_failure(sender=None, **kwargs):
+    TASK_FAILURES.inc(task=sender.name)
+
+
+def connect_celery_signals():
+    from celery import signals
+
+    signals.before_task_publish.connect(_before_task_publish, weak=False)
+    signals.task_prerun.connect(_task_prerun, weak=False)
+    signals.task_postrun.connect(_task_postrun, weak=False)
+    signals.task_failure.connect(_task_failure, weak=False)
@@ -0,0 +1,92 @@
+# telemetry/loadgen.py
+
+import numpy as np
+
+HTTP_METHODS = ['GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE']
+ROUTE_SHAPES = [
+    '/api/v1/{resource}/',
+    '/api/v1/{resource}/{id}/',
+    '/api/v1/{resource}/{id}/items/{id}/',
+    '/api/v1/{resource}/search/',
+    '/{resource}/{uuid}/',
+]
+RESOURCES = ['users', 'orders', 'invoices', 'products', 'carts', 'sessions', 'reports', 'teams']
+ERROR_TYPES = ['ValueError', 'KeyError', 'TimeoutError', 'IntegrityError', 'PermissionDenied']
+
+
+class Workload:
+    """
+    A reproducible synthetic telemetry workload.
+
+    Endpoints are picked with a Zipf-like skew (weight 1 / rank**zipf_s), each
+    endpoint has its own log-normal latency profile, and `error_rate` of the
+    requests fail with a 5xx status plus a matching error event.
+    """
+
+    def __init__(self, projects=1, endpoints=50, zipf_s=1.1, error_rate=0.02, seed=42):
+        self.projects = projects
+        self.endpoints = endpoints
+        self.zipf_s = zipf_s
+        self.error_rate = error_rate
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        self.routes = [self._make_route(i) for i in range(endpoints)]
+        weights = 1.0 / np.arange(1, endpoints + 1) ** zipf_s
+        self.weights = weights / weights.sum()
+        self.median_ms = self.rng.lognormal(mean=3.5, sigma=0.8, size=endpoints)
+
+    def _make_route(self, index):
+        shape = ROUTE_SHAPES[index % len(ROUTE_SHAPES)]
+        resource = RESOURCES[index % len(RESOURCES)]
+        if index >= len(ROUTE_SHAPES) * len(RESOURCES):
+            resource = f"{resource}{index}"
+        return HTTP_METHODS[index % len(HTTP_METHODS)], shape.replace('{resource}', resource)
+
+    def _concrete_url(self, route):
+        url = route
+        while '{id}' in url:
+            url = url.replace('{id}', str(int(self.rng.integers(1, 1_000_000))), 1)
+        if '{uuid}' in url:
+            url = url.replace('{uuid}', str(self._uuid()))
+        if self.rng.random() < 0.3:
+            url += f"?page={int(self.rng.integers(1, 20))}"
+        return url
+
+    def _uuid(self):
+        value = self.rng.integers(0, 2**63, size=2)
+        hex_value = f"{int(value[0]):016x}{int(value[1]):016x}"
+        return f"{hex_value[:8]}-{hex_value[8:12]}-{hex_value[12:16]}-{hex_value[16:20]}-{hex_value[20:32]}"
+
+    def events(self, count):
+        """Yields (project_index, payload_type, payload) tuples."""
+        endpoint_ids = self.rng.choice(self.endpoints, size=count, p=self.weights)
+        project_ids = self.rng.integers(0, self.projects, size=count)
+        failures = self.rng.random(size=count) < self.error_rate
+
+        for endpoint_id, project_id, failed in zip(endpoint_ids, project_ids, failures):
+            method, route = self.routes[endpoint_id]
+            url = self._concrete_url(route)
+            duration = int(self.rng.lognormal(mean=np.log(self.median_ms[endpoint_id]), sigma=0.5))
+
+            yield int(project_id), 'performance', {
+                'url': url,
+                'method': method,
+                'status_code': 500 if failed else 200,
+                'duration_ms': duration,
+            }
+
+            if failed:
+                error_type = ERROR_TYPES[endpoint_id % len(ERROR_TYPES)]
+                line = int(self.rng.integers(10, 500))
+                yield int(project_id), 'error', {
+                    'url': url,
+                    'method': method,
+                    'error_type': error_type,
+                    'error_message': f"{error_type} while handling object {int(self.rng.integers(1, 10_000))}",
+                    'traceback': (
+                        'Traceback (most recent call last):\n'
+                        f'  File "app/views.py", line {line}, in handle\n'
+                        f'{error_type}: at 0x{int(self.rng.integers(0, 2**40)):x}'
+                    ),
+                }
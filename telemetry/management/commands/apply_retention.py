@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from telemetry import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired telemetry according to the retention policies, in throttled chunks "
+        "that resume from the last checkpoint, and reports the rows removed per table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append', dest='tables',
+            help="Only prune this table (repeatable). Choices: " + ', '.join(table.name for table in retention.TABLES),
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Count the expired rows without deleting them.")
+        parser.add_argument('--max-seconds', type=int, help="Stop after this long; the next run resumes.")
+
+    def handle(self, *args, **options):
+        known = {table.name for table in retention.TABLES}
+        unknown = set(options['tables'] or []) - known
+        if unknown:
+            raise CommandError(f"Unknown table(s): {', '.join(sorted(unknown))}")
+
+        report = retention.run(tables=options['tables'], dry_run=options['dry_run'], max_seconds=options['max_seconds'])
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        for table, result in report.items():
+            suffix = '' if result['complete'] else ' (stopped early; the next run resumes)'
+            if 'archived' in result:
+                self.stdout.write(f"{table}: archived {result['archived']} rows{suffix}")
+            else:
+                self.stdout.write(f"{table}: {verb.lower()} {result['deleted']} rows{suffix}")
+        total = sum(result.get('deleted', 0) for result in report.values())
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} rows in total."))
\ No newline at end of file
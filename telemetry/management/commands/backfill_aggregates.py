@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from telemetry import aggregation
+from telemetry.tasks import detect_latency_regressions
+
+
+def parse_datetime(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid ISO 8601 datetime: {value}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-aggregates every aligned 5-minute window overlapping [--start, --end) from raw data. "
+        "Windows whose raw data is past retention keep their existing metrics."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help="ISO 8601 start, e.g. 2025-01-01T00:00 (TIME_ZONE if naive).")
+        parser.add_argument('--end', help="ISO 8601 end (exclusive). Defaults to the start of the current window.")
+        parser.add_argument(
+            '--detect', action='store_true',
+            help="Also score the rebuilt windows for latency regressions (series already scored are skipped).",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        start = parse_datetime(options['start'])
+        end = parse_datetime(options['end']) if options['end'] else aggregation.window_start(now)
+        if start >= end:
+            raise CommandError("--start must be before --end.")
+
+        windows = samples = 0
+        for window_start in aggregation.windows_between(start, end):
+            samples += aggregation.aggregate_window(window_start, now)
+            windows += 1
+            if options['detect']:
+                detect_latency_regressions(window_start.isoformat())
+
+        self.stdout.write(self.style.SUCCESS(f"Re-aggregated {windows} windows from {samples} raw samples."))
@@ -0,0 +1,110 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from telemetry.models import Project
+
+from .benchmark_pipeline import QueryCounter, summarize_latencies
+
+# Connection modes compared, as (CONN_MAX_AGE, pool options) for the default database.
+MODES = {
+    'new_connection': (0, None),
+    'persistent': (60, None),
+    'pooled': (0, {'min_size': 1, 'max_size': 4}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Times a cheap authenticated read (the Project key lookup plus an empty list) "
+        "with a new database connection per request, persistent connections and a "
+        "psycopg connection pool, and reports the per-request latency of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per mode.")
+        parser.add_argument('--warmup', type=int, default=20, help="Untimed requests per mode.")
+        parser.add_argument('--output', help="Write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        project = Project.objects.create(name="benchmark-connections")
+        headers = {'HTTP_X_API_KEY': str(project.api_key)}
+
+        def request():
+            response = client.get('/api/pensieve/errors/', **headers)
+            if response.status_code != 200:
+                raise CommandError(f"Request failed with {response.status_code}")
+            # The test client skips the request_finished cleanup a real server runs.
+            close_old_connections()
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']):
+                client = Client()
+                for mode, (max_age, pool) in MODES.items():
+                    try:
+                        self.use_mode(max_age, pool)
+                    except ImproperlyConfigured as e:
+                        results[mode] = {'skipped': str(e).splitlines()[0]}
+                        continue
+                    for _ in range(options['warmup']):
+                        request()
+                    results[mode] = summarize_latencies(*self.timed(request, options['requests']))
+        finally:
+            self.use_mode(*self.configured_mode())
+            project.delete()
+
+        baseline = results['new_connection']
+        for mode, result in results.items():
+            if mode != 'new_connection' and 'p50_ms' in result:
+                result['p50_reduction_pct'] = round((1 - result['p50_ms'] / baseline['p50_ms']) * 100, 1)
+
+        output = json.dumps({'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def configured_mode(self):
+        return settings.DATABASES['default']['CONN_MAX_AGE'], settings.DATABASES['default']['OPTIONS'].get('pool')
+
+    def use_mode(self, max_age, pool):
+        """
+        Reconfigures the default connection in place. Each request ends with
+        close_old_connections(), as under gunicorn, so CONN_MAX_AGE decides
+        whether the next request reconnects.
+        """
+        connection.close()
+        if connection.settings_dict['OPTIONS'].get('pool'):
+            connection.close_pool()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        if pool:
+            connection.settings_dict['OPTIONS']['pool'] = pool
+        else:
+            connection.settings_dict['OPTIONS'].pop('pool', None)
+        try:
+            connection.ensure_connection()
+        except ImproperlyConfigured:
+            connection.settings_dict['OPTIONS'].pop('pool', None)
+            raise
+
+    def timed(self, operation, count):
+        """Runs `operation` `count` times, returning latencies (ms), wall time and query count."""
+        counter = QueryCounter()
+        latencies = []
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            for _ in range(count):
+                t0 = time.perf_counter()
+                operation()
+                latencies.append((time.perf_counter() - t0) * 1000)
+            seconds = time.perf_counter() - started
+        return latencies, seconds, counter.count
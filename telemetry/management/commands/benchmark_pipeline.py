@@ -0,0 +1,214 @@
+import json
+import subprocess
+import time
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from main.celery import app as celery_app
+from telemetry.loadgen import Workload
+from telemetry.models import Project
+from telemetry import aggregation
+
+
+class QueryCounter:
+    """A connection execute wrapper that counts the SQL queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def summarize_latencies(latencies_ms, seconds, queries):
+    """Throughput, latency percentiles and queries per operation for one phase."""
+    latencies = np.asarray(latencies_ms, dtype=float)
+    count = len(latencies)
+    return {
+        'operations': count,
+        'seconds': round(seconds, 4),
+        'throughput_per_s': round(count / seconds, 2) if seconds else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3) if count else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3) if count else None,
+        'queries': queries,
+        'queries_per_op': round(queries / count, 3) if count else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a reproducible synthetic workload through ingest, the Celery tasks, "
+        "aggregation and the read APIs, and reports throughput, latency and queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=3)
+        parser.add_argument('--endpoints', type=int, default=50)
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--zipf-s', type=float, default=1.1, help="Zipf exponent of the endpoint skew.")
+        parser.add_argument('--error-rate', type=float, default=0.02)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--reads', type=int, default=50, help="Requests per read API.")
+        parser.add_argument(
+            '--broker', choices=['eager', 'redis'], default='eager',
+            help="'eager' runs tasks inline; 'redis' queues them for running workers.",
+        )
+        parser.add_argument('--output', help="Write the JSON results to this file.")
+        parser.add_argument('--compare', help="A previous results file to diff against.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark projects and their data.")
+
+    def handle(self, *args, **options):
+        workload = Workload(
+            projects=options['projects'],
+            endpoints=options['endpoints'],
+            zipf_s=options['zipf_s'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+        run_id = uuid.uuid4().hex[:8]
+        projects = [
+            Project.objects.create(name=f"benchmark-{run_id}-{i}")
+            for i in range(options['projects'])
+        ]
+
+        eager = options['broker'] == 'eager'
+        previous_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = eager
+
+        try:
+            with override_settings(ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']):
+                client = Client()
+                ingest_started = timezone.now()
+                results = {
+                    'ingest': self.run_ingest(client, workload, projects, options['events']),
+                    'aggregate': self.run_aggregate(eager, ingest_started),
+                    'read': self.run_reads(client, projects[0], options['reads']),
+                }
+        finally:
+            celery_app.conf.task_always_eager = previous_eager
+            if not options['keep']:
+                Project.objects.filter(id__in=[project.id for project in projects]).delete()
+
+        report = {
+            'commit': self.current_commit(),
+            'created_at': timezone.now().isoformat(),
+            'config': {
+                key: options[key]
+                for key in ('projects', 'endpoints', 'events', 'zipf_s', 'error_rate', 'seed', 'reads', 'broker')
+            },
+            'settings': {'PERFORMANCE_STORAGE': settings.PERFORMANCE_STORAGE},
+            'results': results,
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def timed(self, operations):
+        """Runs each zero-argument callable, returning latencies (ms), wall time and query count."""
+        counter = QueryCounter()
+        latencies = []
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            for operation in operations:
+                t0 = time.perf_counter()
+                operation()
+                latencies.append((time.perf_counter() - t0) * 1000)
+            seconds = time.perf_counter() - started
+        return latencies, seconds, counter.count
+
+    def run_ingest(self, client, workload, projects, count):
+        """Posts every generated event to IngestView (tasks run inline when eager)."""
+        def post(project, payload_type, payload):
+            def operation():
+                response = client.post(
+                    '/api/ingest/',
+                    data=json.dumps({'type': payload_type, 'payload': payload}),
+                    content_type='application/json',
+                    HTTP_X_API_KEY=str(project.api_key),
+                )
+                if response.status_code != 202:
+                    raise CommandError(f"Ingest failed with {response.status_code}: {response.content[:200]}")
+            return operation
+
+        operations = [
+            post(projects[project_index], payload_type, payload)
+            for project_index, payload_type, payload in workload.events(count)
+        ]
+        return summarize_latencies(*self.timed(operations))
+
+    def run_aggregate(self, eager, ingest_started):
+        """Times aggregating every window that received the events just ingested."""
+        if not eager:
+            self.stdout.write("Queued ingest tasks are processed by the running workers; "
+                              "aggregation only sees what they have stored so far.")
+        now = timezone.now()
+        return summarize_latencies(*self.timed([
+            lambda start=start: aggregation.aggregate_window(start, now)
+            for start in aggregation.windows_between(ingest_started, now)
+        ]))
+
+    def run_reads(self, client, project, count):
+        """Times each read API against the first benchmark project."""
+        headers = {'HTTP_X_API_KEY': str(project.api_key)}
+        endpoints = {
+            'metrics': ('/api/pensieve/metrics/', {}),
+            'top_endpoints': ('/api/pensieve/metrics/top-endpoints/', {}),
+            'endpoint_search': ('/api/pensieve/metrics/endpoints/', {'q': 'api'}),
+            'errors': ('/api/pensieve/errors/', {}),
+            'performance_logs': ('/api/pensieve/performance-logs/', {}),
+        }
+
+        results = {}
+        for name, (path, params) in endpoints.items():
+            def operation(path=path, params=params):
+                response = client.get(path, params, **headers)
+                if response.status_code != 200:
+                    raise CommandError(f"{path} failed with {response.status_code}")
+            results[name] = summarize_latencies(*self.timed([operation] * count))
+        return results
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, report, baseline_path):
+        """Prints the relative change of every throughput and latency figure against a baseline."""
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        def flatten(results, prefix=''):
+            for key, value in results.items():
+                if isinstance(value, dict):
+                    yield from flatten(value, f"{prefix}{key}.")
+                elif key in ('throughput_per_s', 'p50_ms', 'p99_ms', 'queries_per_op'):
+                    yield f"{prefix}{key}", value
+
+        before = dict(flatten(baseline['results']))
+        self.stdout.write(f"Compared with {baseline.get('commit')} ({baseline_path}):")
+        for key, value in flatten(report['results']):
+            old = before.get(key)
+            if old in (None, 0) or value is None:
+                continue
+            change = (value - old) / old * 100
+            self.stdout.write(f"  {key:45} {old:>12} -> {value:>12} ({change:+.1f}%)")
@@ -0,0 +1,155 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Start-up configurations compared, as environment overrides for gunicorn.conf.py and settings.
+MODES = {
+    'cold': {'GUNICORN_PRELOAD': 'false', 'STARTUP_WARMUP': 'false'},
+    'warm': {'GUNICORN_PRELOAD': 'false', 'STARTUP_WARMUP': 'true'},
+    'preload': {'GUNICORN_PRELOAD': 'true', 'STARTUP_WARMUP': 'true'},
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid):
+    """RSS, PSS and USS (private pages) of a process in kB, from /proc (Linux only)."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    values[name] = int(rest.split()[0])
+    except OSError:
+        return None
+    return {'rss_kb': values['Rss'], 'pss_kb': values['Pss'], 'uss_kb': values['Private_Clean'] + values['Private_Dirty']}
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts gunicorn cold (no preload, no warm-up), with per-worker warm-up and with "
+        "preload_app plus warm-up in the master, and reports the time to the first response, "
+        "the latency of the first requests and the memory (RSS, PSS, USS) of each worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="gunicorn workers per mode.")
+        parser.add_argument('--requests', type=int, default=40, help="Timed requests after the first response.")
+        parser.add_argument('--path', default='/api/pensieve/errors/', help="URL path requested.")
+        parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for the first response.")
+        parser.add_argument('--output', help="Write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            self.stderr.write("Memory is read from /proc/<pid>/smaps_rollup and is only reported on Linux.")
+
+        results = {mode: self.run_mode(overrides, options) for mode, overrides in MODES.items()}
+
+        baseline = results['cold']
+        for mode, result in results.items():
+            if mode != 'cold' and result['worker_pss_kb'] and baseline['worker_pss_kb']:
+                result['worker_pss_reduction_pct'] = round((1 - result['worker_pss_kb'] / baseline['worker_pss_kb']) * 100, 1)
+
+        output = json.dumps({'workers': options['workers'], 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_mode(self, overrides, options):
+        port = _free_port()
+        url = f'http://127.0.0.1:{port}{options["path"]}'
+        command = [
+            sys.executable, '-m', 'gunicorn', 'main.wsgi:application',
+            '--config', str(settings.BASE_DIR / 'gunicorn.conf.py'),
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(options['workers']),
+        ]
+
+        with tempfile.TemporaryFile() as log:
+            started = time.perf_counter()
+            server = subprocess.Popen(
+                command, cwd=settings.BASE_DIR, env={**os.environ, **overrides}, stdout=log, stderr=subprocess.STDOUT,
+            )
+            try:
+                first_response_ms = self.wait_for_response(url, server, started, options['timeout'], log)
+                latencies = []
+                for _ in range(options['requests']):
+                    t0 = time.perf_counter()
+                    self.request(url)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+
+                workers = self.wait_for_workers(server, options['workers'], options['timeout'])
+                memory = [usage for usage in map(_memory_kb, workers) if usage]
+                master = _memory_kb(server.pid)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+
+        latencies = np.asarray(latencies)
+        return {
+            'time_to_first_response_ms': round(first_response_ms, 1),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            'max_ms': round(float(latencies.max()), 2) if len(latencies) else None,
+            'master': master,
+            'worker_count': len(workers),
+            'worker_rss_kb': int(np.mean([usage['rss_kb'] for usage in memory])) if memory else None,
+            'worker_pss_kb': int(np.mean([usage['pss_kb'] for usage in memory])) if memory else None,
+            'worker_uss_kb': int(np.mean([usage['uss_kb'] for usage in memory])) if memory else None,
+        }
+
+    def request(self, url):
+        """Requests the URL; any HTTP status counts as served."""
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                response.read()
+        except urllib.error.HTTPError:
+            pass
+
+    def wait_for_workers(self, server, count, timeout):
+        """Waits until gunicorn has forked `count` workers (gunicorn staggers them); returns their pids."""
+        deadline = time.perf_counter() + timeout
+        workers = _children(server.pid)
+        while len(workers) < count and time.perf_counter() < deadline:
+            time.sleep(0.05)
+            workers = _children(server.pid)
+        return workers
+
+    def wait_for_response(self, url, server, started, timeout, log):
+        """Polls until the server answers; returns the milliseconds since it was started."""
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"gunicorn exited with {server.returncode}:\n{log.read().decode(errors='replace')[-2000:]}")
+            try:
+                self.request(url)
+                return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise CommandError(f"No response from gunicorn within {timeout} seconds")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from telemetry import clustering
+from telemetry.models import GroupedError
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes MinHash signatures for error groups from their first error, so new "
+        "near-duplicates can join them. Migrations sign existing groups; use --all to "
+        "re-sign every group after the fingerprint rules change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', help="Only index the groups of this project id.")
+        parser.add_argument('--all', action='store_true', help="Also re-sign groups that already have a signature.")
+
+    def handle(self, *args, **options):
+        groups = GroupedError.objects.all()
+        if not options['all']:
+            groups = groups.filter(signature=b'')
+        if options['project']:
+            groups = groups.filter(project_id=options['project'])
+
+        indexed = 0
+        for group in groups.only('id', 'project_id', 'error_type', 'error_message', 'traceback').iterator():
+            fingerprint = clustering.fingerprint(group.error_type, group.error_message, group.traceback)
+            clustering.index_group(group, clustering.signature(fingerprint))
+            indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} error groups."))
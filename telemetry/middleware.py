@@ -0,0 +1,135 @@
+# telemetry/middleware.py
+
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished
+from django.db import connections
+
+from . import replicas
+from .buffer import ingest_buffer
+from .models import Project
+from .normalization import template_from_route
+
+
+UNMATCHED_ROUTE = '__unmatched__'
+
+_internal_project_id = None
+
+
+def get_internal_project_id():
+    """Returns the id of the reserved project Pensieve records itself into, creating it on first use."""
+    global _internal_project_id
+    if _internal_project_id is None:
+        # Ownerless names are unique, so processes racing to create it end up with the same row.
+        project, _ = Project.objects.get_or_create(owner=None, name=settings.DOGFOOD_PROJECT_NAME)
+        _internal_project_id = project.id
+    return _internal_project_id
+
+
+def _flush_if_due(**kwargs):
+    # Runs once the response has been handed to the server, so flushing adds no client latency.
+    if ingest_buffer.is_due():
+        ingest_buffer.flush()
+
+
+class QueryTimer:
+    """Database execute wrapper that adds up the number and duration of the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class DogfoodMiddleware:
+    """
+    Records Pensieve's own request timings and unhandled exceptions into the
+    reserved internal project, so slow paths show up in TopEndpointsView and
+    errors in the usual grouping. Timings include the request's database time
+    and query count as a time breakdown. Events go straight to the in-process
+    ingest buffer. Enabled with DOGFOOD_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DOGFOOD_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.excluded_prefixes = tuple(settings.DOGFOOD_EXCLUDED_PATHS)
+        request_finished.connect(_flush_if_due, dispatch_uid='telemetry.dogfood.flush')
+
+    def __call__(self, request):
+        if request.path.startswith(self.excluded_prefixes):
+            return self.get_response(request)
+
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            response = self.get_response(request)
+        duration_ms = int((time.perf_counter() - started) * 1000)
+
+        ingest_buffer.add_performance(get_internal_project_id(), {
+            'url': self.route(request),
+            'method': request.method,
+            'status_code': response.status_code,
+            'duration_ms': duration_ms,
+            'db_ms': int(queries.seconds * 1000),
+            'db_queries': queries.count,
+        })
+        return response
+
+    def process_exception(self, request, exception):
+        ingest_buffer.add_error(get_internal_project_id(), {
+            'url': self.route(request),
+            'method': request.method,
+            'error_type': type(exception).__name__,
+            'error_message': str(exception),
+            'traceback': traceback.format_exc(),
+        })
+
+    def route(self, request):
+        """Uses the matched URL pattern, so /api/pensieve/errors/abc/ is recorded as /api/pensieve/errors/{group_hash}/."""
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.route:
+            return template_from_route(match.route)
+        # Unmatched paths (404s from scanners and typos) share one series to keep cardinality bounded.
+        return UNMATCHED_ROUTE
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the reads of safe requests go to a read replica (see
+    telemetry/replicas.py). Clients that recently wrote carry a cookie that
+    pins their reads to the primary. Enabled when DB_REPLICA_HOSTS is set.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not settings.DB_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allow_replica = request.method in self.SAFE_METHODS and replicas.PIN_COOKIE not in request.COOKIES
+        with replicas.request_scope(allow_replica) as scope:
+            response = self.get_response(request)
+
+        if scope.wrote:
+            response.set_cookie(
+                replicas.PIN_COOKIE, '1',
+                max_age=settings.DB_REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
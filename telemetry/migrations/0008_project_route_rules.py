@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0007_aggregatedmetric_url_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='route_rules',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:40
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def link_metrics_to_endpoints(apps, schema_editor):
+    """Creates an endpoint for every URL that already has aggregated metrics."""
+    AggregatedMetric = apps.get_model('telemetry', 'AggregatedMetric')
+    Endpoint = apps.get_model('telemetry', 'Endpoint')
+
+    # Metrics were never split by method, so existing series get an empty method.
+    for item in AggregatedMetric.objects.values('project_id', 'url').distinct():
+        endpoint, _ = Endpoint.objects.get_or_create(
+            project_id=item['project_id'], method='', path=item['url']
+        )
+        AggregatedMetric.objects.filter(
+            project_id=item['project_id'], url=item['url']
+        ).update(endpoint=endpoint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0008_project_route_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Endpoint',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('method', models.CharField(blank=True, max_length=10)),
+                ('path', models.CharField(max_length=2048)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='aggregatedmetric',
+            name='aggmetric_url_trgm',
+        ),
+        migrations.AddField(
+            model_name='endpoint',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='endpoints', to='telemetry.project'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='aggregatedmetric',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='aggregatedmetric',
+            name='endpoint',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='telemetry.endpoint'),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='endpoint',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='error_logs', to='telemetry.endpoint'),
+        ),
+        migrations.AddField(
+            model_name='groupederror',
+            name='endpoint',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grouped_errors', to='telemetry.endpoint'),
+        ),
+        migrations.AddField(
+            model_name='performancelog',
+            name='endpoint',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_logs', to='telemetry.endpoint'),
+        ),
+        migrations.AddIndex(
+            model_name='endpoint',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('path'), name='gin_trgm_ops'), name='endpoint_path_trgm'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='endpoint',
+            unique_together={('project', 'method', 'path')},
+        ),
+        migrations.RunPython(link_metrics_to_endpoints, migrations.RunPython.noop),
+    ]
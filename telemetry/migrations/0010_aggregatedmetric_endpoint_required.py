@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0009_endpoint'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='aggregatedmetric',
+            name='url',
+        ),
+        migrations.AlterField(
+            model_name='aggregatedmetric',
+            name='endpoint',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='telemetry.endpoint'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='aggregatedmetric',
+            unique_together={('project', 'endpoint', 'timestamp')},
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:42
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0010_aggregatedmetric_endpoint_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField(db_index=True)),
+                ('version', models.PositiveSmallIntegerField(default=1)),
+                ('count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to='telemetry.endpoint')),
+            ],
+            options={
+                'ordering': ['-minute'],
+                'unique_together': {('endpoint', 'minute')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PerformanceSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.PositiveIntegerField()),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='telemetry.endpoint')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [django.contrib.postgres.indexes.BrinIndex(fields=['timestamp'], name='perfsample_timestamp_brin')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0011_compact_performance_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesBaseline',
+            fields=[
+                ('endpoint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='baseline', serialize=False, to='telemetry.endpoint')),
+                ('mean', models.FloatField()),
+                ('variance', models.FloatField(default=0)),
+                ('windows', models.PositiveIntegerField(default=1)),
+                ('last_window', models.DateTimeField()),
+                ('in_regression', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RegressionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('regression', 'Regression'), ('recovery', 'Recovery')], max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('p95_duration_ms', models.PositiveIntegerField()),
+                ('baseline_p95_ms', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regression_events', to='telemetry.endpoint')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regression_events', to='telemetry.project')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['project', '-timestamp'], name='telemetry_r_project_418d7a_idx')],
+            },
+        ),
+    ]
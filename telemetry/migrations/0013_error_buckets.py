@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0012_regression_detection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErrorBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(60, 'Minute'), (3600, 'Hour')])),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='telemetry.groupederror')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket_start'], name='telemetry_e_resolut_4f5bb1_idx')],
+                'unique_together': {('group', 'resolution', 'bucket_start')},
+            },
+        ),
+    ]
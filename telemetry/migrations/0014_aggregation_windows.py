@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0013_error_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(unique=True)),
+                ('watermark', models.DateTimeField()),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('series_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-start'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0014_aggregation_windows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionCheckpoint',
+            fields=[
+                ('table', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(null=True)),
+                ('pass_started_at', models.DateTimeField(null=True)),
+                ('pass_deleted', models.PositiveBigIntegerField(default=0)),
+                ('last_completed_at', models.DateTimeField(null=True)),
+                ('last_pass_deleted', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='retention_policies',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
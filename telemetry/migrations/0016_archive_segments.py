@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:08
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0015_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('performance', 'Performance'), ('errors', 'Errors')], max_length=20)),
+                ('day', models.DateField()),
+                ('row_count', models.PositiveBigIntegerField(default=0)),
+                ('segment_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('performance', 'Performance'), ('errors', 'Errors')], max_length=20)),
+                ('day', models.DateField()),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('endpoint_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, size=None)),
+                ('path', models.CharField(max_length=1024)),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_segments', to='telemetry.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'kind', 'start'], name='telemetry_a_project_f609ab_idx')],
+                'unique_together': {('project', 'kind', 'day')},
+            },
+        ),
+    ]
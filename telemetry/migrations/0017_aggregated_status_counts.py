@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0016_archive_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aggregatedmetric',
+            name='status_2xx_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aggregatedmetric',
+            name='status_3xx_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aggregatedmetric',
+            name='status_4xx_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aggregatedmetric',
+            name='status_5xx_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
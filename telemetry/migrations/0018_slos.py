@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0017_aggregated_status_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceLevelObjective',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('latency', 'Latency'), ('availability', 'Availability')], max_length=20)),
+                ('threshold_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('target', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('endpoint', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='slos', to='telemetry.endpoint')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slos', to='telemetry.project')),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('project', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ThresholdCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('threshold_ms', models.PositiveIntegerField()),
+                ('satisfied_count', models.PositiveIntegerField(default=0)),
+                ('tolerating_count', models.PositiveIntegerField(default=0)),
+                ('frustrated_count', models.PositiveIntegerField(default=0)),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='threshold_counts', to='telemetry.endpoint')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='threshold_counts', to='telemetry.project')),
+            ],
+            options={
+                'unique_together': {('endpoint', 'threshold_ms', 'timestamp')},
+            },
+        ),
+    ]
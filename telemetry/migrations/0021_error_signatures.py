@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0020_project_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupederror',
+            name='signature',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.CreateModel(
+            name='ErrorSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='telemetry.groupederror')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='error_signature_bands', to='telemetry.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'bucket'], name='telemetry_e_project_788708_idx')],
+                'unique_together': {('group', 'band')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:27
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def index_existing_groups(apps, schema_editor):
+    """Copies each group's first message and traceback onto it and builds its search vector."""
+    ErrorLog = apps.get_model('telemetry', 'ErrorLog')
+    GroupedError = apps.get_model('telemetry', 'GroupedError')
+
+    first = ErrorLog.objects.filter(group_id=OuterRef('id')).order_by('id')
+    GroupedError.objects.update(
+        error_message=Coalesce(Subquery(first.values('error_message')[:1]), Value('')),
+        traceback=Coalesce(Subquery(first.values('traceback')[:1]), Value('')),
+    )
+    GroupedError.objects.update(search_vector=(
+        SearchVector('error_type', weight='A', config='simple')
+        + SearchVector('error_message', weight='B', config='simple')
+        + SearchVector('traceback', weight='C', config='simple')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0021_error_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupederror',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='groupederror',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.AddField(
+            model_name='groupederror',
+            name='traceback',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='groupederror',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='groupederror_search_gin'),
+        ),
+        migrations.RunPython(index_existing_groups, migrations.RunPython.noop),
+    ]
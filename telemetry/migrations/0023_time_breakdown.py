@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0022_error_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performancelog',
+            name='cache_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='performancelog',
+            name='db_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='performancelog',
+            name='db_queries',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='performancelog',
+            name='external_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='performancesample',
+            name='cache_ms',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='performancesample',
+            name='db_ms',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='performancesample',
+            name='db_queries',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='performancesample',
+            name='external_ms',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.CreateModel(
+            name='TimeBreakdown',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('db_avg_ms', models.FloatField(null=True)),
+                ('db_p95_ms', models.PositiveIntegerField(null=True)),
+                ('db_queries_avg', models.FloatField(null=True)),
+                ('db_queries_p95', models.PositiveIntegerField(null=True)),
+                ('cache_avg_ms', models.FloatField(null=True)),
+                ('cache_p95_ms', models.PositiveIntegerField(null=True)),
+                ('external_avg_ms', models.FloatField(null=True)),
+                ('external_p95_ms', models.PositiveIntegerField(null=True)),
+                ('app_avg_ms', models.FloatField(null=True)),
+                ('app_p95_ms', models.PositiveIntegerField(null=True)),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_breakdowns', to='telemetry.endpoint')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_breakdowns', to='telemetry.project')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'unique_together': {('endpoint', 'timestamp')},
+            },
+        ),
+    ]
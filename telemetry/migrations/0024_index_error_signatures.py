@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def index_existing_groups(apps, schema_editor):
+    """
+    Signs every group from its first error (copied onto it by 0022). Groups
+    created before similarity grouping have no signature, and the exact
+    fingerprint hash changed, so without this their recurring errors would
+    start new groups instead of joining them.
+    """
+    from telemetry import clustering
+
+    GroupedError = apps.get_model('telemetry', 'GroupedError')
+    ErrorSignatureBand = apps.get_model('telemetry', 'ErrorSignatureBand')
+
+    ErrorSignatureBand.objects.all().delete()
+    groups = GroupedError.objects.only('id', 'project_id', 'error_type', 'error_message', 'traceback').order_by('id')
+    signed, bands = [], []
+    for group in groups.iterator(chunk_size=1000):
+        signature = clustering.signature(clustering.fingerprint(group.error_type, group.error_message, group.traceback))
+        group.signature = clustering.pack(signature)
+        signed.append(group)
+        bands += [
+            ErrorSignatureBand(project_id=group.project_id, group_id=group.id, band=band, bucket=bucket)
+            for band, bucket in enumerate(clustering.band_buckets(signature))
+        ]
+        if len(signed) == 1000:
+            GroupedError.objects.bulk_update(signed, ['signature'])
+            ErrorSignatureBand.objects.bulk_create(bands)
+            signed, bands = [], []
+    GroupedError.objects.bulk_update(signed, ['signature'])
+    ErrorSignatureBand.objects.bulk_create(bands)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0023_time_breakdown'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_existing_groups, migrations.RunPython.noop),
+    ]
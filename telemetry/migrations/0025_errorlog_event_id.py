@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0024_index_error_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='errorlog',
+            name='event_id',
+            field=models.UUIDField(editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+def mark_finished_windows_scored(apps, schema_editor):
+    """Finished windows were scored as they were finalized; only later ones are left to score."""
+    AggregationWindow = apps.get_model('telemetry', 'AggregationWindow')
+    AggregationWindow.objects.filter(runs__gt=0).update(scored=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0025_errorlog_event_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aggregationwindow',
+            name='scored',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_finished_windows_scored, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_ownerless_projects(apps, schema_editor):
+    """Keeps the oldest ownerless project of each name and suffixes the others with their id."""
+    Project = apps.get_model('telemetry', 'Project')
+    duplicated = (
+        Project.objects.filter(owner__isnull=True)
+        .values('name').annotate(copies=Count('id')).filter(copies__gt=1)
+        .values_list('name', flat=True)
+    )
+    for name in list(duplicated):
+        for project in Project.objects.filter(owner__isnull=True, name=name).order_by('created_at')[1:]:
+            project.name = f"{name[:190]} ({str(project.id)[:8]})"
+            project.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0026_aggregationwindow_scored'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_ownerless_projects, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='project',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True)), fields=('name',), name='unique_ownerless_project_name'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:10
+
+from django.db import migrations
+from django.db.models.functions import Upper
+
+
+def upper_case_endpoint_methods(apps, schema_editor):
+    """
+    Upper-cases the methods of endpoints recorded as the client sent them.
+    An endpoint whose upper-case twin already exists keeps its method; lookups
+    compare methods case insensitively, so both stay reachable.
+    """
+    Endpoint = apps.get_model('telemetry', 'Endpoint')
+    mixed = Endpoint.objects.exclude(method=Upper('method')).order_by('id')
+    for endpoint in mixed.iterator(chunk_size=1000):
+        method = endpoint.method.upper()
+        twin = Endpoint.objects.filter(project_id=endpoint.project_id, path=endpoint.path, method=method)
+        if not twin.exists():
+            Endpoint.objects.filter(id=endpoint.id).update(method=method)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0027_unique_ownerless_project_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(upper_case_endpoint_methods, migrations.RunPython.noop),
+    ]
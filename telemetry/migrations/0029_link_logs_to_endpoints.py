@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+from django.db import migrations
+
+
+def link_logs_to_endpoints(apps, schema_editor):
+    """
+    Links performance logs and error groups recorded without an endpoint to
+    one, so their url columns can be dropped: performance logs by their own
+    method and url, groups by their url and the method of their latest error.
+    """
+    Endpoint = apps.get_model('telemetry', 'Endpoint')
+    ErrorLog = apps.get_model('telemetry', 'ErrorLog')
+    GroupedError = apps.get_model('telemetry', 'GroupedError')
+    PerformanceLog = apps.get_model('telemetry', 'PerformanceLog')
+
+    unlinked = PerformanceLog.objects.filter(endpoint__isnull=True)
+    for item in list(unlinked.values('project_id', 'method', 'url').distinct()):
+        endpoint, _ = Endpoint.objects.get_or_create(
+            project_id=item['project_id'], method=item['method'].upper(), path=item['url'],
+        )
+        unlinked.filter(project_id=item['project_id'], method=item['method'], url=item['url']).update(endpoint=endpoint)
+
+    for group in GroupedError.objects.filter(endpoint__isnull=True).only('id', 'project_id', 'url').iterator():
+        method = (
+            ErrorLog.objects.filter(group_id=group.id).order_by('-timestamp')
+            .values_list('method', flat=True).first()
+        )
+        endpoint, _ = Endpoint.objects.get_or_create(
+            project_id=group.project_id, method=(method or '').upper(), path=group.url,
+        )
+        GroupedError.objects.filter(id=group.id).update(endpoint=endpoint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0028_upper_case_endpoint_methods'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_logs_to_endpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0029_link_logs_to_endpoints'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='performancelog',
+            name='url',
+        ),
+        migrations.RemoveField(
+            model_name='performancelog',
+            name='method',
+        ),
+        migrations.RemoveField(
+            model_name='groupederror',
+            name='url',
+        ),
+        migrations.AlterField(
+            model_name='performancelog',
+            name='endpoint',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_logs', to='telemetry.endpoint'),
+        ),
+        migrations.AlterField(
+            model_name='groupederror',
+            name='endpoint',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grouped_errors', to='telemetry.endpoint'),
+        ),
+    ]
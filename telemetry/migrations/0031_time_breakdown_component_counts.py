@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:57
+
+from django.db import migrations, models
+from django.db.models import F
+
+AVERAGES = {
+    'db_count': 'db_avg_ms',
+    'db_queries_count': 'db_queries_avg',
+    'cache_count': 'cache_avg_ms',
+    'external_count': 'external_avg_ms',
+}
+
+
+def count_existing_components(apps, schema_editor):
+    """
+    Existing rows only know how many requests reported any component, so that
+    count stands in for each component they have an average for.
+    backfill_aggregates recomputes exact counts while raw data is retained.
+    """
+    TimeBreakdown = apps.get_model('telemetry', 'TimeBreakdown')
+    for count_field, avg_field in AVERAGES.items():
+        TimeBreakdown.objects.filter(**{f'{avg_field}__isnull': False}).update(**{count_field: F('sample_count')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0030_drop_redundant_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timebreakdown',
+            name='cache_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timebreakdown',
+            name='db_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timebreakdown',
+            name='db_queries_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timebreakdown',
+            name='external_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_components, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 import uuid
 
@@ -8,20 +12,58 @@ class Project(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="projects", null=True, blank=True)
     name = models.CharField(max_length=200)
     api_key = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    # Ordered list of {"pattern": <regex>, "template": <route>} used to normalize URLs at ingest.
+    route_rules = models.JSONField(default=list, blank=True)
+    # Per-table retention overrides in days, e.g. {"performance_logs": 7}; see RETENTION_DAYS.
+    retention_policies = models.JSONField(default=dict, blank=True)
+    # Bumped when aggregation writes the project's metrics or a new error group appears; keys cached overviews.
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = [['owner', 'name']]
+        constraints = [
+            # unique_together does not cover a NULL owner, e.g. the internal dogfooding project.
+            models.UniqueConstraint(fields=['name'], condition=models.Q(owner__isnull=True), name='unique_ownerless_project_name'),
+        ]
         ordering = ['-created_at']
 
     def __str__(self):
         return f"{self.name}: {self.api_key}"
 
+class Endpoint(models.Model):
+    """
+    A normalized route (method + path template) seen for a project.
+    Telemetry rows reference it through a small integer key instead of
+    repeating the URL string.
+    """
+    # Special path used for the project-wide series; it is stored with an empty method.
+    OVERALL = "__overall__"
+
+    id = models.AutoField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="endpoints")
+    method = models.CharField(max_length=10, blank=True)
+    path = models.CharField(max_length=2048)
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [['project', 'method', 'path']]
+        indexes = [
+            # Trigram index over UPPER(path) so `icontains`/`istartswith` searches
+            # (which Django compiles to UPPER(path) LIKE UPPER(...)) can use it.
+            GinIndex(OpClass(Upper('path'), name='gin_trgm_ops'), name='endpoint_path_trgm'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path}".strip()
+
 class ErrorLog(models.Model):
     """A single raw error event captured from a client."""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="error_logs")
     group = models.ForeignKey('GroupedError', on_delete=models.CASCADE, related_name="instances", null=True)
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="error_logs", null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # The concrete URL of the failing request; its route is the endpoint's path
     url = models.CharField(max_length=2048)
     method = models.CharField(max_length=10)
     error_type = models.CharField(max_length=255)
@@ -30,19 +72,26 @@ class ErrorLog(models.Model):
     
     # This field is for a future feature: grouping similar errors together.
     group_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Assigned at ingest, so a redelivered task does not record the error twice
+    event_id = models.UUIDField(null=True, unique=True, editable=False)
 
     class Meta:
         ordering = ['-timestamp']
 
 class PerformanceLog(models.Model):
-    """A single raw performance data point for a request."""
+    """A single raw performance data point for a request. Its route and method are the endpoint's."""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="performance_logs")
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="performance_logs")
     timestamp = models.DateTimeField(auto_now_add=True)
-    url = models.CharField(max_length=2048)
-    method = models.CharField(max_length=10)
     status_code = models.PositiveIntegerField()
     duration_ms = models.PositiveIntegerField()
 
+    # Optional breakdown of duration_ms reported by the client (see telemetry/breakdown.py)
+    db_ms = models.PositiveIntegerField(null=True, blank=True)
+    db_queries = models.PositiveIntegerField(null=True, blank=True)
+    cache_ms = models.PositiveIntegerField(null=True, blank=True)
+    external_ms = models.PositiveIntegerField(null=True, blank=True)
+
     class Meta:
         ordering = ['-timestamp']
 
@@ -50,24 +99,64 @@ class PerformanceLog(models.Model):
 class GroupedError(models.Model):
     """Represents a group of identical errors."""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="grouped_errors")
+    # The endpoint of the group's first error; its path is the route the group is keyed on
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="grouped_errors")
     group_hash = models.CharField(max_length=64, unique=True)
-    url = models.CharField(max_length=2048)
     error_type = models.CharField(max_length=255)
     last_seen = models.DateTimeField(auto_now=True)
     first_seen = models.DateTimeField(auto_now_add=True)
     count = models.PositiveIntegerField(default=1)
+    # Message and traceback of the group's first error, for search highlights
+    error_message = models.TextField(blank=True)
+    traceback = models.TextField(blank=True)
+    # Packed MinHash signature of the group's first error (see telemetry/clustering.py)
+    signature = models.BinaryField(default=b'')
+    # Words of the group's errors, kept up to date at ingest (see telemetry/fulltext.py)
+    search_vector = SearchVectorField(null=True)
     
     class Meta:
         ordering = ['-last_seen']
+        indexes = [GinIndex(fields=['search_vector'], name='groupederror_search_gin')]
 
     def __str__(self):
         return f"{self.error_type} (seen {self.count} times)"
 
 
+class ErrorSignatureBand(models.Model):
+    """One LSH band bucket of a grouped error's MinHash signature, for finding near-duplicate groups."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="error_signature_bands")
+    group = models.ForeignKey(GroupedError, on_delete=models.CASCADE, related_name="signature_bands")
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['group', 'band']
+        indexes = [models.Index(fields=['project', 'bucket'])]
+
+
+class ErrorBucket(models.Model):
+    """Occurrences of a grouped error within one minute or one hour."""
+    MINUTE = 60
+    HOUR = 3600
+    RESOLUTION_CHOICES = [(MINUTE, 'Minute'), (HOUR, 'Hour')]
+
+    group = models.ForeignKey(GroupedError, on_delete=models.CASCADE, related_name="buckets")
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES) # Bucket width in seconds
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['group', 'resolution', 'bucket_start']
+        indexes = [models.Index(fields=['resolution', 'bucket_start'])]
+
+    def __str__(self):
+        return f"{self.group_id} @ {self.bucket_start.strftime('%Y-%m-%d %H:%M')}: {self.count}"
+
+
 class AggregatedMetric(models.Model):
     """Stores aggregated performance metrics for a specific endpoint in a time window."""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="metrics")
-    url = models.CharField(max_length=2048, db_index=True)
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="metrics")
     timestamp = models.DateTimeField(db_index=True) # The start of the aggregation window
 
     request_count = models.PositiveIntegerField(default=0)
@@ -75,9 +164,256 @@ class AggregatedMetric(models.Model):
     p50_duration_ms = models.PositiveIntegerField(default=0) # Median
     p95_duration_ms = models.PositiveIntegerField(default=0) # 95th Percentile
 
+    # Requests per status class; 1xx and out-of-range codes are only in request_count
+    status_2xx_count = models.PositiveIntegerField(default=0)
+    status_3xx_count = models.PositiveIntegerField(default=0)
+    status_4xx_count = models.PositiveIntegerField(default=0)
+    status_5xx_count = models.PositiveIntegerField(default=0)
+
+    # Durations counted into fixed log-scale buckets (see telemetry/histograms.py); empty for older windows
+    histogram = models.BinaryField(default=b'')
+
+    class Meta:
+        ordering = ['-timestamp']
+        unique_together = ['project', 'endpoint', 'timestamp'] # Ensures one record per window
+
+    def __str__(self):
+        return f"{self.endpoint} @ {self.timestamp.strftime('%Y-%m-%d %H:%M')}"        
+
+class AggregationWindow(models.Model):
+    """
+    Bookkeeping for one aligned aggregation window. Raw data ingested before
+    `watermark` has been folded into the window's AggregatedMetric rows.
+    """
+    start = models.DateTimeField(unique=True)
+    watermark = models.DateTimeField()
+    runs = models.PositiveIntegerField(default=0) # Times the window has been (re-)aggregated
+    scored = models.BooleanField(default=False) # Scored by regression detection (see telemetry/anomaly.py)
+    sample_count = models.PositiveIntegerField(default=0)
+    series_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-start']
+
+    def __str__(self):
+        return f"Window @ {self.start.strftime('%Y-%m-%d %H:%M')} (watermark {self.watermark.strftime('%H:%M:%S')})"
+
+class PerformanceSample(models.Model):
+    """
+    A narrow raw performance data point, written instead of PerformanceLog
+    when PERFORMANCE_STORAGE is 'compact'. The project, method and URL all
+    live on the endpoint, so a row is just (time, endpoint, status, duration).
+    """
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="samples")
+    timestamp = models.DateTimeField(auto_now_add=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.PositiveIntegerField()
+    db_ms = models.PositiveIntegerField(null=True)
+    db_queries = models.PositiveIntegerField(null=True)
+    cache_ms = models.PositiveIntegerField(null=True)
+    external_ms = models.PositiveIntegerField(null=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            # Samples are appended in time order, so a BRIN index covers window scans in a few pages.
+            BrinIndex(fields=['timestamp'], name='perfsample_timestamp_brin'),
+        ]
+
+
+class PerformanceBlock(models.Model):
+    """
+    One minute of an endpoint's compact samples, packed into compressed
+    column arrays by the compaction task (see telemetry.storage).
+    """
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="blocks")
+    minute = models.DateTimeField(db_index=True) # The start of the minute
+    version = models.PositiveSmallIntegerField(default=1) # Column layout of `data`
+    count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['-minute']
+        unique_together = ['endpoint', 'minute']
+
+    def __str__(self):
+        return f"{self.endpoint} @ {self.minute.strftime('%Y-%m-%d %H:%M')} ({self.count} samples)"
+
+
+class SeriesBaseline(models.Model):
+    """
+    Rolling baseline of an endpoint's p95 latency series, kept as an EWMA of
+    log(p95) and its variance so detection never has to re-read history.
+    """
+    endpoint = models.OneToOneField(Endpoint, on_delete=models.CASCADE, primary_key=True, related_name="baseline")
+    mean = models.FloatField()
+    variance = models.FloatField(default=0)
+    windows = models.PositiveIntegerField(default=1) # Windows folded into the baseline
+    last_window = models.DateTimeField() # Newest window already evaluated
+    in_regression = models.BooleanField(default=False)
+
+
+class RegressionEvent(models.Model):
+    """A detected start (regression) or end (recovery) of elevated p95 latency on an endpoint."""
+    REGRESSION = 'regression'
+    RECOVERY = 'recovery'
+    KIND_CHOICES = [(REGRESSION, 'Regression'), (RECOVERY, 'Recovery')]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="regression_events")
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="regression_events")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    timestamp = models.DateTimeField() # The aggregation window that triggered the event
+    p95_duration_ms = models.PositiveIntegerField()
+    baseline_p95_ms = models.PositiveIntegerField()
+    score = models.FloatField() # Deviation from the baseline in standard deviations
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [models.Index(fields=['project', '-timestamp'])]
+
+    def __str__(self):
+        return f"{self.kind} on {self.endpoint} @ {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+
+class RetentionCheckpoint(models.Model):
+    """Progress of the retention engine's current pass over one table, so interrupted passes resume."""
+    table = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(null=True) # Next primary key to scan; null when no pass is in progress
+    pass_started_at = models.DateTimeField(null=True)
+    pass_deleted = models.PositiveBigIntegerField(default=0) # Rows deleted so far in the current pass
+    last_completed_at = models.DateTimeField(null=True)
+    last_pass_deleted = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.table} @ {self.position}"
+
+
+
+class ArchiveSegment(models.Model):
+    """
+    Index entry for one compressed, columnar file of archived raw telemetry:
+    one project's performance samples or errors for one day (see telemetry/archive.py).
+    """
+    PERFORMANCE = 'performance'
+    ERRORS = 'errors'
+    KIND_CHOICES = [(PERFORMANCE, 'Performance'), (ERRORS, 'Errors')]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="archive_segments")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    day = models.DateField()
+    start = models.DateTimeField() # Oldest row in the segment
+    end = models.DateTimeField() # Newest row in the segment
+    row_count = models.PositiveIntegerField()
+    endpoint_ids = ArrayField(models.IntegerField(), default=list)
+    path = models.CharField(max_length=1024) # Relative to ARCHIVE_ROOT
+    size_bytes = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['project', 'kind', 'day']
+        indexes = [models.Index(fields=['project', 'kind', 'start'])]
+
+    def __str__(self):
+        return f"{self.kind} {self.project_id} {self.day} ({self.row_count} rows)"
+
+
+class ArchiveDay(models.Model):
+    """Marks a day of one kind of raw telemetry as fully archived, for every project."""
+    kind = models.CharField(max_length=20, choices=ArchiveSegment.KIND_CHOICES)
+    day = models.DateField()
+    row_count = models.PositiveBigIntegerField(default=0)
+    segment_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['kind', 'day']
+
+    def __str__(self):
+        return f"{self.kind} {self.day}"
+
+
+class ServiceLevelObjective(models.Model):
+    """
+    A latency ("99% of requests within 300 ms") or availability ("99.9% of
+    requests without a 5xx") objective for one endpoint, or the whole
+    project when `endpoint` is empty (see telemetry/slo.py).
+    """
+    LATENCY = 'latency'
+    AVAILABILITY = 'availability'
+    KIND_CHOICES = [(LATENCY, 'Latency'), (AVAILABILITY, 'Availability')]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="slos")
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="slos", null=True, blank=True)
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    threshold_ms = models.PositiveIntegerField(null=True, blank=True) # Latency objectives only
+    target = models.FloatField() # Fraction of good requests, e.g. 0.99
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ['project', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.project})"
+
+
+class ThresholdCount(models.Model):
+    """
+    Apdex-style counts of one endpoint's requests in one aggregation window
+    against a latency threshold T: satisfied (<= T), tolerating (<= 4T) and
+    frustrated (> 4T). Written by aggregation for every threshold in use.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="threshold_counts")
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="threshold_counts")
+    timestamp = models.DateTimeField(db_index=True) # The start of the aggregation window
+    threshold_ms = models.PositiveIntegerField()
+    satisfied_count = models.PositiveIntegerField(default=0)
+    tolerating_count = models.PositiveIntegerField(default=0)
+    frustrated_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['endpoint', 'threshold_ms', 'timestamp']
+
+    def __str__(self):
+        return f"{self.endpoint} @ {self.timestamp.strftime('%Y-%m-%d %H:%M')} (T={self.threshold_ms}ms)"
+
+
+class TimeBreakdown(models.Model):
+    """
+    Where one endpoint's time went in one aggregation window, rolled up from
+    the optional breakdowns clients report with performance events: average
+    and p95 of DB time, query count, cache time, external-call time and the
+    remaining application time, each with the number of requests that
+    reported it. Components no request reported are null; windows without any
+    breakdown have no row.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="time_breakdowns")
+    endpoint = models.ForeignKey(Endpoint, on_delete=models.CASCADE, related_name="time_breakdowns")
+    timestamp = models.DateTimeField(db_index=True) # The start of the aggregation window
+    sample_count = models.PositiveIntegerField(default=0) # Requests that reported a breakdown
+
+    db_count = models.PositiveIntegerField(default=0)
+    db_avg_ms = models.FloatField(null=True)
+    db_p95_ms = models.PositiveIntegerField(null=True)
+    db_queries_count = models.PositiveIntegerField(default=0)
+    db_queries_avg = models.FloatField(null=True)
+    db_queries_p95 = models.PositiveIntegerField(null=True)
+    cache_count = models.PositiveIntegerField(default=0)
+    cache_avg_ms = models.FloatField(null=True)
+    cache_p95_ms = models.PositiveIntegerField(null=True)
+    external_count = models.PositiveIntegerField(default=0)
+    external_avg_ms = models.FloatField(null=True)
+    external_p95_ms = models.PositiveIntegerField(null=True)
+    # The application time is derived for every request counted in sample_count
+    app_avg_ms = models.FloatField(null=True)
+    app_p95_ms = models.PositiveIntegerField(null=True)
+
     class Meta:
         ordering = ['-timestamp']
-        unique_together = ['project', 'url', 'timestamp'] # Ensures one record per window
+        unique_together = ['endpoint', 'timestamp']
 
     def __str__(self):
-        return f"{self.url} @ {self.timestamp.strftime('%Y-%m-%d %H:%M')}"        
\ No newline at end of file
+        return f"{self.endpoint} @ {self.timestamp.strftime('%Y-%m-%d %H:%M')} ({self.sample_count} breakdowns)"
@@ -0,0 +1,59 @@
+# telemetry/normalization.py
+
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Segments that are replaced automatically, checked in this order.
+# Hex segments must be long and contain a digit so words like "cafe" survive.
+AUTO_SEGMENT_PATTERNS = [
+    (re.compile(r'^\d+$'), '{id}'),
+    (re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'), '{uuid}'),
+    (re.compile(r'^(?=[^/]*\d)[0-9a-fA-F]{12,}$'), '{hex}'),
+]
+
+
+@lru_cache(maxsize=1024)
+def compile_rule(pattern):
+    """Compile (and cache) a project route rule pattern."""
+    return re.compile(pattern)
+
+
+def normalize_url(url, rules=None):
+    """
+    Turns a concrete request URL into its route template.
+
+    The scheme, host, query string and fragment are dropped. Project rules
+    (a list of {"pattern": ..., "template": ...} dicts) are tried first and the
+    first full match wins; otherwise numeric, UUID and long hex path segments
+    are replaced with placeholders, e.g. /users/123/orders/456 becomes
+    /users/{id}/orders/{id}.
+    """
+    if not url:
+        return url
+
+    path = urlsplit(url).path or '/'
+
+    for rule in rules or []:
+        if compile_rule(rule['pattern']).fullmatch(path):
+            return rule['template']
+
+    segments = path.split('/')
+    for i, segment in enumerate(segments):
+        for pattern, placeholder in AUTO_SEGMENT_PATTERNS:
+            if pattern.match(segment):
+                segments[i] = placeholder
+                break
+
+    return '/'.join(segments)
+
+
+def template_from_route(route):
+    """
+    Turns a Django URL pattern string (ResolverMatch.route) into a route
+    template: path converters like <str:group_hash> and regex groups like
+    (?P<group_hash>[^/.]+) both become {group_hash}.
+    """
+    route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', route)
+    route = re.sub(r'<(?:\w+:)?(\w+)>', r'{\1}', route)
+    return '/' + route.replace('^', '').replace('$', '').lstrip('/')
@@ -0,0 +1,193 @@
+# telemetry/overview.py
+
+"""
+The project overview the dashboard renders first, built in one pass.
+
+Four queries cover everything: the project-wide `__overall__` series for
+the period (from which the headline numbers are derived, including a p95
+over the whole period from the summed histograms), the slowest endpoints,
+and the error groups with the most occurrences in the period (ranked from
+the hourly ErrorBuckets, then loaded). Results are cached per
+Project.data_version, which aggregation and new error groups bump, so a
+cached overview is replaced as soon as there is something new to show and
+otherwise expires after OVERVIEW_CACHE_SECONDS.
+
+The owner overview summarizes every project of one user (latest window,
+errors and top error of the last PERIOD) in a fixed number of grouped
+queries, however many projects the user has.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Sum
+
+from . import aggregation, error_rates, histograms
+from .models import AggregatedMetric, Endpoint, ErrorBucket, GroupedError, Project
+from .serializers import GroupedErrorSerializer
+
+PERIOD = timedelta(hours=24)
+TOP_LIMIT = 5
+
+# How far back the owner overview looks for a project's latest aggregated window.
+LATEST_WINDOW_LOOKBACK = timedelta(hours=1)
+
+
+def cache_key(project):
+    return f"overview:{project.id}:{project.data_version}"
+
+
+def build(project, now):
+    """Computes the overview of a project for the PERIOD ending at `now`."""
+    since = now - PERIOD
+
+    series = list(
+        AggregatedMetric.objects
+        .filter(project=project, endpoint__path=Endpoint.OVERALL, timestamp__gte=since)
+        .order_by('timestamp')
+        .values_list('timestamp', 'request_count', 'avg_duration_ms', 'p95_duration_ms', 'status_5xx_count', 'histogram')
+    )
+
+    slowest = list(
+        AggregatedMetric.objects
+        .filter(project=project, timestamp__gte=since)
+        .exclude(endpoint__path=Endpoint.OVERALL)
+        .values('endpoint__path', 'endpoint__method')
+        .annotate(max_p95=Max('p95_duration_ms'))
+        .order_by('-max_p95')
+        [:TOP_LIMIT]
+    )
+
+    # Ranked by occurrences in the period, not by the groups' all-time counts.
+    top_occurrences = list(
+        ErrorBucket.objects
+        .filter(resolution=ErrorBucket.HOUR, bucket_start__gte=error_rates.floor_to(since, ErrorBucket.HOUR), group__project=project)
+        .values('group_id')
+        .annotate(total=Sum('count'))
+        .order_by('-total', '-group_id')
+        [:TOP_LIMIT]
+    )
+    groups = GroupedError.objects.select_related('endpoint').in_bulk([row['group_id'] for row in top_occurrences])
+    top_errors = [
+        {**GroupedErrorSerializer(groups[row['group_id']]).data, 'period_count': row['total']}
+        for row in top_occurrences
+    ]
+
+    return {
+        'project': {'id': project.id, 'name': project.name},
+        'since': since,
+        'until': now,
+        'stats': summarize(series),
+        'series': [
+            {
+                'timestamp': timestamp,
+                'request_count': request_count,
+                'p95_duration_ms': p95_duration_ms,
+                'status_5xx_count': status_5xx_count,
+            }
+            for timestamp, request_count, _, p95_duration_ms, status_5xx_count, _ in series
+        ],
+        'slowest_endpoints': [
+            {'url': item['endpoint__path'], 'method': item['endpoint__method'], 'max_p95': item['max_p95']}
+            for item in slowest
+        ],
+        'top_errors': top_errors,
+    }
+
+
+def summarize(series):
+    """Headline numbers for the period from the overall series rows."""
+    if not series:
+        return {'request_count': 0, 'avg_duration_ms': None, 'p95_duration_ms': None, 'error_rate': None}
+
+    _, requests, averages, _, errors, blobs = zip(*series)
+    requests = np.array(requests, dtype=np.int64)
+    total = int(requests.sum())
+    summed = np.sum([histograms.decode(blob) for blob in blobs], axis=0, dtype=np.int64)
+    p95 = histograms.percentile(summed, 95)
+    return {
+        'request_count': total,
+        'avg_duration_ms': round(float(np.dot(requests, averages)) / total, 1) if total else None,
+        'p95_duration_ms': round(p95, 1) if p95 is not None else None,
+        'error_rate': round(sum(errors) / total, 4) if total else None,
+    }
+
+
+def get(project, now):
+    """Returns the project's overview from the cache, building and caching it when missing."""
+    key = cache_key(project)
+    overview = cache.get(key)
+    if overview is None:
+        overview = build(project, now)
+        cache.set(key, overview, settings.OVERVIEW_CACHE_SECONDS)
+    return overview
+
+
+def for_owner(user, now):
+    """
+    Health of every project owned by `user`: the latest aggregated window of
+    its `__overall__` series and its errors over the PERIOD ending at `now`.
+    Four queries regardless of the number of projects.
+    """
+    since = now - PERIOD
+    projects = list(Project.objects.filter(owner=user).order_by('-created_at').values('id', 'name'))
+
+    # The newest window per project (DISTINCT ON), within the lookback.
+    latest = {
+        row['project_id']: row
+        for row in AggregatedMetric.objects
+        .filter(
+            project__owner=user,
+            endpoint__path=Endpoint.OVERALL,
+            timestamp__gte=now - LATEST_WINDOW_LOOKBACK,
+        )
+        .order_by('project_id', '-timestamp')
+        .distinct('project_id')
+        .values('project_id', 'timestamp', 'request_count', 'p95_duration_ms', 'status_5xx_count')
+    }
+
+    # Occurrences per group over the period; the project totals and top groups follow from these.
+    error_counts = {}
+    top_groups = {}
+    occurrences = (
+        ErrorBucket.objects
+        .filter(resolution=ErrorBucket.HOUR, bucket_start__gte=error_rates.floor_to(since, ErrorBucket.HOUR), group__project__owner=user)
+        .values('group__project_id', 'group_id')
+        .annotate(total=Sum('count'))
+    )
+    for row in occurrences:
+        project_id = row['group__project_id']
+        error_counts[project_id] = error_counts.get(project_id, 0) + row['total']
+        if row['total'] > top_groups.get(project_id, (None, 0))[1]:
+            top_groups[project_id] = (row['group_id'], row['total'])
+
+    groups = GroupedError.objects.select_related('endpoint').only('group_hash', 'error_type', 'endpoint__path').in_bulk(
+        [group_id for group_id, _ in top_groups.values()]
+    )
+
+    window_minutes = aggregation.WINDOW.total_seconds() / 60
+    summaries = []
+    for project in projects:
+        window = latest.get(project['id'])
+        top = top_groups.get(project['id'])
+        summaries.append({
+            'id': project['id'],
+            'name': project['name'],
+            'window': window['timestamp'] if window else None,
+            'requests_per_minute': round(window['request_count'] / window_minutes, 2) if window else None,
+            'p95_duration_ms': window['p95_duration_ms'] if window else None,
+            'error_rate': (
+                round(window['status_5xx_count'] / window['request_count'], 4)
+                if window and window['request_count'] else None
+            ),
+            'error_count': error_counts.get(project['id'], 0),
+            'top_error': {
+                'group_hash': groups[top[0]].group_hash,
+                'error_type': groups[top[0]].error_type,
+                'url': groups[top[0]].endpoint.path,
+                'count': top[1],
+            } if top else None,
+        })
+    return {'since': since, 'until': now, 'projects': summaries}
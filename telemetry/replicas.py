@@ -0,0 +1,133 @@
+# telemetry/replicas.py
+
+"""
+Read-replica routing.
+
+With DB_REPLICA_HOSTS set, settings.py defines one database alias per
+replica (DB_REPLICAS). ReplicaRoutingMiddleware opens a routing scope for
+every request; inside a scope of a safe (GET/HEAD/OPTIONS) request,
+ReplicaRouter sends reads to one replica, chosen once per request. Writes,
+Celery tasks and management commands always use the primary.
+
+Read-your-writes: once a request writes, its remaining reads use the
+primary, and the middleware pins the client to the primary with a cookie for
+DB_REPLICA_STICKY_SECONDS, so e.g. the project list right after creating a
+project includes it.
+
+Lag fallback: a replica is only used while its replay lag (checked at most
+every DB_REPLICA_LAG_CHECK_SECONDS per process) is below
+DB_REPLICA_MAX_LAG_SECONDS. Unreachable replicas are skipped the same way.
+"""
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+PIN_COOKIE = 'pensieve_primary'
+
+# Replication delay in seconds, 0 while the replica has replayed everything it
+# received (an idle primary does not make a replica look stale).
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# The routing state of the current request, None outside a request.
+_scope = ContextVar('replica_scope', default=None)
+
+# alias -> (checked_at, lag in seconds or None when unreachable), per process
+_lag_checks = {}
+
+
+class Scope:
+    """Routing state of one request."""
+
+    def __init__(self, allow_replica):
+        self.allow_replica = allow_replica
+        self.wrote = False
+        self._replica = None
+        self._chosen = False
+
+    @property
+    def replica(self):
+        """The alias this request reads from, chosen on its first read; None for the primary."""
+        if not self._chosen:
+            self._replica = choose_replica() if self.allow_replica else None
+            self._chosen = True
+        return self._replica
+
+
+def replica_lag(alias):
+    """Returns the replay lag of a replica in seconds (cached), or None when it cannot be reached."""
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked and now - checked[0] < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+        return checked[1]
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+    except DatabaseError:
+        logger.warning("Read replica %s is unreachable, reading from the primary", alias, exc_info=True)
+        connections[alias].close()
+        lag = None
+    _lag_checks[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    """Picks a random replica whose lag is within DB_REPLICA_MAX_LAG_SECONDS, or None."""
+    candidates = list(settings.DB_REPLICAS)
+    random.shuffle(candidates)
+    for alias in candidates:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS:
+            return alias
+    return None
+
+
+@contextmanager
+def request_scope(allow_replica):
+    """Routes the queries of the enclosed code as one request; yields its Scope."""
+    scope = Scope(allow_replica)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+class ReplicaRouter:
+    """Sends reads inside a replica-eligible request scope to a replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or scope.wrote:
+            return PRIMARY
+        return scope.replica or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.wrote = True
+        # Explicitly, so instances loaded from a replica are saved to the primary.
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db == PRIMARY
@@ -0,0 +1,235 @@
+# telemetry/retention.py
+
+"""
+Chunked, throttled deletion of expired telemetry.
+
+Each table is walked in ascending primary key ranges of RETENTION_CHUNK_SIZE,
+deleting the expired rows of one range per statement, so no single
+transaction grows large. Deletes are paced to RETENTION_MAX_ROWS_PER_SECOND
+and a run stops after RETENTION_MAX_RUN_SECONDS. The position reached is kept
+in a RetentionCheckpoint, so the next run picks up where this one stopped.
+
+How long rows are kept is decided per policy (RETENTION_DAYS) and can be
+overridden per project through Project.retention_policies. With
+ARCHIVE_ENABLED, raw logs are only deleted from days already written to cold
+storage (see telemetry/archive.py).
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, Max, Min, OuterRef, Q
+from django.utils import timezone
+
+from . import archive, error_rates, instrumentation
+from .models import (
+    AggregatedMetric, AggregationWindow, ArchiveSegment, ErrorBucket, ErrorLog, GroupedError, PerformanceBlock,
+    PerformanceLog, PerformanceSample, Project, RegressionEvent, RetentionCheckpoint, ThresholdCount, TimeBreakdown,
+)
+
+POLICIES = ('performance_logs', 'error_logs', 'aggregated_metrics', 'grouped_errors')
+MAX_RETENTION_DAYS = 3650
+
+
+@dataclass
+class Table:
+    name: str
+    model: type
+    time_field: str
+    # Lookup from the table to the owning project; None for tables kept globally.
+    project_field: str | None
+    # A key of RETENTION_DAYS, or a fixed timedelta that projects cannot override.
+    policy: str | timedelta
+    # Extra condition rows must meet to be deleted.
+    condition: Q | None = None
+    # How the primary key range to scan is bounded:
+    # 'time_index': time_field is indexed, so the range is that of the rows older than every cutoff;
+    # 'monotonic': keys grow with time_field, so the scan stops at the first range starting after every cutoff;
+    # 'full': the whole table is scanned.
+    scan: str = 'monotonic'
+    # Use a regular (cascading) delete instead of a raw DELETE.
+    cascade: bool = False
+    # ArchiveSegment kind the rows are archived as first, when ARCHIVE_ENABLED is set.
+    archive: str | None = None
+
+
+TABLES = [
+    Table('performance_logs', PerformanceLog, 'timestamp', 'project_id', 'performance_logs', archive=ArchiveSegment.PERFORMANCE),
+    Table(
+        'performance_samples', PerformanceSample, 'timestamp', 'endpoint__project_id', 'performance_logs',
+        archive=ArchiveSegment.PERFORMANCE,
+    ),
+    Table(
+        'performance_blocks', PerformanceBlock, 'minute', 'endpoint__project_id', 'performance_logs',
+        scan='time_index', archive=ArchiveSegment.PERFORMANCE,
+    ),
+    Table('error_logs', ErrorLog, 'timestamp', 'project_id', 'error_logs', archive=ArchiveSegment.ERRORS),
+    Table(
+        'error_buckets_minute', ErrorBucket, 'bucket_start', None, error_rates.MINUTE_BUCKET_RETENTION,
+        condition=Q(resolution=ErrorBucket.MINUTE),
+    ),
+    Table('error_buckets', ErrorBucket, 'bucket_start', 'group__project_id', 'error_logs'),
+    # Only groups without any remaining instances are removed.
+    Table(
+        'grouped_errors', GroupedError, 'last_seen', 'project_id', 'grouped_errors',
+        condition=~Exists(ErrorLog.objects.filter(group=OuterRef('pk'))),
+        scan='full', cascade=True,
+    ),
+    Table('aggregated_metrics', AggregatedMetric, 'timestamp', 'project_id', 'aggregated_metrics', scan='time_index'),
+    Table('threshold_counts', ThresholdCount, 'timestamp', 'project_id', 'aggregated_metrics', scan='time_index'),
+    Table('time_breakdowns', TimeBreakdown, 'timestamp', 'project_id', 'aggregated_metrics', scan='time_index'),
+    Table('regression_events', RegressionEvent, 'timestamp', 'project_id', 'aggregated_metrics'),
+    Table('aggregation_windows', AggregationWindow, 'start', None, 'aggregated_metrics', scan='time_index'),
+]
+
+
+def policy_cutoffs(policy, now):
+    """
+    Returns (default_cutoff, {cutoff: [project_id, ...]}) for a policy: rows
+    older than the cutoff that applies to their project are expired.
+    """
+    if isinstance(policy, timedelta):
+        return now - policy, {}
+
+    default = now - timedelta(days=settings.RETENTION_DAYS[policy])
+    overrides = {}
+    projects = Project.objects.filter(retention_policies__has_key=policy).values_list('id', 'retention_policies')
+    for project_id, policies in projects:
+        overrides.setdefault(now - timedelta(days=policies[policy]), []).append(project_id)
+    return default, overrides
+
+
+def expired_condition(table, default_cutoff, overrides):
+    """Builds the Q matching the table's expired rows under the given cutoffs."""
+    before = f"{table.time_field}__lt"
+    if table.project_field is None or not overrides:
+        expired = Q(**{before: default_cutoff})
+    else:
+        overridden = [project_id for project_ids in overrides.values() for project_id in project_ids]
+        expired = Q(**{before: default_cutoff}) & ~Q(**{f"{table.project_field}__in": overridden})
+        for cutoff, project_ids in overrides.items():
+            expired |= Q(**{before: cutoff, f"{table.project_field}__in": project_ids})
+
+    if table.condition is not None:
+        expired &= table.condition
+    return expired
+
+
+def prune_table(table, now, deadline, dry_run=False):
+    """
+    Deletes (or, for a dry run, counts) one table's expired rows, resuming
+    from its checkpoint. Returns (rows, complete) where `complete` is False
+    when the run's deadline cut the pass short.
+    """
+    default_cutoff, overrides = policy_cutoffs(table.policy, now)
+    if table.archive and settings.ARCHIVE_ENABLED:
+        # Never delete rows from days that have not been archived yet.
+        through = archive.archived_through(table.archive)
+        if through is None:
+            return 0, True
+        default_cutoff = min(default_cutoff, through)
+        capped = {}
+        for cutoff, project_ids in overrides.items():
+            capped.setdefault(min(cutoff, through), []).extend(project_ids)
+        overrides = capped
+    latest_cutoff = max([default_cutoff, *overrides])
+    expired = expired_condition(table, default_cutoff, overrides)
+
+    manager = table.model.objects
+    checkpoint, _ = RetentionCheckpoint.objects.get_or_create(table=table.name)
+    candidates = manager.all()
+    if table.scan == 'time_index':
+        candidates = manager.filter(**{f"{table.time_field}__lt": latest_cutoff})
+    bounds = candidates.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return 0, True
+
+    position = bounds['first']
+    if not dry_run and checkpoint.position is not None:
+        position = max(position, checkpoint.position)
+    if not dry_run and checkpoint.pass_started_at is None:
+        checkpoint.pass_started_at = now
+
+    chunk_size = settings.RETENTION_CHUNK_SIZE
+    rate = settings.RETENTION_MAX_ROWS_PER_SECOND
+    total = 0
+    complete = True
+
+    while position <= bounds['last']:
+        if time.monotonic() >= deadline:
+            complete = False
+            break
+
+        if table.scan == 'monotonic':
+            first_time = (
+                manager.filter(pk__gte=position).order_by('pk')
+                .values_list(table.time_field, flat=True).first()
+            )
+            if first_time is None or first_time >= latest_cutoff:
+                break
+
+        started = time.monotonic()
+        rows = manager.filter(expired, pk__gte=position, pk__lt=position + chunk_size)
+        if dry_run:
+            count = rows.count()
+        elif table.cascade:
+            count = rows.delete()[1].get(table.model._meta.label, 0)
+        else:
+            count = rows._raw_delete(rows.db)
+        total += count
+        position += chunk_size
+
+        if dry_run:
+            continue
+
+        checkpoint.position = position
+        checkpoint.pass_deleted += count
+        checkpoint.save(update_fields=['position', 'pass_started_at', 'pass_deleted'])
+        instrumentation.CLEANUP_DELETED_ROWS.inc(count, table=table.model._meta.db_table)
+
+        # Pace deletes so the table sees at most `rate` deleted rows per second.
+        if rate and count:
+            time.sleep(max(count / rate - (time.monotonic() - started), 0))
+
+    if complete and not dry_run:
+        checkpoint.position = None
+        checkpoint.pass_started_at = None
+        checkpoint.last_completed_at = timezone.now()
+        checkpoint.last_pass_deleted = checkpoint.pass_deleted
+        checkpoint.pass_deleted = 0
+        checkpoint.save()
+
+    return total, complete
+
+
+def run(tables=None, dry_run=False, max_seconds=None):
+    """
+    Applies the retention policies to every table (or the named ones).
+
+    When ARCHIVE_ENABLED is set, expired days are archived first and reported
+    as {'archive_<kind>': {'archived': rows, 'complete': bool}}.
+
+    Returns a report of {table: {'deleted': rows, 'complete': bool}}; with
+    `dry_run` nothing is deleted or archived and 'deleted' is the number of
+    rows that would be deleted.
+    """
+    now = timezone.now()
+    deadline = time.monotonic() + (max_seconds or settings.RETENTION_MAX_RUN_SECONDS)
+
+    report = {}
+    if settings.ARCHIVE_ENABLED and not dry_run:
+        for kind, policy in archive.POLICIES.items():
+            if tables and not any(table.archive == kind for table in TABLES if table.name in tables):
+                continue
+            default_cutoff, overrides = policy_cutoffs(policy, now)
+            archived, complete = archive.archive_until(kind, max([default_cutoff, *overrides]), deadline)
+            report[f"archive_{kind}"] = {'archived': archived, 'complete': complete}
+
+    for table in TABLES:
+        if tables and table.name not in tables:
+            continue
+        deleted, complete = prune_table(table, now, deadline, dry_run)
+        report[table.name] = {'deleted': deleted, 'complete': complete}
+    return report
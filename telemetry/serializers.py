@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import AggregatedMetric, GroupedError, Project, ErrorLog, PerformanceLog
+from .endpoints import matching, normalize_method
+from .models import AggregatedMetric, GroupedError, Project, ErrorLog, PerformanceLog, RegressionEvent, ServiceLevelObjective
 
 
 class ErrorLogSerializer(serializers.ModelSerializer):
@@ -7,32 +8,118 @@ class ErrorLogSerializer(serializers.ModelSerializer):
         model = ErrorLog
         fields = ['error_type', 'error_message', 'traceback', 'url', 'method']
 
+    def validate_method(self, value):
+        return normalize_method(value)
+
 
 class PerformanceLogSerializer(serializers.ModelSerializer):
+    # Ingest resolves these to the log's endpoint; they are not stored on the log itself.
+    url = serializers.CharField(max_length=2048)
+    method = serializers.CharField(max_length=10)
+    # Bounded so the value also fits the smallint column used by compact storage.
+    status_code = serializers.IntegerField(min_value=100, max_value=599)
+
     class Meta:
         model = PerformanceLog
-        fields = ['url', 'method', 'status_code', 'duration_ms']
+        fields = ['url', 'method', 'status_code', 'duration_ms', 'db_ms', 'db_queries', 'cache_ms', 'external_ms']
+
+    def validate_method(self, value):
+        return normalize_method(value)
 
 
 class GroupedErrorSerializer(serializers.ModelSerializer):
+    url = serializers.CharField(source='endpoint.path', read_only=True)
+
     class Meta:
         model = GroupedError
         fields = ['url', 'group_hash', 'error_type', 'count', 'last_seen', 'first_seen']
 
 
 class AggregatedMetricSerializer(serializers.ModelSerializer):
+    url = serializers.CharField(source='endpoint.path', read_only=True)
+    method = serializers.CharField(source='endpoint.method', read_only=True)
+
     class Meta:
         model = AggregatedMetric
         fields = [
             'url', 
+            'method',
             'timestamp', 
             'request_count', 
             'avg_duration_ms', 
             'p50_duration_ms', 
-            'p95_duration_ms'
+            'p95_duration_ms',
+            'status_2xx_count',
+            'status_3xx_count',
+            'status_4xx_count',
+            'status_5xx_count',
         ]
 
 
+class RegressionEventSerializer(serializers.ModelSerializer):
+    url = serializers.CharField(source='endpoint.path', read_only=True)
+    method = serializers.CharField(source='endpoint.method', read_only=True)
+
+    class Meta:
+        model = RegressionEvent
+        fields = [
+            'url',
+            'method',
+            'kind',
+            'timestamp',
+            'p95_duration_ms',
+            'baseline_p95_ms',
+            'score',
+        ]
+
+
+class ServiceLevelObjectiveSerializer(serializers.ModelSerializer):
+    """
+    Serializes an SLO. The endpoint is given by `url` (its route) and
+    `method`; without a `url` the objective covers the whole project.
+    """
+    url = serializers.CharField(source='endpoint.path', required=False, allow_null=True, default=None)
+    method = serializers.CharField(source='endpoint.method', required=False, allow_blank=True, default='')
+    target = serializers.FloatField(min_value=0, max_value=1)
+
+    class Meta:
+        model = ServiceLevelObjective
+        fields = ['id', 'name', 'url', 'method', 'kind', 'threshold_ms', 'target', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate(self, attrs):
+        project = self.context['project']
+        endpoint = attrs.pop('endpoint', {})
+
+        if endpoint.get('path'):
+            candidates = list(matching(project.id, endpoint['path'], endpoint.get('method'))[:2])
+            if not candidates:
+                raise serializers.ValidationError({"url": "No such endpoint in this project."})
+            if len(candidates) > 1:
+                raise serializers.ValidationError({"method": "Several methods share this route; give one."})
+            attrs['endpoint'] = candidates[0]
+        elif 'url' in self.initial_data or not self.instance:
+            attrs['endpoint'] = None
+
+        if not 0 < attrs.get('target', getattr(self.instance, 'target', 0)) < 1:
+            raise serializers.ValidationError({"target": "Must be between 0 and 1, e.g. 0.99."})
+
+        kind = attrs.get('kind', getattr(self.instance, 'kind', None))
+        threshold_ms = attrs.get('threshold_ms', getattr(self.instance, 'threshold_ms', None))
+        if kind == ServiceLevelObjective.LATENCY and not threshold_ms:
+            raise serializers.ValidationError({"threshold_ms": "Latency objectives need a threshold."})
+        if kind == ServiceLevelObjective.AVAILABILITY:
+            attrs['threshold_ms'] = None
+
+        name = attrs.get('name')
+        others = ServiceLevelObjective.objects.filter(project=project, name=name)
+        if self.instance:
+            others = others.exclude(id=self.instance.id)
+        if name and others.exists():
+            raise serializers.ValidationError({"name": "This project already has an objective with this name."})
+        return attrs
+
+
 class ErrorLogInstanceSerializer(serializers.ModelSerializer):
     """Serializes a single, raw error log instance."""
     class Meta:
@@ -41,6 +128,7 @@ class ErrorLogInstanceSerializer(serializers.ModelSerializer):
 
 class GroupedErrorDetailSerializer(serializers.ModelSerializer):
     """Serializes a grouped error plus its latest instance."""
+    url = serializers.CharField(source='endpoint.path', read_only=True)
     latest_instance = serializers.SerializerMethodField()
 
     class Meta:
@@ -0,0 +1,184 @@
+# telemetry/slo.py
+
+"""
+Service level objectives, Apdex and burn rates from precomputed counters.
+
+Aggregation records, per endpoint and window, how many requests were
+satisfied / tolerating / frustrated against every latency threshold in use
+(APDEX_THRESHOLD_MS plus the thresholds of the project's latency SLOs), in
+ThresholdCount rows. Availability objectives use the status class counts on
+AggregatedMetric. Evaluating an objective over any range therefore only sums
+a few small counters per window and never reads raw durations.
+
+Burn rate is the rate at which the error budget is being spent: 1 means the
+budget lasts exactly the compliance period, 14.4 over one hour means a 30-day
+budget would be gone in about two days.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Q, Sum
+
+from .models import AggregatedMetric, Endpoint, ServiceLevelObjective, ThresholdCount
+
+BURN_RATE_WINDOWS = {'1h': timedelta(hours=1), '6h': timedelta(hours=6), '3d': timedelta(days=3)}
+DEFAULT_COMPLIANCE_PERIOD = timedelta(days=30)
+
+# Requests up to this multiple of the threshold are "tolerating" (Apdex).
+TOLERATING_FACTOR = 4
+
+
+def thresholds_by_series(project_ids=None):
+    """
+    Returns {(project_id, endpoint_id): {threshold_ms, ...}} of the latency
+    thresholds the SLOs of the given projects (or all projects) need, where
+    an endpoint_id of None stands for the project-wide series. The Apdex
+    default is not included.
+    """
+    slos = ServiceLevelObjective.objects.filter(kind=ServiceLevelObjective.LATENCY)
+    if project_ids is not None:
+        slos = slos.filter(project_id__in=project_ids)
+
+    thresholds = defaultdict(set)
+    for project_id, endpoint_id, threshold_ms in slos.values_list('project_id', 'endpoint_id', 'threshold_ms'):
+        thresholds[(project_id, endpoint_id)].add(threshold_ms)
+    return thresholds
+
+
+def threshold_counts(project_id, endpoint_id, timestamp, durations, thresholds):
+    """
+    Builds the (unsaved) ThresholdCount rows of one series and window, for
+    APDEX_THRESHOLD_MS and each of `thresholds`, from one sort of the durations.
+    """
+    ordered = np.sort(durations)
+    total = len(ordered)
+    rows = []
+    for threshold_ms in sorted({settings.APDEX_THRESHOLD_MS, *thresholds}):
+        satisfied, within_tolerance = np.searchsorted(
+            ordered, [threshold_ms, threshold_ms * TOLERATING_FACTOR], side='right',
+        )
+        rows.append(ThresholdCount(
+            project_id=project_id,
+            endpoint_id=endpoint_id,
+            timestamp=timestamp,
+            threshold_ms=threshold_ms,
+            satisfied_count=int(satisfied),
+            tolerating_count=int(within_tolerance - satisfied),
+            frustrated_count=int(total - within_tolerance),
+        ))
+    return rows
+
+
+def save_threshold_counts(rows):
+    """Upserts ThresholdCount rows, so re-aggregating a window replaces its counts."""
+    ThresholdCount.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['endpoint', 'threshold_ms', 'timestamp'],
+        update_fields=['satisfied_count', 'tolerating_count', 'frustrated_count'],
+    )
+
+
+def series_endpoint_id(project_id, endpoint_id):
+    """The endpoint whose counters describe an objective; the project-wide series when `endpoint_id` is None."""
+    if endpoint_id is not None:
+        return endpoint_id
+    return (
+        Endpoint.objects
+        .filter(project_id=project_id, method='', path=Endpoint.OVERALL)
+        .values_list('id', flat=True)
+        .first()
+    )
+
+
+def _counters(slo):
+    """Returns (queryset, good expression, total expression) for an objective's counters."""
+    endpoint_id = series_endpoint_id(slo.project_id, slo.endpoint_id)
+    if slo.kind == ServiceLevelObjective.LATENCY:
+        counts = ThresholdCount.objects.filter(endpoint_id=endpoint_id, threshold_ms=slo.threshold_ms)
+        good = F('satisfied_count')
+        total = F('satisfied_count') + F('tolerating_count') + F('frustrated_count')
+    else:
+        counts = AggregatedMetric.objects.filter(endpoint_id=endpoint_id)
+        good = F('request_count') - F('status_5xx_count')
+        total = F('request_count')
+    return counts, good, total
+
+
+def good_and_total(slo, ranges, until):
+    """
+    Sums an objective's good and total requests over several ranges ending at
+    `until` in a single query. `ranges` maps names to start datetimes;
+    returns {name: (good, total)}.
+    """
+    counts, good, total = _counters(slo)
+    aggregates = {}
+    for name, since in ranges.items():
+        in_range = Q(timestamp__gte=since)
+        aggregates[f'{name}_good'] = Sum(good, filter=in_range)
+        aggregates[f'{name}_total'] = Sum(total, filter=in_range)
+
+    sums = counts.filter(timestamp__gte=min(ranges.values()), timestamp__lt=until).aggregate(**aggregates)
+    return {name: (sums[f'{name}_good'] or 0, sums[f'{name}_total'] or 0) for name in ranges}
+
+
+def burn_rate(good, total, target):
+    """How many times faster than sustainable the error budget is being spent; None without traffic."""
+    if not total:
+        return None
+    return (1 - good / total) / (1 - target)
+
+
+def apdex(endpoint_ids, threshold_ms, since, until):
+    """
+    (satisfied + tolerating / 2) / total for the series of one or more
+    endpoints at a threshold that aggregation records, or None without traffic.
+    """
+    sums = ThresholdCount.objects.filter(
+        endpoint_id__in=endpoint_ids,
+        threshold_ms=threshold_ms,
+        timestamp__gte=since,
+        timestamp__lt=until,
+    ).aggregate(
+        satisfied=Sum('satisfied_count'), tolerating=Sum('tolerating_count'), frustrated=Sum('frustrated_count'),
+    )
+    total = sum(value or 0 for value in sums.values())
+    if not total:
+        return None
+    return ((sums['satisfied'] or 0) + (sums['tolerating'] or 0) / 2) / total
+
+
+def evaluate(slo, since, until):
+    """
+    Compliance and error budget of an objective over [since, until), plus its
+    burn rate over each of BURN_RATE_WINDOWS ending at `until`.
+    """
+    ranges = {'period': since, **{name: until - window for name, window in BURN_RATE_WINDOWS.items()}}
+    sums = good_and_total(slo, ranges, until)
+
+    good, total = sums['period']
+    compliance = good / total if total else None
+    # Over the whole period, the burn rate is the fraction of the budget spent.
+    spent = burn_rate(good, total, slo.target)
+    burn_rates = {}
+    for name in BURN_RATE_WINDOWS:
+        rate = burn_rate(*sums[name], slo.target)
+        burn_rates[name] = round(rate, 3) if rate is not None else None
+
+    result = {
+        'since': since,
+        'until': until,
+        'good_count': good,
+        'total_count': total,
+        'compliance': round(compliance, 6) if compliance is not None else None,
+        'met': compliance >= slo.target if compliance is not None else None,
+        'error_budget_remaining': round(1 - spent, 4) if spent is not None else None,
+        'burn_rates': burn_rates,
+    }
+    if slo.kind == ServiceLevelObjective.LATENCY:
+        score = apdex([series_endpoint_id(slo.project_id, slo.endpoint_id)], slo.threshold_ms, since, until)
+        result['apdex'] = round(score, 4) if score is not None else None
+    return result
@@ -0,0 +1,253 @@
+# telemetry/storage.py
+
+import zlib
+from array import array
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .breakdown import COMPONENTS as BREAKDOWN_COMPONENTS, MISSING
+from .models import PerformanceBlock, PerformanceLog, PerformanceSample
+
+STORAGE_ROWS = 'rows'
+STORAGE_COMPACT = 'compact'
+
+# Column layouts of PerformanceBlock.data, keyed by PerformanceBlock.version.
+# Columns are stored back to back (little-endian) and compressed together.
+# Layout 2 adds the time breakdown, with breakdown.MISSING where a request
+# reported none (runs of it compress to almost nothing).
+BLOCK_LAYOUTS = {
+    1: (('duration_ms', '<u4'), ('status_code', '<u2')),
+    2: (('duration_ms', '<u4'), ('status_code', '<u2'), *((name, '<u4') for name in BREAKDOWN_COMPONENTS)),
+}
+BLOCK_VERSION = 2
+
+# Typecodes used while collecting columns before they become NumPy arrays.
+COLUMN_TYPECODES = {'duration_ms': 'I', 'status_code': 'H', **{name: 'I' for name in BREAKDOWN_COMPONENTS}}
+SAMPLE_FIELDS = ('duration_ms', 'status_code', *BREAKDOWN_COMPONENTS)
+
+
+def save_performance_event(project, endpoint_id, payload):
+    """Stores one validated performance payload using the configured layout."""
+    if settings.PERFORMANCE_STORAGE == STORAGE_COMPACT:
+        PerformanceSample.objects.create(
+            endpoint_id=endpoint_id,
+            status_code=payload['status_code'],
+            duration_ms=payload['duration_ms'],
+            **{name: payload.get(name) for name in BREAKDOWN_COMPONENTS},
+        )
+    else:
+        PerformanceLog.objects.create(
+            project=project,
+            endpoint_id=endpoint_id,
+            **{name: payload.get(name) for name in SAMPLE_FIELDS},
+        )
+
+
+def save_performance_events(project_id, events):
+    """Bulk-stores a batch of (endpoint_id, payload) pairs for one project."""
+    if settings.PERFORMANCE_STORAGE == STORAGE_COMPACT:
+        PerformanceSample.objects.bulk_create([
+            PerformanceSample(
+                endpoint_id=endpoint_id,
+                status_code=payload['status_code'],
+                duration_ms=payload['duration_ms'],
+                **{name: payload.get(name) for name in BREAKDOWN_COMPONENTS},
+            )
+            for endpoint_id, payload in events
+        ])
+    else:
+        PerformanceLog.objects.bulk_create([
+            PerformanceLog(project_id=project_id, endpoint_id=endpoint_id, **{name: payload.get(name) for name in SAMPLE_FIELDS})
+            for endpoint_id, payload in events
+        ])
+
+
+def pack_block(columns, version=BLOCK_VERSION):
+    """Packs equal-length column arrays into a compressed block payload."""
+    parts = [
+        np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+        for name, dtype in BLOCK_LAYOUTS[version]
+    ]
+    return zlib.compress(b''.join(parts))
+
+
+def unpack_block(data, count, version=BLOCK_VERSION):
+    """
+    Unpacks a block payload into a dict of column name -> NumPy array.
+    Columns older layouts lack are filled with breakdown.MISSING.
+    """
+    raw = zlib.decompress(bytes(data))
+    columns, offset = {}, 0
+    for name, dtype in BLOCK_LAYOUTS[version]:
+        dtype = np.dtype(dtype)
+        columns[name] = np.frombuffer(raw, dtype=dtype, count=count, offset=offset)
+        offset += dtype.itemsize * count
+    for name in BREAKDOWN_COMPONENTS:
+        if name not in columns:
+            columns[name] = np.full(count, MISSING, dtype=np.uint32)
+    return columns
+
+
+def _append(columns, values):
+    """Appends one sample (values in SAMPLE_FIELDS order) to collected columns; None becomes MISSING."""
+    for name, value in zip(SAMPLE_FIELDS, values):
+        columns[name].append(MISSING if value is None else value)
+
+
+def load_window(start_time, end_time, project_ids=None):
+    """
+    Loads every raw performance sample in [start_time, end_time) from all
+    three layouts (rows, compact samples and packed blocks), optionally only
+    for the given projects.
+
+    Returns a dict of endpoint_id -> {'project_id': ..., <column>: ndarray}.
+    Blocks are included whole when their minute starts inside the range.
+    """
+    logs = PerformanceLog.objects.filter(timestamp__gte=start_time, timestamp__lt=end_time)
+    samples = PerformanceSample.objects.filter(timestamp__gte=start_time, timestamp__lt=end_time)
+    blocks = PerformanceBlock.objects.filter(minute__gte=start_time, minute__lt=end_time)
+    if project_ids is not None:
+        logs = logs.filter(project_id__in=project_ids)
+        samples = samples.filter(endpoint__project_id__in=project_ids)
+        blocks = blocks.filter(endpoint__project_id__in=project_ids)
+
+    collected = defaultdict(lambda: {name: array(code) for name, code in COLUMN_TYPECODES.items()})
+    projects = {}
+
+    def collect(rows):
+        for project_id, endpoint_id, *values in rows:
+            _append(collected[endpoint_id], values)
+            projects[endpoint_id] = project_id
+
+    collect(
+        logs
+        .values_list('project_id', 'endpoint_id', *SAMPLE_FIELDS)
+        .iterator(chunk_size=10000)
+    )
+    collect(
+        samples
+        .values_list('endpoint__project_id', 'endpoint_id', *SAMPLE_FIELDS)
+        .iterator(chunk_size=10000)
+    )
+
+    window = {
+        endpoint_id: {
+            'project_id': projects[endpoint_id],
+            **{name: np.frombuffer(values, dtype=values.typecode) for name, values in columns.items()},
+        }
+        for endpoint_id, columns in collected.items()
+    }
+
+    packed = (
+        blocks
+        .values_list('endpoint__project_id', 'endpoint_id', 'version', 'count', 'data')
+        .iterator(chunk_size=1000)
+    )
+    for project_id, endpoint_id, version, count, data in packed:
+        columns = unpack_block(data, count, version)
+        if endpoint_id in window:
+            for name in COLUMN_TYPECODES:
+                window[endpoint_id][name] = np.concatenate([window[endpoint_id][name], columns[name]])
+        else:
+            window[endpoint_id] = {'project_id': project_id, **columns}
+
+    return window
+
+
+def latest_samples(samples, blocks, limit):
+    """
+    Returns the newest `limit` compact samples as dicts (timestamp,
+    duration_ms, status_code), newest first, from both the unpacked samples
+    and the packed blocks. Packed samples only keep their minute, which
+    stands in for their timestamp.
+    """
+    rows = [
+        {'timestamp': timestamp, 'duration_ms': duration_ms, 'status_code': status_code}
+        for timestamp, duration_ms, status_code in
+        samples.order_by('-timestamp').values_list('timestamp', 'duration_ms', 'status_code')[:limit]
+    ]
+    if len(rows) == limit:
+        # Only blocks of the minute of the oldest sample kept, or later, can displace it.
+        blocks = blocks.filter(minute__gte=rows[-1]['timestamp'].replace(second=0, microsecond=0))
+
+    packed, last_minute = [], None
+    for minute, version, count, data in (
+        blocks.order_by('-minute').values_list('minute', 'version', 'count', 'data').iterator(chunk_size=100)
+    ):
+        # Read whole minutes, newest first, until they alone fill the limit.
+        if len(packed) >= limit and minute != last_minute:
+            break
+        columns = unpack_block(data, count, version)
+        packed += [
+            {'timestamp': minute, 'duration_ms': int(duration_ms), 'status_code': int(status_code)}
+            for duration_ms, status_code in zip(columns['duration_ms'][::-1], columns['status_code'][::-1])
+        ]
+        last_minute = minute
+
+    rows += packed
+    rows.sort(key=lambda row: row['timestamp'], reverse=True)
+    return rows[:limit]
+
+
+def compact_samples(cutoff, batch_size=100_000):
+    """
+    Packs compact samples older than `cutoff` into one PerformanceBlock per
+    endpoint and minute, then deletes the packed samples. Samples that arrive
+    late for an already packed minute are merged into the existing block.
+
+    Returns the number of samples packed.
+    """
+    packed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                PerformanceSample.objects
+                .filter(timestamp__lt=cutoff)
+                .order_by('id')
+                .values_list('id', 'endpoint_id', 'timestamp', *SAMPLE_FIELDS)
+                [:batch_size]
+            )
+            if not rows:
+                break
+
+            groups = defaultdict(lambda: {name: array(code) for name, code in COLUMN_TYPECODES.items()})
+            for _, endpoint_id, timestamp, *values in rows:
+                _append(groups[(endpoint_id, timestamp.replace(second=0, microsecond=0))], values)
+
+            existing = {
+                (block.endpoint_id, block.minute): block
+                for block in PerformanceBlock.objects.select_for_update().filter(
+                    endpoint_id__in={endpoint_id for endpoint_id, _ in groups},
+                    minute__in={minute for _, minute in groups},
+                )
+            }
+
+            new_blocks = []
+            for (endpoint_id, minute), columns in groups.items():
+                count = len(columns['duration_ms'])
+                block = existing.get((endpoint_id, minute))
+                if block is None:
+                    new_blocks.append(PerformanceBlock(
+                        endpoint_id=endpoint_id, minute=minute, version=BLOCK_VERSION, count=count, data=pack_block(columns),
+                    ))
+                    continue
+
+                merged = unpack_block(block.data, block.count, block.version)
+                for name in COLUMN_TYPECODES:
+                    merged[name] = np.concatenate([merged[name], np.frombuffer(columns[name], dtype=columns[name].typecode)])
+                block.count += count
+                block.version = BLOCK_VERSION
+                block.data = pack_block(merged)
+                block.save(update_fields=['count', 'version', 'data'])
+
+            PerformanceBlock.objects.bulk_create(new_blocks)
+
+            # Everything at or below the last id read (and before the cutoff) was packed above.
+            done = PerformanceSample.objects.filter(id__lte=rows[-1][0], timestamp__lt=cutoff)
+            done._raw_delete(done.db)
+            packed += len(rows)
+
+    return packed
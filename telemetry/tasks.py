@@ -1,182 +1,200 @@
 # telemetry/tasks.py
 
-import hashlib
-from celery import shared_task
-from .models import GroupedError, Project, PerformanceLog, ErrorLog, AggregatedMetric
-from django.db import transaction
-import numpy as np
+# The modules that do the work (aggregation, clustering, storage, ...) pull in
+# NumPy and are imported inside the tasks: the web and beat processes import
+# this module only to queue tasks. Celery workers load them before forking
+# (see telemetry/warmup.py).
+
+from celery import chord, shared_task
+from .models import GroupedError, Project, ErrorLog
+from .endpoints import resolve_endpoint_id
+from .normalization import normalize_url
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 @shared_task
 def process_performance_log(project_id, payload):
     """Celery task to save a performance log."""
+    from . import storage
+
     try:
         project = Project.objects.get(id=project_id)
-        PerformanceLog.objects.create(project=project, **payload)
+        payload['url'] = normalize_url(payload.get('url'), project.route_rules)
+        endpoint_id = resolve_endpoint_id(project.id, payload.get('method'), payload['url'])
+        storage.save_performance_event(project, endpoint_id, payload)
     except Project.DoesNotExist:
         # Handle the case where the project might have been deleted
         # between the API call and the task execution.
         pass
 
 @shared_task
-def process_error_log(project_id, payload):
-    """Celery task to save an error log and group it with similar errors."""
-    
-    def sanitize_traceback(traceback):
-        """Sanitize the traceback to remove variable data like memory addresses."""
-        import re
-        # Example: Remove memory addresses (0x7ffdfc3b2c10)
-        sanitized = re.sub(r'0x[0-9a-fA-F]+', '0xADDRESS', traceback)
-        # Remove UUIDs
-        sanitized_string = re.sub(r'[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}', '[UUID]', base_string)
-        # Remove numbers (integers and floats)
-        sanitized_string = re.sub(r'\b\d+\b', '[NUMBER]', sanitized_string)
-        # Remove things that look like email addresses
-        sanitized_string = re.sub(r'\S+@\S+', '[EMAIL]', sanitized_string)        
-        return sanitized    
-    
-    try:
-        error_type = payload.get('error_type')
-        error_message = payload.get('error_message')
-        traceback = payload.get('traceback')
-        
-        # 1. Create a base string for hashing from the parts we know are important.            
-        base_string = f"{error_type}:{error_message}:{traceback}"
-
-        # 2. Sanitize the string by removing common dynamic data patterns.
-        sanitized_string = sanitize_traceback(base_string)
-
-        # 3. Create a consistent hash from the SANITIZED string.
-        hash_input = sanitized_string.encode('utf-8')
-        group_hash = hashlib.sha256(hash_input).hexdigest()
-    
-    except Exception as e:
-        # In case of any error during hashing, fallback to a simple hash.
-        group_hash = hashlib.sha256(f"{payload.get('error_type')}:{payload.get('error_message')}".encode('utf-8')).hexdigest()
+def process_error_log(project_id, payload, event_id=None):
+    """
+    Celery task to save an error log and group it with similar errors (see
+    telemetry/clustering.py): an error with a known fingerprint joins that
+    fingerprint's group, a near-duplicate joins the most similar group, and
+    anything else starts a new group. Each event is recorded once: a
+    redelivered task whose event id is already stored changes nothing.
+    """
+    from . import clustering, error_rates, fulltext
+
+    if event_id and ErrorLog.objects.filter(event_id=event_id).exists():
+        return
 
     try:
         project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        return
 
-        with transaction.atomic():
-            grouped_error, created = GroupedError.objects.get_or_create(
-                project=project,
-                group_hash=group_hash,
-                url=payload.get('url'),
-                defaults={'error_type': payload.get('error_type')}
-            )
-            if not created:
-                # If the group already exists, increment the count.
-                grouped_error.count += 1
-                grouped_error.save()
+    # Groups key on the route template; the raw instance keeps the concrete URL.
+    route = normalize_url(payload.get('url'), project.route_rules)
+    endpoint_id = resolve_endpoint_id(project.id, payload.get('method'), route)
 
-            payload['group'] = grouped_error
-            ErrorLog.objects.create(project=project, **payload)
+    fingerprint = clustering.fingerprint(payload.get('error_type'), payload.get('error_message'), payload.get('traceback'))
+    # Scoped like the groups themselves, so equal errors in other projects or routes stay apart.
+    group_hash = clustering.fingerprint_hash(f"{project.id}:{route}:{fingerprint}")
 
-    except Project.DoesNotExist:
-        pass
+    try:
+        with transaction.atomic():
+            # Fast path: the fingerprint started a group, or was already matched to one.
+            grouped_error = GroupedError.objects.filter(group_hash=group_hash).only('id').first()
+            if grouped_error is None:
+                variant_group_id = (
+                    ErrorLog.objects.filter(project=project, group_hash=group_hash)
+                    .values_list('group_id', flat=True).first()
+                )
+                if variant_group_id is not None:
+                    grouped_error = GroupedError.objects.filter(id=variant_group_id).only('id').first()
+
+            signature = None
+            if grouped_error is None:
+                signature = clustering.signature(fingerprint)
+                grouped_error = clustering.find_similar(project.id, route, payload.get('error_type'), signature)
+
+            created = False
+            if grouped_error is None:
+                grouped_error, created = GroupedError.objects.get_or_create(
+                    project=project,
+                    group_hash=group_hash,
+                    defaults={
+                        'error_type': payload.get('error_type'),
+                        'endpoint_id': endpoint_id,
+                        'error_message': payload.get('error_message') or '',
+                        'traceback': payload.get('traceback') or '',
+                    }
+                )
+
+            if created:
+                clustering.index_group(grouped_error, signature)
+                fulltext.index_group(grouped_error.id)
+                # A new group changes the project's overview (see telemetry/overview.py).
+                Project.objects.filter(id=project.id).update(data_version=F('data_version') + 1)
+            else:
+                # If the group already exists, increment the count; a variant joining
+                # it for the first time also makes its message searchable.
+                changes = {'count': F('count') + 1, 'last_seen': timezone.now()}
+                if signature is not None:
+                    changes['search_vector'] = fulltext.with_variant(payload.get('error_message'))
+                GroupedError.objects.filter(id=grouped_error.id).update(**changes)
+
+            error_log = ErrorLog.objects.create(
+                project=project, endpoint_id=endpoint_id, group_id=grouped_error.id, group_hash=group_hash,
+                event_id=event_id, **payload,
+            )
+            error_rates.record_occurrence(grouped_error.id, error_log.timestamp)
+    except IntegrityError:
+        # A concurrent delivery of the same event committed first (event_id is
+        # unique); everything this one changed has been rolled back.
+        if not (event_id and ErrorLog.objects.filter(event_id=event_id).exists()):
+            raise
 
 
 @shared_task
 def aggregate_performance_logs():
     """
-    Aggregates raw performance logs into 5-minute windows.
+    Aggregates raw performance data into aligned 5-minute windows, catching
+    up on missed windows and re-aggregating windows that are still within the
+    lateness allowance (see telemetry/aggregation.py). Each window is fanned
+    out as a chord of per-shard subtasks.
     This task is scheduled to run every 5 minutes by Celery Beat.
     """
+    from . import aggregation
+
     print("Starting aggregation of performance logs...")
-    # 1. Define the time window for aggregation
-    end_time = timezone.now()
-    start_time = end_time - timedelta(minutes=5)
-
-    # 2. Get all logs in the last 5 minutes
-    logs_to_process = PerformanceLog.objects.filter(timestamp__gte=start_time, timestamp__lt=end_time)
-
-    # 3. Group the logs by project and URL
-    logs_by_url = logs_to_process.values('project_id', 'url').distinct()
-
-    for item in logs_by_url:
-        project_id = item['project_id']
-        url = item['url']
-
-        # Get all durations for this specific project and URL
-        durations = list(logs_to_process.filter(
-            project_id=project_id, 
-            url=url
-        ).values_list('duration_ms', flat=True))
-
-        if not durations:
-            continue
-
-        # 4. Calculate the metrics using NumPy
-        request_count = len(durations)
-        avg_duration = int(np.mean(durations))
-        p50_duration = int(np.percentile(durations, 50)) # Median
-        p95_duration = int(np.percentile(durations, 95))
-
-        # 5. Save the aggregated data
-        # We "floor" the timestamp to the start of the 5-minute window
-        floored_timestamp = start_time.replace(second=0, microsecond=0)
-
-        AggregatedMetric.objects.update_or_create(
-            project_id=project_id,
-            url=url,
-            timestamp=floored_timestamp,
-            defaults={
-                'request_count': request_count,
-                'avg_duration_ms': avg_duration,
-                'p50_duration_ms': p50_duration,
-                'p95_duration_ms': p95_duration,
-            }
-        )
-
-    # We group all logs by just the project
-    logs_by_project = logs_to_process.values('project_id').distinct()
-
-    for item in logs_by_project:
-        project_id = item['project_id']
-
-        # Get all durations for this entire project in the window
-        all_durations = list(logs_to_process.filter(
-            project_id=project_id
-        ).values_list('duration_ms', flat=True))
-
-        if not all_durations:
-            continue
-
-        # Calculate the overall metrics
-        overall_request_count = len(all_durations)
-        overall_avg_duration = int(np.mean(all_durations))
-        overall_p50_duration = int(np.percentile(all_durations, 50))
-        overall_p95_duration = int(np.percentile(all_durations, 95))
-
-        floored_timestamp = start_time.replace(second=0, microsecond=0)
-
-        # Save the aggregated data with a special URL
-        AggregatedMetric.objects.update_or_create(
-            project_id=project_id,
-            url="__overall__", # <-- Special identifier
-            timestamp=floored_timestamp,
-            defaults={
-                'request_count': overall_request_count,
-                'avg_duration_ms': overall_avg_duration,
-                'p50_duration_ms': overall_p50_duration,
-                'p95_duration_ms': overall_p95_duration,
-            }
-        )
+    now = timezone.now()
+    shards = settings.AGGREGATION_SHARDS
+
+    for start in aggregation.due_windows(now):
+        aggregation.open_window(start)
+        chord(
+            aggregate_window_shard.s(start.isoformat(), shard, shards)
+            for shard in range(shards)
+        )(finalize_aggregation_window.s(start.isoformat(), now.isoformat()))
+
+
+@shared_task(ignore_result=False)
+def aggregate_window_shard(start, shard, shards):
+    """Aggregates one project shard of a window; part of the aggregation chord."""
+    from . import aggregation
+
+    return aggregation.aggregate_shard(datetime.fromisoformat(start), shard, shards)
+
+
+@shared_task
+def finalize_aggregation_window(results, start, now):
+    """Chord callback: advances the window's watermark once all of its shards are done."""
+    from . import aggregation
+
+    sample_count = aggregation.finalize_window(datetime.fromisoformat(start), datetime.fromisoformat(now), results)
+    print(f"Aggregated window {start} from {sample_count} samples in {len(results)} shards.")
+
+    # Score the finished windows against each series' latency baseline, in
+    # window order, however the chords of a catch-up run completed
+    detect_latency_regressions.delay()
+
+
+@shared_task
+def detect_latency_regressions(timestamp=None):
+    """
+    Compares aggregated windows with each endpoint's p95 baseline and records
+    regressions and recoveries: the given window, or every finished window
+    not scored yet, oldest first. Queued when an aggregation window is finalized.
+    """
+    from . import anomaly
+
+    if timestamp:
+        results = {timestamp: anomaly.detect_regressions(datetime.fromisoformat(timestamp))}
+    else:
+        results = anomaly.detect_due_windows()
+    print(f"Recorded {sum(results.values())} regression events in {len(results)} windows.")
+
+
+@shared_task
+def compact_performance_samples():
+    """
+    Packs closed minutes of compact performance samples into per-endpoint blocks.
+    Scheduled every minute by Celery Beat when PERFORMANCE_BLOCKS_ENABLED is set.
+    """
+    from . import storage
+
+    cutoff = timezone.now().replace(second=0, microsecond=0) - timedelta(minutes=settings.PERFORMANCE_BLOCK_DELAY_MINUTES)
+    packed = storage.compact_samples(cutoff)
+    print(f"Packed {packed} performance samples into blocks.")
+
 
 @shared_task
 def cleanup_old_raw_logs():
     """
-    Deletes raw performance and error logs older than a defined retention period.
+    Deletes expired telemetry according to the retention policies, in
+    throttled chunks that resume from a checkpoint (see telemetry/retention.py).
     This task is scheduled to run once a day.
     """
-    # Define how long we want to keep detailed, raw logs
-    retention_period = timezone.now() - timedelta(days=30) # Keep 30 days of raw logs
-
-    # Delete old logs
-    old_perf_logs = PerformanceLog.objects.filter(timestamp__lt=retention_period)
-    old_error_logs = ErrorLog.objects.filter(timestamp__lt=retention_period)
+    from . import retention
 
-    # ._raw_delete() is a faster way to delete large numbers of objects
-    old_perf_logs._raw_delete(old_perf_logs.db)
-    old_error_logs._raw_delete(old_error_logs.db)
\ No newline at end of file
+    report = retention.run()
+    for table, result in report.items():
+        action = 'archived' if 'archived' in result else 'deleted'
+        print(f"Retention: {table}: {action} {result[action]} rows{'' if result['complete'] else ' (will resume)'}.")
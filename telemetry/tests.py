@@ -1,3 +1,897 @@
-from django.test import TestCase
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import AggregatedMetric, AggregationWindow, ArchiveSegment, Endpoint, ErrorBucket, ErrorLog, ErrorSignatureBand, GroupedError, PerformanceBlock, PerformanceLog, PerformanceSample, Project, RetentionCheckpoint, SeriesBaseline, ThresholdCount, TimeBreakdown
+from . import aggregation, anomaly, api_keys, archive, breakdown, buffer, clustering, endpoints, error_rates, histograms, instrumentation, middleware, overview, retention, slo, storage
+from .normalization import normalize_url, template_from_route
+from .tasks import process_error_log, process_performance_log
+
+
+@override_settings(PERFORMANCE_STORAGE=storage.STORAGE_COMPACT)
+class PerformanceLogListTests(TestCase):
+    """The raw performance log API in compact storage, before and after samples are packed."""
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        self.endpoint = Endpoint.objects.create(project=self.project, method="GET", path="/api/items")
+        self.other = Endpoint.objects.create(project=self.project, method="GET", path="/api/users")
+        self.now = timezone.now().replace(second=30, microsecond=0)
+
+    def add_sample(self, endpoint, minutes_ago, duration_ms):
+        sample = PerformanceSample.objects.create(endpoint=endpoint, status_code=200, duration_ms=duration_ms)
+        # timestamp is auto_now_add, so move it back afterwards
+        PerformanceSample.objects.filter(id=sample.id).update(timestamp=self.now - timedelta(minutes=minutes_ago))
+
+    def list_logs(self, **params):
+        response = self.client.get(
+            '/api/pensieve/performance-logs/', params, HTTP_X_API_KEY=str(self.project.api_key),
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_lists_packed_and_unpacked_samples_newest_first(self):
+        self.add_sample(self.endpoint, 10, 100)
+        self.add_sample(self.endpoint, 10, 110)
+        self.add_sample(self.endpoint, 5, 120)
+        self.add_sample(self.other, 5, 500)
+
+        packed = storage.compact_samples(self.now - timedelta(minutes=2))
+        self.assertEqual(packed, 4)
+        self.assertFalse(PerformanceSample.objects.exists())
+        self.assertEqual(PerformanceBlock.objects.count(), 3)
+
+        self.add_sample(self.endpoint, 0, 130)
+
+        logs = self.list_logs(url="/api/items")
+        self.assertEqual([log['duration_ms'] for log in logs], [130, 120, 110, 100])
+        self.assertEqual({log['status_code'] for log in logs}, {200})
+        self.assertEqual(len(self.list_logs()), 5)
+
+    def test_limit_covers_packed_samples(self):
+        for i in range(70):
+            self.add_sample(self.endpoint, 20, i)
+        for i in range(70):
+            self.add_sample(self.endpoint, 10, 1000 + i)
+        storage.compact_samples(self.now)
+
+        logs = self.list_logs()
+        self.assertEqual(len(logs), 100)
+        # The newer minute comes first, then the 30 newest of the older one.
+        self.assertEqual([log['duration_ms'] for log in logs[:70]], list(range(1069, 999, -1)))
+        self.assertEqual([log['duration_ms'] for log in logs[70:]], list(range(69, 39, -1)))
+
+    @override_settings(PERFORMANCE_STORAGE=storage.STORAGE_ROWS)
+    def test_rows_layout_keeps_the_route_on_the_endpoint(self):
+        payload = {'url': '/api/items/?page=2', 'method': 'get', 'status_code': 200, 'duration_ms': 42}
+        process_performance_log(self.project.id, payload)
+
+        log = PerformanceLog.objects.select_related('endpoint').get(project=self.project)
+        self.assertEqual((log.endpoint.method, log.endpoint.path, log.duration_ms), ('GET', '/api/items/', 42))
+        self.assertEqual([entry['duration_ms'] for entry in self.list_logs(url='/api/items/')], [42])
+
+
+TRACEBACK = """Traceback (most recent call last):
+  File "{path}", line {line}, in handle
+    return payload['{key}']
+KeyError: '{key}'"""
+
+
+def traceback(path='/app/billing/stripe.py', line=42, key='user_id'):
+    return TRACEBACK.format(path=path, line=line, key=key)
+
+
+class FingerprintTests(SimpleTestCase):
+
+    def test_masks_volatile_values(self):
+        first = clustering.fingerprint(
+            'ValueError', "Order 1234 for bob@example.com (id 0x7f3a9c2b) not found: 'abc def'", traceback(line=42),
+        )
+        second = clustering.fingerprint(
+            'ValueError', "Order 98 for eve@example.org (id 0x11ff) not found: 'x y z'", traceback(line=57),
+        )
+        self.assertEqual(first, second)
+        self.assertIn('[NUMBER]', first)
+        self.assertIn('[EMAIL]', first)
+        self.assertIn('0xADDRESS', first)
+        self.assertIn('[VALUE]', first)
+
+    def test_masks_uuids(self):
+        self.assertEqual(
+            clustering.fingerprint('DoesNotExist', "No project 0b7c6a52-52a7-4b0e-9df4-1c2d3e4f5a6b", ''),
+            'DoesNotExist:No project [UUID]:',
+        )
+
+    def test_keeps_frame_files(self):
+        billing = clustering.fingerprint('KeyError', "'user_id'", traceback(path='/app/billing/stripe.py'))
+        shipping = clustering.fingerprint('KeyError', "'user_id'", traceback(path='/app/shipping/rates.py'))
+        self.assertNotEqual(billing, shipping)
+        self.assertIn('File "/app/billing/stripe.py"', billing)
+
+    def test_keeps_quoted_identifiers(self):
+        self.assertNotEqual(
+            clustering.fingerprint('KeyError', "'user_id'", ''),
+            clustering.fingerprint('KeyError', "'email'", ''),
+        )
+        self.assertEqual(
+            clustering.fingerprint('AttributeError', "'NoneType' object has no attribute 'items'", ''),
+            "AttributeError:'NoneType' object has no attribute 'items':",
+        )
+
+
+class SignatureTests(SimpleTestCase):
+
+    def test_signature_is_deterministic(self):
+        fingerprint = clustering.fingerprint('KeyError', "'user_id'", traceback())
+        first = clustering.signature(fingerprint)
+        self.assertEqual(first.shape, (clustering.PERMUTATIONS,))
+        self.assertTrue((first == clustering.signature(fingerprint)).all())
+        self.assertTrue((clustering.unpack(clustering.pack(first)) == first).all())
+
+    def test_similarity_follows_shared_tokens(self):
+        base = clustering.signature(clustering.fingerprint('KeyError', "'user_id'", traceback()))
+        variant = clustering.signature(clustering.fingerprint(
+            'KeyError', "'user_id'", traceback() + '\nDuring handling of the above exception',
+        ))
+        other = clustering.signature(clustering.fingerprint(
+            'TimeoutError', 'upstream timed out', 'Traceback:\n  File "/app/net/http.py", in send',
+        ))
+        self.assertEqual(clustering.similarity(base, base), 1.0)
+        self.assertGreaterEqual(clustering.similarity(base, variant), clustering.SIMILARITY_THRESHOLD)
+        self.assertLess(clustering.similarity(base, other), 0.3)
+
+    def test_short_fingerprints_have_a_signature(self):
+        self.assertEqual(clustering.signature('E').shape, (clustering.PERMUTATIONS,))
+
+    def test_band_buckets(self):
+        signature = clustering.signature(clustering.fingerprint('KeyError', "'user_id'", traceback()))
+        buckets = clustering.band_buckets(signature)
+        self.assertEqual(len(buckets), clustering.BANDS)
+        self.assertTrue(all(-2 ** 63 <= bucket < 2 ** 63 for bucket in buckets))
+
+        # Changing the rows of one band only changes that band's bucket.
+        changed = signature.copy()
+        changed[:clustering.ROWS] += 1
+        changed_buckets = clustering.band_buckets(changed)
+        self.assertNotEqual(changed_buckets[0], buckets[0])
+        self.assertEqual(changed_buckets[1:], buckets[1:])
+
+
+class FindSimilarTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+
+    def add_group(self, group_hash, tb, url='/api/checkout', error_type='KeyError', project=None):
+        project = project or self.project
+        endpoint, _ = Endpoint.objects.get_or_create(project=project, method='POST', path=url)
+        group = GroupedError.objects.create(project=project, endpoint=endpoint, group_hash=group_hash, error_type=error_type)
+        clustering.index_group(group, clustering.signature(clustering.fingerprint(error_type, "'user_id'", tb)))
+        return group
+
+    def signature(self, tb, error_type='KeyError'):
+        return clustering.signature(clustering.fingerprint(error_type, "'user_id'", tb))
+
+    def test_finds_near_duplicate_group(self):
+        group = self.add_group('a', traceback())
+        self.add_group('b', traceback(path='/app/shipping/rates.py', key='zone'))
+
+        near = self.signature(traceback() + '\nDuring handling of the above exception')
+        self.assertEqual(clustering.find_similar(self.project.id, '/api/checkout', 'KeyError', near), group)
+
+    def test_scoped_to_project_route_and_type(self):
+        self.add_group('a', traceback())
+        other_project = Project.objects.create(name="blog")
+        signature = self.signature(traceback())
+
+        self.assertIsNone(clustering.find_similar(other_project.id, '/api/checkout', 'KeyError', signature))
+        self.assertIsNone(clustering.find_similar(self.project.id, '/api/cart', 'KeyError', signature))
+        self.assertIsNone(clustering.find_similar(self.project.id, '/api/checkout', 'IndexError', signature))
+
+    def test_ignores_dissimilar_groups(self):
+        self.add_group('a', traceback())
+        unrelated = self.signature('Traceback:\n  File "/app/net/http.py", in send\nupstream timed out after retries')
+        self.assertIsNone(clustering.find_similar(self.project.id, '/api/checkout', 'KeyError', unrelated))
+
+    def test_reindexing_replaces_bands(self):
+        group = self.add_group('a', traceback())
+        clustering.index_group(group, self.signature(traceback(path='/app/other.py')))
+        self.assertEqual(ErrorSignatureBand.objects.filter(group=group).count(), clustering.BANDS)
+
+
+class ProcessErrorLogTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        self.payload = {
+            'error_type': 'KeyError', 'error_message': "'user_id'", 'traceback': traceback(),
+            'url': '/api/checkout', 'method': 'POST',
+        }
+
+    def test_redelivered_event_is_recorded_once(self):
+        event_id = '6f1c1f0e-5a8e-4d1b-9b44-2f0a3c1d7e90'
+        process_error_log(self.project.id, dict(self.payload), event_id)
+        process_error_log(self.project.id, dict(self.payload), event_id)
+
+        group = GroupedError.objects.get(project=self.project)
+        self.assertEqual(group.count, 1)
+        self.assertEqual(ErrorLog.objects.filter(project=self.project).count(), 1)
+        self.assertEqual(
+            sorted(ErrorBucket.objects.filter(group=group).values_list('resolution', 'count')),
+            [(ErrorBucket.MINUTE, 1), (ErrorBucket.HOUR, 1)],
+        )
+
+    def test_distinct_events_are_counted(self):
+        process_error_log(self.project.id, dict(self.payload), '6f1c1f0e-5a8e-4d1b-9b44-2f0a3c1d7e90')
+        process_error_log(self.project.id, dict(self.payload), '0d2b7c4a-93e1-4f5e-8a77-1b6c2d3e4f50')
+        process_error_log(self.project.id, dict(self.payload))
+
+        self.assertEqual(GroupedError.objects.get(project=self.project).count, 3)
+
+    def test_group_route_comes_from_its_endpoint(self):
+        process_error_log(self.project.id, {**self.payload, 'url': '/api/checkout?step=2', 'method': 'post'})
+
+        group = GroupedError.objects.select_related('endpoint').get(project=self.project)
+        self.assertEqual((group.endpoint.method, group.endpoint.path), ('POST', '/api/checkout'))
+        self.assertEqual(ErrorLog.objects.get(group=group).url, '/api/checkout?step=2')
+        response = self.client.get('/api/pensieve/errors/', HTTP_X_API_KEY=str(self.project.api_key))
+        self.assertEqual(response.json()[0]['url'], '/api/checkout')
+
+
+class DetectDueWindowsTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        self.endpoint = Endpoint.objects.create(project=self.project, method="GET", path="/api/items")
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+
+    def add_window(self, index, p95, runs):
+        start = self.start + timedelta(minutes=5 * index)
+        AggregatedMetric.objects.create(
+            project=self.project, endpoint=self.endpoint, timestamp=start, request_count=100, p95_duration_ms=p95,
+        )
+        AggregationWindow.objects.create(start=start, watermark=start, runs=runs)
+        return start
+
+    def test_scores_windows_in_order_once_earlier_ones_finish(self):
+        first = self.add_window(0, 100, runs=0)
+        second = self.add_window(1, 120, runs=1)
+
+        # The newer window finished first; scoring it now would skip the older one.
+        self.assertEqual(anomaly.detect_due_windows(), {})
+        self.assertFalse(SeriesBaseline.objects.exists())
+
+        AggregationWindow.objects.filter(start=first).update(runs=1)
+        self.assertEqual(list(anomaly.detect_due_windows()), [first, second])
+
+        baseline = SeriesBaseline.objects.get(endpoint=self.endpoint)
+        self.assertEqual(baseline.windows, 2)
+        self.assertEqual(baseline.last_window, second)
+        self.assertFalse(AggregationWindow.objects.filter(scored=False).exists())
+        self.assertEqual(anomaly.detect_due_windows(), {})
+
+
+class InternalProjectTests(TestCase):
+
+    def setUp(self):
+        middleware._internal_project_id = None
+        self.addCleanup(setattr, middleware, '_internal_project_id', None)
+
+    def test_reuses_the_internal_project(self):
+        project_id = middleware.get_internal_project_id()
+        middleware._internal_project_id = None
+        self.assertEqual(middleware.get_internal_project_id(), project_id)
+        self.assertEqual(Project.objects.filter(owner__isnull=True).count(), 1)
+
+    def test_ownerless_names_are_unique(self):
+        Project.objects.create(name="pensieve-internal")
+        with self.assertRaises(IntegrityError):
+            Project.objects.create(name="pensieve-internal")
+
+
+@override_settings(REDIS_URL='redis://127.0.0.1:1/0', INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_FLUSH_SECONDS=60)
+class InstrumentationTests(SimpleTestCase):
+
+    def test_observations_never_flush_inline(self):
+        registry = instrumentation.Registry(prefix='test:metrics')
+        counter = instrumentation.Counter('test_total', "Test counter.", registry=registry)
+        with mock.patch.object(registry, 'flush', side_effect=AssertionError("flushed inline")):
+            counter.inc()
+            counter.inc(2)
+        self.assertEqual(registry._counters, {counter.field({}): 3})
+        self.assertTrue(registry._flusher.daemon)
+
+    def test_failed_flush_keeps_observations(self):
+        registry = instrumentation.Registry(prefix='test:metrics')
+        counter = instrumentation.Counter('test_total', "Test counter.", registry=registry)
+        counter.inc(5)
+        with self.assertLogs('telemetry.instrumentation', 'WARNING'):
+            registry.flush()
+        self.assertEqual(registry._counters, {counter.field({}): 5})
+
+    def test_render_without_redis(self):
+        registry = instrumentation.Registry(prefix='test:metrics')
+        with self.assertLogs('telemetry.instrumentation', 'WARNING'):
+            instrumentation.Counter('test_total', "Test counter.", registry=registry).inc()
+            with self.assertRaises(instrumentation.MetricsUnavailable):
+                registry.render()
+
+
+class MetricsViewTests(SimpleTestCase):
+
+    @override_settings(METRICS_AUTH_TOKEN='s3cret')
+    def test_requires_the_token(self):
+        with mock.patch.object(instrumentation.REGISTRY, 'render', return_value='up 1\n'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'up 1\n')
+
+    @override_settings(METRICS_AUTH_TOKEN='')
+    def test_unavailable_store_is_a_503(self):
+        with mock.patch.object(instrumentation.REGISTRY, 'render', side_effect=instrumentation.MetricsUnavailable):
+            self.assertEqual(self.client.get('/metrics').status_code, 503)
+
+
+class IngestBufferTests(SimpleTestCase):
+
+    def test_flush_swallows_database_errors(self):
+        ingest_buffer = buffer.IngestBuffer(max_events=10, max_age=1)
+        ingest_buffer.add_performance(1, {'method': 'GET', 'url': '/api/items', 'duration_ms': 12})
+        with mock.patch.object(buffer, 'resolve_endpoint_id', side_effect=DatabaseError), \
+                self.assertLogs('telemetry.buffer', 'ERROR'):
+            ingest_buffer.flush()
+        self.assertFalse(ingest_buffer.is_due())
+
+
+class IngestMetricsTests(SimpleTestCase):
+
+    def test_payload_type_label_is_a_fixed_set(self):
+        with mock.patch.object(instrumentation.INGEST_REQUESTS, 'inc') as inc, \
+                mock.patch.object(instrumentation.INGEST_DURATION, 'observe'):
+            for payload_type, label in (('error', 'error'), ('made-up', 'invalid'), ({'a': 1}, 'invalid'), (['x'], 'invalid')):
+                with self.subTest(payload_type=payload_type):
+                    response = self.client.post('/api/ingest/', {'type': payload_type}, content_type='application/json')
+                    self.assertEqual(response.status_code, 401)
+                    inc.assert_called_with(type=label, status=401)
+
+
+class LimitParameterTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        for path in ('/api/items', '/api/items/{id}', '/api/items/{id}/reviews'):
+            Endpoint.objects.create(project=self.project, method="GET", path=path)
+
+    def get(self, path, **params):
+        return self.client.get(path, params, HTTP_X_API_KEY=str(self.project.api_key))
+
+    def test_endpoint_search_clamps_limit(self):
+        for limit, expected in (('-1', 1), ('0', 1), ('2', 2), ('1000', 3), ('x', 3)):
+            response = self.get('/api/pensieve/metrics/endpoints/', q='items', limit=limit)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), expected)
+
+    def test_negative_limits_are_not_errors(self):
+        for path in ('/api/pensieve/metrics/error-rates/', '/api/pensieve/metrics/breakdown/'):
+            self.assertEqual(self.get(path, limit='-1').status_code, 200)
+        response = self.get(
+            '/api/pensieve/archive/performance/', limit='-5',
+            start='2026-01-01T00:00:00+00:00', end='2026-01-02T00:00:00+00:00',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 0, 'results': []})
+
+
+class EndpointMethodTests(TestCase):
+
+    def setUp(self):
+        endpoints._endpoint_ids.clear()
+        self.project = Project.objects.create(name="shop")
+
+    def get(self, path, **params):
+        return self.client.get(path, params, HTTP_X_API_KEY=str(self.project.api_key))
+
+    def test_methods_are_upper_cased_at_ingest(self):
+        endpoint_id = endpoints.resolve_endpoint_id(self.project.id, 'post', '/api/items')
+        self.assertEqual(Endpoint.objects.get(id=endpoint_id).method, 'POST')
+        endpoints._endpoint_ids.clear()
+        self.assertEqual(endpoints.resolve_endpoint_id(self.project.id, 'POST', '/api/items'), endpoint_id)
+        self.assertEqual(Endpoint.objects.get(id=endpoints.resolve_overall_endpoint_id(self.project.id)).method, '')
+
+    def test_ids_are_cached_once_committed(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            endpoints.resolve_overall_endpoint_id(self.project.id)
+            raise RuntimeError
+        self.assertEqual(endpoints._endpoint_ids, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            endpoint_id = endpoints.resolve_overall_endpoint_id(self.project.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(endpoints.resolve_overall_endpoint_id(self.project.id), endpoint_id)
+
+    def test_matching(self):
+        get = Endpoint.objects.create(project=self.project, method='GET', path='/api/items')
+        post = Endpoint.objects.create(project=self.project, method='POST', path='/api/items')
+        overall = Endpoint.objects.create(project=self.project, method='', path=Endpoint.OVERALL)
+
+        def ids(path, method=None):
+            return set(endpoints.matching(self.project.id, path, method).values_list('id', flat=True))
+
+        self.assertEqual(ids('/api/items'), {get.id, post.id})
+        self.assertEqual(ids('/api/items', 'get'), {get.id})
+        self.assertEqual(ids(None, 'GET'), {overall.id})
+        self.assertEqual(ids('/api/other'), set())
+
+    def test_apdex_of_a_route_covers_every_method_unless_one_is_given(self):
+        now = timezone.now()
+        for method, satisfied, frustrated in (('GET', 10, 0), ('POST', 0, 10)):
+            endpoint = Endpoint.objects.create(project=self.project, method=method, path='/api/items')
+            ThresholdCount.objects.create(
+                project=self.project, endpoint=endpoint, timestamp=now - timedelta(minutes=5),
+                threshold_ms=settings.APDEX_THRESHOLD_MS, satisfied_count=satisfied, frustrated_count=frustrated,
+            )
+
+        self.assertEqual(self.get('/api/pensieve/metrics/apdex/', url='/api/items').json()['apdex'], 0.5)
+        self.assertEqual(self.get('/api/pensieve/metrics/apdex/', url='/api/items', method='get').json()['apdex'], 1.0)
+        self.assertEqual(self.get('/api/pensieve/metrics/apdex/', url='/api/missing').status_code, 404)
+        self.assertEqual(self.get('/api/pensieve/metrics/heatmap/', url='/api/items', method='post').status_code, 200)
+
+    def test_slo_needs_a_method_when_the_route_has_several(self):
+        for method in ('GET', 'POST'):
+            Endpoint.objects.create(project=self.project, method=method, path='/api/items')
+        slo = {'name': "items", 'url': '/api/items', 'kind': 'availability', 'target': 0.99}
+
+        response = self.client.post('/api/pensieve/slos/', slo, content_type='application/json', HTTP_X_API_KEY=str(self.project.api_key))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('method', response.json())
+
+        response = self.client.post(
+            '/api/pensieve/slos/', {**slo, 'method': 'get'}, content_type='application/json', HTTP_X_API_KEY=str(self.project.api_key),
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['method'], 'GET')
+
+
+class TimeBreakdownTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        self.endpoint = Endpoint.objects.create(project=self.project, method="GET", path="/api/items")
+        self.now = timezone.now()
+
+    def summarize(self, duration_ms, **components):
+        samples = {'duration_ms': np.array(duration_ms, dtype=np.uint32)}
+        for name in breakdown.COMPONENTS:
+            values = components.get(name, [None] * len(duration_ms))
+            samples[name] = np.array([breakdown.MISSING if value is None else value for value in values], dtype=np.uint32)
+        return breakdown.summarize(self.project.id, self.endpoint.id, self.now, samples)
+
+    def test_counts_each_component_over_the_requests_that_reported_it(self):
+        row = self.summarize([100, 40], db_ms=[50, None], cache_ms=[None, 5])
+        self.assertEqual((row.sample_count, row.db_count, row.cache_count, row.external_count), (2, 1, 1, 0))
+        self.assertEqual((row.db_avg_ms, row.cache_avg_ms, row.external_avg_ms), (50.0, 5.0, None))
+        self.assertEqual(row.app_avg_ms, 42.5)
+
+    def test_no_breakdown_no_row(self):
+        self.assertIsNone(self.summarize([100, 40]))
+
+    def test_rollup_weights_averages_by_component_counts(self):
+        rows = [
+            self.summarize([80, 30], db_ms=[50, None], cache_ms=[None, 1]),
+            self.summarize([20] * 10, db_ms=[10] * 10),
+        ]
+        rows[1].timestamp = self.now - timedelta(minutes=5)
+        breakdown.save(rows)
+
+        combined = breakdown.combined(TimeBreakdown.objects.filter(endpoint=self.endpoint).aggregate(**breakdown.rollup()))
+        self.assertEqual(combined['db_ms']['avg'], 13.64)
+        self.assertEqual(combined['db_ms']['p95'], 50)
+        self.assertEqual(combined['cache_ms']['avg'], 1.0)
+        self.assertIsNone(combined['external_ms']['avg'])
+
+
+class OverviewTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        self.endpoint = Endpoint.objects.create(project=self.project, method="GET", path="/api/items")
+        self.now = timezone.now()
+
+    def add_group(self, group_hash, count, occurrences):
+        group = GroupedError.objects.create(
+            project=self.project, endpoint=self.endpoint, group_hash=group_hash, error_type='KeyError', count=count,
+        )
+        for hours_ago, occurred in occurrences:
+            error_rates.record_occurrence(group.id, self.now - timedelta(hours=hours_ago), occurred)
+        return group
+
+    def test_top_errors_are_ranked_by_occurrences_in_the_period(self):
+        # An old group, still seen today, with the highest all-time count.
+        self.add_group('old', 1000, [(72, 997), (1, 3)])
+        self.add_group('busy', 50, [(2, 30), (1, 20)])
+        self.add_group('quiet', 5, [(1, 5)])
+        self.add_group('stale', 500, [(48, 500)])
+
+        top_errors = overview.build(self.project, self.now)['top_errors']
+        self.assertEqual(
+            [(error['group_hash'], error['period_count']) for error in top_errors],
+            [('busy', 50), ('quiet', 5), ('old', 3)],
+        )
+        self.assertEqual(top_errors[0]['url'], '/api/items')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ApiKeyCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.project = Project.objects.create(name="shop", owner=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_resolves_and_caches_known_keys(self):
+        self.assertEqual(api_keys.resolve_project_id(str(self.project.api_key)), self.project.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(api_keys.resolve_project_id(str(self.project.api_key)), self.project.id)
+
+    def test_unknown_keys_are_not_cached(self):
+        api_key = '6f1c1f0e-5a8e-4d1b-9b44-2f0a3c1d7e90'
+        with self.assertRaises(Project.DoesNotExist):
+            api_keys.resolve_project_id(api_key)
+        self.assertIsNone(cache.get(api_keys.cache_key(api_key)))
+
+    def test_regenerated_key_replaces_the_old_one_at_once(self):
+        old_key = str(self.project.api_key)
+        self.assertEqual(self.client.get('/api/pensieve/metrics/error-rates/', HTTP_X_API_KEY=old_key).status_code, 200)
+
+        self.client.force_login(self.user)
+        response = self.client.post(f'/api/projects/{self.project.id}/regenerate_key/')
+        self.assertEqual(response.status_code, 200)
+        new_key = response.json()['project']['api_key']
+
+        self.assertEqual(self.client.get('/api/pensieve/metrics/error-rates/', HTTP_X_API_KEY=old_key).status_code, 403)
+        self.assertEqual(self.client.get('/api/pensieve/metrics/error-rates/', HTTP_X_API_KEY=new_key).status_code, 200)
+
+    def test_deleting_a_project_forgets_its_key(self):
+        api_key = str(self.project.api_key)
+        api_keys.resolve_project_id(api_key)
+        self.project.delete()
+        with self.assertRaises(Project.DoesNotExist):
+            api_keys.resolve_project_id(api_key)
+
+
+class NormalizeUrlTests(SimpleTestCase):
+
+    def test_replaces_ids_uuids_and_hex_segments(self):
+        self.assertEqual(normalize_url('/users/123/orders/456'), '/users/{id}/orders/{id}')
+        self.assertEqual(normalize_url('/carts/6f1c1f0e-5a8e-4d1b-9b44-2f0a3c1d7e90/items'), '/carts/{uuid}/items')
+        self.assertEqual(normalize_url('/commits/9fceb02d0ae598e95dc970b74767f19372d61af8'), '/commits/{hex}')
+        # Short or digit-free hex-looking words are kept.
+        self.assertEqual(normalize_url('/menu/cafe/deadbeef'), '/menu/cafe/deadbeef')
+
+    def test_drops_scheme_host_query_and_fragment(self):
+        self.assertEqual(normalize_url('https://shop.example.com/items/7?page=2#reviews'), '/items/{id}')
+        self.assertEqual(normalize_url('https://shop.example.com'), '/')
+        self.assertEqual(normalize_url(''), '')
+
+    def test_first_fully_matching_rule_wins(self):
+        rules = [
+            {'pattern': r'/files/.+', 'template': '/files/{path}'},
+            {'pattern': r'/files/\d+', 'template': '/files/{number}'},
+        ]
+        self.assertEqual(normalize_url('/files/2026/report.pdf', rules), '/files/{path}')
+        self.assertEqual(normalize_url('/files/7', rules), '/files/{path}')
+        # Rules must match the whole path; otherwise the automatic placeholders apply.
+        self.assertEqual(normalize_url('/archive/files/7', rules), '/archive/files/{id}')
+
+    def test_template_from_route(self):
+        self.assertEqual(template_from_route('api/pensieve/errors/<str:group_hash>/'), '/api/pensieve/errors/{group_hash}/')
+        self.assertEqual(template_from_route('^errors/(?P<group_hash>[^/.]+)/$'), '/errors/{group_hash}/')
+
+
+class BlockLayoutTests(TestCase):
+
+    def columns(self, durations, **components):
+        count = len(durations)
+        return {
+            'duration_ms': np.array(durations, dtype=np.uint32),
+            'status_code': np.full(count, 200, dtype=np.uint16),
+            **{name: np.array(components.get(name, [breakdown.MISSING] * count), dtype=np.uint32) for name in breakdown.COMPONENTS},
+        }
+
+    def test_round_trip(self):
+        columns = self.columns([5, 70000, 3], db_ms=[1, 2, breakdown.MISSING])
+        unpacked = storage.unpack_block(storage.pack_block(columns), 3)
+        for name in storage.SAMPLE_FIELDS:
+            np.testing.assert_array_equal(unpacked[name], columns[name])
+
+    def test_layout_1_reads_without_breakdown(self):
+        unpacked = storage.unpack_block(storage.pack_block(self.columns([5, 6]), version=1), 2, version=1)
+        np.testing.assert_array_equal(unpacked['duration_ms'], [5, 6])
+        for name in breakdown.COMPONENTS:
+            np.testing.assert_array_equal(unpacked[name], [breakdown.MISSING] * 2)
+
+    def test_late_samples_upgrade_a_layout_1_block(self):
+        project = Project.objects.create(name="shop")
+        endpoint = Endpoint.objects.create(project=project, method="GET", path="/api/items")
+        minute = timezone.now().replace(second=0, microsecond=0) - timedelta(minutes=10)
+        PerformanceBlock.objects.create(
+            endpoint=endpoint, minute=minute, version=1, count=2, data=storage.pack_block(self.columns([5, 6]), version=1),
+        )
+        sample = PerformanceSample.objects.create(endpoint=endpoint, status_code=200, duration_ms=7, db_ms=3)
+        PerformanceSample.objects.filter(id=sample.id).update(timestamp=minute + timedelta(seconds=20))
+
+        self.assertEqual(storage.compact_samples(timezone.now()), 1)
+
+        block = PerformanceBlock.objects.get(endpoint=endpoint)
+        self.assertEqual((block.version, block.count), (storage.BLOCK_VERSION, 3))
+        columns = storage.unpack_block(block.data, block.count, block.version)
+        np.testing.assert_array_equal(columns['duration_ms'], [5, 6, 7])
+        np.testing.assert_array_equal(columns['db_ms'], [breakdown.MISSING, breakdown.MISSING, 3])
+
+
+class EwmaTests(SimpleTestCase):
+
+    def test_update_baselines(self):
+        mean, variance = anomaly.update_baselines(np.array([1.0, 1.0]), np.zeros(2), np.zeros(2), np.array([False, True]))
+        np.testing.assert_allclose(mean, [anomaly.EWMA_ALPHA, anomaly.EWMA_ALPHA_REGRESSED])
+        np.testing.assert_allclose(variance, [
+            (1 - anomaly.EWMA_ALPHA) * anomaly.EWMA_ALPHA,
+            (1 - anomaly.EWMA_ALPHA_REGRESSED) * anomaly.EWMA_ALPHA_REGRESSED,
+        ])
+
+    def test_converges_to_a_steady_value(self):
+        mean, variance = np.zeros(1), np.zeros(1)
+        for _ in range(200):
+            mean, variance = anomaly.update_baselines(np.array([2.0]), mean, variance, np.array([False]))
+        np.testing.assert_allclose(mean, [2.0], rtol=1e-6)
+        np.testing.assert_allclose(variance, [0.0], atol=1e-6)
+
+    def score(self, p95_ms, count=anomaly.MIN_REQUESTS, windows=anomaly.WARMUP_WINDOWS, in_regression=False, baseline_ms=100, variance=0.0):
+        return anomaly.score_window(
+            np.log([float(p95_ms)]), np.array([count]), np.log([float(baseline_ms)]), np.array([variance]),
+            np.array([windows]), np.array([in_regression]),
+        )
+
+    def test_regression_starts_on_a_trusted_large_increase(self):
+        scores, started, ended = self.score(200)
+        self.assertAlmostEqual(scores[0], np.log(2) / anomaly.MIN_STDDEV)
+        self.assertTrue(started[0])
+        self.assertFalse(ended[0])
+
+    def test_untrusted_or_small_increases_do_not_start_regressions(self):
+        self.assertFalse(self.score(200, windows=anomaly.WARMUP_WINDOWS - 1)[1][0])
+        self.assertFalse(self.score(200, count=anomaly.MIN_REQUESTS - 1)[1][0])
+        # Over REGRESSION_SCORE deviations, but below MIN_RELATIVE_INCREASE.
+        scores, started, _ = self.score(123)
+        self.assertGreaterEqual(scores[0], anomaly.REGRESSION_SCORE)
+        self.assertFalse(started[0])
+
+    def test_regression_ends_on_recovery(self):
+        _, started, ended = self.score(100, in_regression=True)
+        self.assertFalse(started[0])
+        self.assertTrue(ended[0])
+        self.assertFalse(self.score(200, in_regression=True)[2][0])
+
+
+@override_settings(AGGREGATION_LATENESS_MINUTES=10, AGGREGATION_MAX_WINDOWS_PER_RUN=3)
+class AggregationScheduleTests(TestCase):
+
+    def setUp(self):
+        self.now = aggregation.window_start(timezone.now()) + timedelta(minutes=2)
+        self.latest_closed = aggregation.window_start(self.now) - aggregation.WINDOW
+
+    def add_window(self, windows_ago, watermark):
+        start = self.latest_closed - aggregation.WINDOW * windows_ago
+        AggregationWindow.objects.create(start=start, watermark=watermark, runs=1)
+        return start
+
+    def test_first_run_aggregates_the_latest_closed_window(self):
+        self.assertEqual(aggregation.due_windows(self.now), [self.latest_closed])
+
+    def test_catches_up_at_most_the_configured_windows(self):
+        newest = self.add_window(5, self.now)
+        self.assertEqual(
+            aggregation.due_windows(self.now),
+            [newest + aggregation.WINDOW * i for i in (1, 2, 3)],
+        )
+
+    def test_reopens_windows_within_the_lateness_allowance(self):
+        # Aggregated right as it closed, so data may still arrive for it.
+        late = self.add_window(1, self.latest_closed)
+        self.add_window(0, self.now + timedelta(hours=1))
+        self.assertEqual(aggregation.due_windows(self.now), [late])
+
+    def test_shard_of(self):
+        project_id = '6f1c1f0e-5a8e-4d1b-9b44-2f0a3c1d7e90'
+        shard = aggregation.shard_of(project_id, 4)
+        self.assertIn(shard, range(4))
+        self.assertEqual(aggregation.shard_of(uuid.UUID(project_id), 4), shard)
+        self.assertEqual(aggregation.shard_of(project_id, 1), 0)
+
+
+@override_settings(RETENTION_CHUNK_SIZE=2, RETENTION_MAX_ROWS_PER_SECOND=0, ARCHIVE_ENABLED=False)
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name="shop")
+        self.endpoint = Endpoint.objects.create(project=self.project, method="GET", path="/api/items")
+        self.now = timezone.now()
+        self.table = next(table for table in retention.TABLES if table.name == 'performance_logs')
+
+    def add_logs(self, days_ago, count, project=None):
+        project = project or self.project
+        endpoint, _ = Endpoint.objects.get_or_create(project=project, method="GET", path="/api/items")
+        logs = PerformanceLog.objects.bulk_create([
+            PerformanceLog(project=project, endpoint=endpoint, status_code=200, duration_ms=10) for _ in range(count)
+        ])
+        PerformanceLog.objects.filter(id__in=[log.id for log in logs]).update(timestamp=self.now - timedelta(days=days_ago))
+
+    def test_deletes_expired_rows_in_chunks(self):
+        self.add_logs(40, 5)
+        self.add_logs(1, 2)
+
+        deleted, complete = retention.prune_table(self.table, self.now, time.monotonic() + 60)
+        self.assertEqual((deleted, complete), (5, True))
+        self.assertEqual(PerformanceLog.objects.count(), 2)
+        checkpoint = RetentionCheckpoint.objects.get(table='performance_logs')
+        self.assertIsNone(checkpoint.position)
+        self.assertEqual(checkpoint.last_pass_deleted, 5)
+
+    def test_resumes_from_the_checkpoint_after_the_deadline(self):
+        self.add_logs(40, 5)
+
+        self.assertEqual(retention.prune_table(self.table, self.now, time.monotonic() - 1), (0, False))
+        self.assertEqual(PerformanceLog.objects.count(), 5)
+        self.assertEqual(retention.prune_table(self.table, self.now, time.monotonic() + 60), (5, True))
+
+    def test_dry_run_counts_without_deleting(self):
+        self.add_logs(40, 3)
+        self.assertEqual(retention.prune_table(self.table, self.now, time.monotonic() + 60, dry_run=True), (3, True))
+        self.assertEqual(PerformanceLog.objects.count(), 3)
+
+    def test_project_overrides(self):
+        keeps_longer = Project.objects.create(name="audit", retention_policies={'performance_logs': 60})
+        expires_sooner = Project.objects.create(name="noisy", retention_policies={'performance_logs': 2})
+        self.add_logs(40, 1)
+        self.add_logs(40, 1, keeps_longer)
+        self.add_logs(5, 1, expires_sooner)
+
+        self.assertEqual(retention.prune_table(self.table, self.now, time.monotonic() + 60), (2, True))
+        self.assertEqual(list(PerformanceLog.objects.values_list('project', flat=True)), [keeps_longer.id])
+
+
+class ArchiveSegmentTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'errors' / 'segment.seg'
+
+    def test_round_trip(self):
+        base = archive.to_micros(timezone.now())
+        columns = {
+            'timestamp': [base, base + 5, base + 5_000_000],
+            'endpoint_id': [3, -1, 3],
+            'group_id': [7, 7, -1],
+            'url': ['/api/items/1', '/api/ünïcode', ''],
+            'method': ['GET', 'POST', 'GET'],
+            'error_type': ['KeyError', 'ValueError', 'KeyError'],
+            'error_message': ["'user_id'", '', 'x' * 10_000],
+            'traceback': ['', 'Traceback', ''],
+        }
+        header = {'kind': ArchiveSegment.ERRORS, 'rows': 3}
+        size = archive.write_segment(self.path, header, columns)
+        self.assertEqual(size, self.path.stat().st_size)
+        self.assertFalse(self.path.with_suffix('.tmp').exists())
+
+        with archive.Segment(self.path) as segment:
+            self.assertEqual(segment.rows, 3)
+            for name, values in columns.items():
+                column = segment.column(name)
+                self.assertEqual(column if isinstance(column, list) else column.tolist(), values)
+            self.assertEqual(segment.take('url', [2, 0]), ['', '/api/items/1'])
+
+    def test_micros_round_trip(self):
+        when = timezone.now()
+        self.assertEqual(archive.from_micros(archive.to_micros(when)), when)
+
+    def test_rejects_other_files(self):
+        self.path.parent.mkdir(parents=True)
+        self.path.write_bytes(b'not a segment file')
+        with self.assertRaises(ValueError):
+            archive.Segment(self.path)
+
+
+class StatusCodeTests(SimpleTestCase):
+
+    def test_counts_per_class(self):
+        counts = aggregation.summarize_status_codes(np.array([200, 204, 301, 404, 500, 503, 101], dtype=np.uint16))
+        self.assertEqual(counts, {
+            'status_2xx_count': 2, 'status_3xx_count': 1, 'status_4xx_count': 1, 'status_5xx_count': 2,
+        })
+
+    def test_empty(self):
+        self.assertEqual(set(aggregation.summarize_status_codes(np.array([], dtype=np.uint16)).values()), {0})
+
+
+@override_settings(APDEX_THRESHOLD_MS=500)
+class SloTests(SimpleTestCase):
+
+    def test_threshold_counts(self):
+        durations = np.array([2001, 100, 500, 400, 2000, 501])
+        rows = slo.threshold_counts(1, 2, timezone.now(), durations, {300})
+        self.assertEqual(
+            [(row.threshold_ms, row.satisfied_count, row.tolerating_count, row.frustrated_count) for row in rows],
+            [(300, 1, 3, 2), (500, 3, 2, 1)],
+        )
+
+    def test_apdex_threshold_is_counted_once(self):
+        rows = slo.threshold_counts(1, 2, timezone.now(), np.array([10]), {500})
+        self.assertEqual([row.threshold_ms for row in rows], [500])
+
+    def test_burn_rate(self):
+        self.assertAlmostEqual(slo.burn_rate(99, 100, 0.99), 1.0)
+        self.assertAlmostEqual(slo.burn_rate(8560, 10000, 0.99), 14.4)
+        self.assertEqual(slo.burn_rate(100, 100, 0.99), 0)
+        self.assertIsNone(slo.burn_rate(0, 0, 0.99))
+
+
+class HistogramTests(TestCase):
+
+    def test_encode(self):
+        counts = histograms.decode(histograms.encode(np.array([0, 1.4, 1.5, 2, 100, 100_000])))
+        self.assertEqual(len(counts), histograms.BUCKETS)
+        self.assertEqual(counts.sum(), 6)
+        # Upper edges are exclusive: 2 ms falls in the bucket that starts at 2 ms.
+        self.assertEqual(counts[:3].tolist(), [2, 1, 1])
+        self.assertEqual(counts[np.searchsorted(histograms.EDGES_MS, 100, side='right')], 1)
+        self.assertEqual(counts[-1], 1)
+        self.assertEqual(histograms.decode(b'').tolist(), [0] * histograms.BUCKETS)
+
+    def test_percentile(self):
+        counts = np.zeros(histograms.BUCKETS, dtype=np.int64)
+        counts[4], counts[10] = 90, 10
+        self.assertEqual(histograms.percentile(counts, 50), histograms.EDGES_MS[4])
+        self.assertEqual(histograms.percentile(counts, 95), histograms.EDGES_MS[10])
+        self.assertIsNone(histograms.percentile(np.zeros(histograms.BUCKETS), 95))
+        counts[-1] = 1000
+        self.assertIsNone(histograms.percentile(counts, 95))
+
+    def test_heatmap(self):
+        project = Project.objects.create(name="shop")
+        series = [
+            Endpoint.objects.create(project=project, method=method, path="/api/items") for method in ('GET', 'POST')
+        ]
+        since = aggregation.window_start(timezone.now()) - timedelta(hours=2)
+        for endpoint, offset, durations in (
+            (series[0], timedelta(0), [1, 1, 100]),
+            (series[1], timedelta(minutes=5), [1]),
+            (series[0], timedelta(hours=1, minutes=30), [100]),
+            (series[0], timedelta(hours=3), [100]),  # after `until`
+        ):
+            AggregatedMetric.objects.create(
+                project=project, endpoint=endpoint, timestamp=since + offset,
+                request_count=len(durations), histogram=histograms.encode(np.array(durations)),
+            )
+
+        matrix = histograms.heatmap([endpoint.id for endpoint in series], since, since + timedelta(hours=2), timedelta(hours=1))
+        self.assertEqual(matrix.shape, (2, histograms.BUCKETS))
+        bucket_100 = np.searchsorted(histograms.EDGES_MS, 100, side='right')
+        self.assertEqual((matrix[0][0], matrix[0][bucket_100], matrix[1][bucket_100]), (3, 1, 1))
+        self.assertEqual(matrix.sum(), 5)
+        self.assertEqual(histograms.heatmap([series[1].id], since, since + timedelta(hours=2), timedelta(hours=1)).sum(), 1)
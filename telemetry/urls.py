@@ -2,16 +2,27 @@
 
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from .views import AggregatedMetricViewSet, GroupedErrorViewSet, IngestView, PerformanceLogViewSet, TopEndpointsView
+from .views import AggregatedMetricViewSet, ApdexView, ArchiveQueryView, EndpointSearchView, ErrorRateLeaderboardView, ErrorRateSeriesView, LatencyHeatmapView, GroupedErrorViewSet, IngestView, PerformanceLogViewSet, ProjectOverviewView, RegressionEventViewSet, ServiceLevelObjectiveViewSet, TimeBreakdownSeriesView, TimeBreakdownView, TopEndpointsView
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
 router.register(r'errors', GroupedErrorViewSet, basename='grouped-error')
 router.register(r'metrics', AggregatedMetricViewSet, basename='aggregated-metric')
 router.register(r'performance-logs', PerformanceLogViewSet, basename='performance-log')
+router.register(r'regressions', RegressionEventViewSet, basename='regression-event')
+router.register(r'slos', ServiceLevelObjectiveViewSet, basename='slo')
 urlpatterns = [
     path('ingest/', IngestView.as_view(), name='ingest'),
     path('pensieve/metrics/top-endpoints/', TopEndpointsView.as_view(), name='top-endpoints'),
+    path('pensieve/metrics/endpoints/', EndpointSearchView.as_view(), name='endpoint-search'),
+    path('pensieve/metrics/error-rates/', ErrorRateLeaderboardView.as_view(), name='error-rate-leaderboard'),
+    path('pensieve/metrics/error-rates/series/', ErrorRateSeriesView.as_view(), name='error-rate-series'),
+    path('pensieve/metrics/breakdown/', TimeBreakdownView.as_view(), name='time-breakdown'),
+    path('pensieve/metrics/breakdown/series/', TimeBreakdownSeriesView.as_view(), name='time-breakdown-series'),
+    path('pensieve/metrics/apdex/', ApdexView.as_view(), name='apdex'),
+    path('pensieve/metrics/heatmap/', LatencyHeatmapView.as_view(), name='latency-heatmap'),
+    path('pensieve/overview/', ProjectOverviewView.as_view(), name='project-overview'),
+    path('pensieve/archive/<str:kind>/', ArchiveQueryView.as_view(), name='archive-query'),
 
     path('pensieve/', include(router.urls)),
 ]
\ No newline at end of file
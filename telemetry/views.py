@@ -1,27 +1,62 @@
 # telemetry/views.py
 
+import hmac
+import time
+import uuid
+from datetime import timedelta
+
 from rest_framework.views import APIView
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
-from django.db.models import Max
+from django.db.models import F, FloatField, Max, Sum
+from django.db.models.functions import Cast, Trunc
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
 
-from .models import AggregatedMetric, GroupedError, PerformanceLog, Project
-from .serializers import AggregatedMetricSerializer, GroupedErrorDetailSerializer, GroupedErrorSerializer, PerformanceLogInstanceSerializer, PerformanceLogSerializer, ErrorLogSerializer
+from django.conf import settings
+
+from .api_keys import resolve_project_id
+from .endpoints import matching
+from .models import AggregatedMetric, ArchiveSegment, Endpoint, ErrorBucket, GroupedError, PerformanceBlock, PerformanceLog, PerformanceSample, Project, RegressionEvent, ServiceLevelObjective, TimeBreakdown
+from .storage import STORAGE_COMPACT, latest_samples
+from . import aggregation, archive, breakdown, error_rates, fulltext, histograms, instrumentation, overview, slo
+from .serializers import AggregatedMetricSerializer, GroupedErrorDetailSerializer, GroupedErrorSerializer, PerformanceLogInstanceSerializer, PerformanceLogSerializer, ErrorLogSerializer, RegressionEventSerializer, ServiceLevelObjectiveSerializer
 from .tasks import process_performance_log, process_error_log
 
 
 class AggregatedMetricFilter(filters.FilterSet):
     """Applies a contains lookup when filtering metrics by URL."""
 
-    url = filters.CharFilter(field_name='url', lookup_expr='icontains')
+    url = filters.CharFilter(field_name='endpoint__path', lookup_expr='icontains')
+    url_prefix = filters.CharFilter(field_name='endpoint__path', lookup_expr='istartswith')
+    method = filters.CharFilter(field_name='endpoint__method', lookup_expr='iexact')
 
     class Meta:
         model = AggregatedMetric
-        fields = ['url']
+        fields = ['url', 'url_prefix', 'method']
+
+class PerformanceLogFilter(filters.FilterSet):
+    """Filters raw performance data by exact URL in either storage layout."""
+
+    url = filters.CharFilter(field_name='endpoint__path')
+
+
+class RegressionEventFilter(filters.FilterSet):
+    """Filters regression events by kind, URL and time."""
+
+    url = filters.CharFilter(field_name='endpoint__path', lookup_expr='icontains')
+    since = filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+
+    class Meta:
+        model = RegressionEvent
+        fields = ['kind', 'url', 'since']
+
 
 class IngestView(APIView):
     """
@@ -30,13 +65,31 @@ class IngestView(APIView):
     """
     permission_classes = [AllowAny]
 
+    def initial(self, request, *args, **kwargs):
+        self.started_at = time.perf_counter()
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        started_at = getattr(self, 'started_at', None)
+        if started_at is not None:
+            instrumentation.INGEST_DURATION.observe(time.perf_counter() - started_at)
+            instrumentation.INGEST_REQUESTS.inc(type=self.metric_type(request), status=response.status_code)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    @staticmethod
+    def metric_type(request):
+        # The type comes from the client, so the label is limited to a fixed set
+        # (and never has to hash whatever was sent).
+        payload_type = request.data.get("type") if isinstance(request.data, dict) else None
+        return payload_type if payload_type in ("performance", "error") else 'invalid'
+
     def post(self, request, *args, **kwargs):
         api_key = request.headers.get("X-API-KEY")
         if not api_key:
             return Response({"error": "API key missing"}, status=status.HTTP_401_UNAUTHORIZED)
 
         try:
-            project = Project.objects.only('id').get(api_key=api_key)
+            project_id = resolve_project_id(api_key)
         except Project.DoesNotExist:
             return Response({"error": "Invalid API key"}, status=status.HTTP_403_FORBIDDEN)
 
@@ -46,17 +99,22 @@ class IngestView(APIView):
 
         if payload_type == "performance":
             serializer = PerformanceLogSerializer(data=payload)
-            if serializer.is_valid():
+            with instrumentation.INGEST_SERIALIZER_DURATION.time(type=payload_type):
+                is_valid = serializer.is_valid()
+            if is_valid:
                 # Use Celery task to process performance log asynchronously
-                process_performance_log.delay(project.id, serializer.validated_data)
+                process_performance_log.delay(project_id, serializer.validated_data)
                 return Response(status=status.HTTP_202_ACCEPTED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         elif payload_type == "error":
             serializer = ErrorLogSerializer(data=payload)
-            if serializer.is_valid():
-                # Use Celery task to process error log asynchronously
-                process_error_log.delay(project.id, serializer.validated_data)
+            with instrumentation.INGEST_SERIALIZER_DURATION.time(type=payload_type):
+                is_valid = serializer.is_valid()
+            if is_valid:
+                # Use Celery task to process error log asynchronously; the event id
+                # lets the task recognize a redelivery of the same error
+                process_error_log.delay(project_id, serializer.validated_data, str(uuid.uuid4()))
                 return Response(status=status.HTTP_202_ACCEPTED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -80,7 +138,7 @@ class GroupedErrorViewSet(viewsets.ReadOnlyModelViewSet):
             return GroupedError.objects.none() # Return empty if no key
 
         # Filter the queryset to only show errors for this project
-        return GroupedError.objects.filter(project__api_key=api_key)
+        return GroupedError.objects.filter(project__api_key=api_key).select_related('endpoint')
 
     def get_serializer_class(self):
         # Use a different serializer for the detail view
@@ -88,6 +146,122 @@ class GroupedErrorViewSet(viewsets.ReadOnlyModelViewSet):
             return GroupedErrorDetailSerializer
         return GroupedErrorSerializer
 
+    SPARKLINE_DEFAULT_POINTS = 60
+    SPARKLINE_MAX_POINTS = 1440
+
+    @action(detail=True)
+    def sparkline(self, request, group_hash=None):
+        """
+        Returns the group's occurrence counts per minute (default) or per hour,
+        oldest first, ending with the current bucket.
+        ?resolution=minute|hour&points=<n>
+        """
+        grouped_error = self.get_object()
+
+        resolution = error_rates.RESOLUTIONS.get(request.query_params.get('resolution', 'minute'))
+        if resolution is None:
+            return Response({"error": "resolution must be 'minute' or 'hour'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            points = int(request.query_params.get('points', self.SPARKLINE_DEFAULT_POINTS))
+        except ValueError:
+            points = self.SPARKLINE_DEFAULT_POINTS
+        points = max(1, min(points, self.SPARKLINE_MAX_POINTS))
+
+        start, counts = error_rates.series([grouped_error.id], resolution, points, timezone.now())
+        return Response({
+            'start': start,
+            'resolution': resolution,
+            'counts': counts[grouped_error.id].tolist(),
+        })
+
+    @action(detail=False)
+    def trending(self, request):
+        """
+        Ranks the project's errors by how unusual their last few minutes are
+        compared with the previous day, each with a per-minute sparkline.
+        """
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=status.HTTP_403_FORBIDDEN)
+
+        now = timezone.now()
+        ranking = error_rates.trending(project_id, now)
+        groups = GroupedError.objects.select_related('endpoint').in_bulk([item['group_id'] for item in ranking])
+        start, counts = error_rates.series(groups, ErrorBucket.MINUTE, error_rates.TRENDING_WINDOW_MINUTES, now)
+
+        return Response([
+            {
+                **GroupedErrorSerializer(groups[item['group_id']]).data,
+                'recent_count': item['recent_count'],
+                'expected_count': item['expected_count'],
+                'score': item['score'],
+                'sparkline': counts[item['group_id']].tolist(),
+            }
+            for item in ranking
+        ])
+
+    SEARCH_DEFAULT_LIMIT = 25
+    SEARCH_MAX_LIMIT = 100
+
+    @action(detail=False)
+    def search(self, request):
+        """
+        Full-text search over the project's errors (type, messages and
+        traceback), best matches first or, with ?sort=recent, most recently
+        seen first. Matched words are marked with «» in the highlights.
+        ?q=<websearch query>&sort=rank|recent&limit=<n>&cursor=<next from the previous page>
+        """
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=status.HTTP_403_FORBIDDEN)
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        sort = request.query_params.get('sort', fulltext.SORT_RANK)
+        if sort not in (fulltext.SORT_RANK, fulltext.SORT_RECENT):
+            return Response({"error": "sort must be 'rank' or 'recent'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', self.SEARCH_DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.SEARCH_DEFAULT_LIMIT
+        limit = max(1, min(limit, self.SEARCH_MAX_LIMIT))
+
+        try:
+            groups, next_cursor = fulltext.search(
+                project_id, query, sort=sort, cursor=request.query_params.get('cursor'), limit=limit,
+            )
+        except fulltext.InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': [
+                {
+                    **GroupedErrorSerializer(group).data,
+                    'rank': round(group.rank, 6),
+                    'highlights': {
+                        'error_message': group.headline_message,
+                        'traceback': group.headline_traceback,
+                    },
+                }
+                for group in groups
+            ],
+            'next': next_cursor,
+        })
+
 
 class AggregatedMetricViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -113,7 +287,7 @@ class AggregatedMetricViewSet(viewsets.ReadOnlyModelViewSet):
         # Return metrics for this project, newest first
         return AggregatedMetric.objects.filter(
             project__api_key=api_key
-        ).order_by('-timestamp')
+        ).select_related('endpoint').order_by('-timestamp')
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -144,33 +318,402 @@ class TopEndpointsView(APIView):
             return Response({"error": "API key missing"}, status=401)
         
         try:
-            project_id = Project.objects.only('id').get(api_key=api_key).id
+            project_id = resolve_project_id(api_key)
         except Project.DoesNotExist:
             return Response({"error": "Invalid API key"}, status=403)
         
         # 2. Perform the aggregation query in the database
-        # This groups all metrics by 'url', finds the max 'p95_duration_ms' for each,
+        # This groups all metrics by endpoint id, finds the max 'p95_duration_ms' for each,
         # orders them, and takes the top 5.
-        top_slow_endpoints = (
+        top_slow_endpoints = list(
             AggregatedMetric.objects
             .filter(project_id=project_id)
-            .values('url') # Group by URL
+            .values('endpoint_id') # Group by endpoint
             .annotate(max_p95=Max('p95_duration_ms')) # Find the max p95 for each group
             .order_by('-max_p95') # Order by the highest p95 first
             [:5] # Take the top 5
         )
-        
-        return Response(top_slow_endpoints)
+
+        # 3. Resolve the handful of endpoint ids back to their routes
+        endpoints = Endpoint.objects.in_bulk([item['endpoint_id'] for item in top_slow_endpoints])
+        return Response([
+            {
+                'url': endpoints[item['endpoint_id']].path,
+                'method': endpoints[item['endpoint_id']].method,
+                'max_p95': item['max_p95'],
+            }
+            for item in top_slow_endpoints
+        ])
+
+
+class ProjectOverviewView(APIView):
+    """
+    A read-only API endpoint that returns everything the dashboard's project
+    overview shows in one response: headline stats, the recent `__overall__`
+    series, the slowest endpoints and the most frequent errors of the last
+    24 hours. Cached per project data version (see telemetry/overview.py).
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project = Project.objects.only('id', 'name', 'data_version').get(api_key=api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        return Response(overview.get(project, timezone.now()))
+
+
+class ErrorRateLeaderboardView(APIView):
+    """
+    A read-only API endpoint that ranks the project's endpoints by the share
+    of their requests that ended in a 5xx (or 4xx) status, computed from the
+    aggregated windows only.
+    ?since=<iso>&status=5xx|4xx&min_requests=<n>&limit=<n>
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_PERIOD = timedelta(hours=24)
+    DEFAULT_MIN_REQUESTS = 20
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+    STATUS_FIELDS = {'5xx': 'status_5xx_count', '4xx': 'status_4xx_count'}
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        field = self.STATUS_FIELDS.get(request.query_params.get('status', '5xx'))
+        if field is None:
+            return Response({"error": "status must be '5xx' or '4xx'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = parse_datetime(request.query_params.get('since', ''))
+        if since is None:
+            since = timezone.now() - self.DEFAULT_PERIOD
+
+        try:
+            min_requests = max(int(request.query_params.get('min_requests', self.DEFAULT_MIN_REQUESTS)), 1)
+        except ValueError:
+            min_requests = self.DEFAULT_MIN_REQUESTS
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        leaders = list(
+            AggregatedMetric.objects
+            .filter(project_id=project_id, timestamp__gte=since)
+            .exclude(endpoint__path=Endpoint.OVERALL)
+            .values('endpoint_id')
+            .annotate(requests=Sum('request_count'), errors=Sum(field))
+            .filter(requests__gte=min_requests, errors__gt=0)
+            .annotate(error_rate=Cast('errors', FloatField()) / F('requests'))
+            .order_by('-error_rate', '-errors')
+            [:limit]
+        )
+
+        endpoints = Endpoint.objects.in_bulk([item['endpoint_id'] for item in leaders])
+        return Response([
+            {
+                'url': endpoints[item['endpoint_id']].path,
+                'method': endpoints[item['endpoint_id']].method,
+                'request_count': item['requests'],
+                'error_count': item['errors'],
+                'error_rate': round(item['error_rate'], 4),
+            }
+            for item in leaders
+        ])
+
+
+class ErrorRateSeriesView(APIView):
+    """
+    A read-only API endpoint that returns the requests per status class and
+    the 5xx rate over time for one endpoint, or the whole project when no URL
+    is given, computed from the aggregated windows only.
+    ?url=<route>&method=<method>&since=<iso>&until=<iso>&interval=window|hour|day
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_PERIOD = timedelta(hours=24)
+    INTERVALS = ('window', 'hour', 'day')
+    COUNT_FIELDS = ['request_count'] + [f'status_{status_class}xx_count' for status_class in aggregation.STATUS_CLASSES]
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        interval = request.query_params.get('interval', 'window')
+        if interval not in self.INTERVALS:
+            return Response({"error": "interval must be 'window', 'hour' or 'day'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        until = parse_datetime(request.query_params.get('until', '')) or timezone.now()
+        since = parse_datetime(request.query_params.get('since', '')) or until - self.DEFAULT_PERIOD
+
+        endpoints = matching(project_id, request.query_params.get('url'), request.query_params.get('method'))
+
+        metrics = AggregatedMetric.objects.filter(
+            project_id=project_id, endpoint__in=endpoints, timestamp__gte=since, timestamp__lt=until,
+        )
+        if interval == 'window':
+            metrics = metrics.annotate(bucket=F('timestamp'))
+        else:
+            metrics = metrics.annotate(bucket=Trunc('timestamp', interval))
+        rows = (
+            metrics
+            .values('bucket')
+            .annotate(**{name: Sum(name) for name in self.COUNT_FIELDS})
+            .order_by('bucket')
+        )
+
+        return Response([
+            {
+                'timestamp': row['bucket'],
+                **{name: row[name] for name in self.COUNT_FIELDS},
+                'error_rate': round(row['status_5xx_count'] / row['request_count'], 4) if row['request_count'] else 0,
+            }
+            for row in rows
+        ])
+
+
+class TimeBreakdownView(APIView):
+    """
+    A read-only API endpoint that ranks the project's endpoints by where their
+    time goes, from the aggregated time breakdowns: average and p95 DB time,
+    query count, cache time, external-call time and application time. Sort by
+    db_queries to find N+1 queries, by external_ms for slow dependencies.
+    ?since=<iso>&sort=db_ms|db_queries|cache_ms|external_ms|app_ms&limit=<n>
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_PERIOD = timedelta(hours=24)
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        sort = request.query_params.get('sort', 'db_ms')
+        if sort not in breakdown.FIELDS:
+            return Response({"error": f"sort must be one of {', '.join(breakdown.FIELDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = parse_datetime(request.query_params.get('since', ''))
+        if since is None:
+            since = timezone.now() - self.DEFAULT_PERIOD
+
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        leaders = list(
+            TimeBreakdown.objects
+            .filter(project_id=project_id, timestamp__gte=since)
+            .exclude(endpoint__path=Endpoint.OVERALL)
+            .values('endpoint_id')
+            .annotate(**breakdown.rollup())
+            .filter(**{f'{sort}_samples__gt': 0})
+            .annotate(sort_value=F(f'{sort}_weighted') / F(f'{sort}_samples'))
+            .order_by('-sort_value', 'endpoint_id')
+            [:limit]
+        )
+
+        endpoints = Endpoint.objects.in_bulk([item['endpoint_id'] for item in leaders])
+        return Response([
+            {
+                'url': endpoints[item['endpoint_id']].path,
+                'method': endpoints[item['endpoint_id']].method,
+                'sample_count': item['requests'],
+                **breakdown.combined(item),
+            }
+            for item in leaders
+        ])
+
+
+class TimeBreakdownSeriesView(APIView):
+    """
+    A read-only API endpoint that returns the time breakdown over time for one
+    endpoint, or the whole project when no URL is given. Averages over an
+    hour or a day are weighted by requests; p95 values are the highest window
+    p95 in the interval.
+    ?url=<route>&method=<method>&since=<iso>&until=<iso>&interval=window|hour|day
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_PERIOD = timedelta(hours=24)
+    INTERVALS = ('window', 'hour', 'day')
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        interval = request.query_params.get('interval', 'window')
+        if interval not in self.INTERVALS:
+            return Response({"error": "interval must be 'window', 'hour' or 'day'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        until = parse_datetime(request.query_params.get('until', '')) or timezone.now()
+        since = parse_datetime(request.query_params.get('since', '')) or until - self.DEFAULT_PERIOD
+
+        endpoints = matching(project_id, request.query_params.get('url'), request.query_params.get('method'))
+
+        rows = TimeBreakdown.objects.filter(
+            project_id=project_id, endpoint__in=endpoints, timestamp__gte=since, timestamp__lt=until,
+        )
+        if interval == 'window':
+            rows = rows.annotate(bucket=F('timestamp'))
+        else:
+            rows = rows.annotate(bucket=Trunc('timestamp', interval))
+        rows = rows.values('bucket').annotate(**breakdown.rollup()).order_by('bucket')
+
+        return Response([
+            {'timestamp': row['bucket'], 'sample_count': row['requests'], **breakdown.combined(row)}
+            for row in rows
+        ])
+
+
+class LatencyHeatmapView(APIView):
+    """
+    A read-only API endpoint that returns a latency heatmap for one endpoint,
+    or the whole project when no URL is given: a dense matrix of request
+    counts with one row per time step and one column per duration bucket,
+    summed from the aggregated windows' histograms.
+    ?url=<route>&method=<method>&since=<iso>&until=<iso>&interval=window|hour|day
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_PERIOD = timedelta(hours=24)
+    INTERVALS = {'window': aggregation.WINDOW, 'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+    MAX_ROWS = int(timedelta(days=7) / aggregation.WINDOW) + 1  # A week of windows, unaligned
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        step = self.INTERVALS.get(request.query_params.get('interval', 'window'))
+        if step is None:
+            return Response({"error": "interval must be 'window', 'hour' or 'day'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        until = parse_datetime(request.query_params.get('until', '')) or timezone.now()
+        since = parse_datetime(request.query_params.get('since', '')) or until - self.DEFAULT_PERIOD
+        # Align the rows to the step, e.g. whole hours
+        since = error_rates.floor_to(since, int(step.total_seconds()))
+        if since >= until:
+            return Response({"error": "since must be before until"}, status=status.HTTP_400_BAD_REQUEST)
+        if (until - since) / step > self.MAX_ROWS:
+            return Response({"error": f"At most {self.MAX_ROWS} rows; use a longer interval"}, status=status.HTTP_400_BAD_REQUEST)
+
+        endpoint_ids = list(
+            matching(project_id, request.query_params.get('url'), request.query_params.get('method'))
+            .values_list('id', flat=True)
+        )
+        if not endpoint_ids:
+            return Response({"error": "No such endpoint in this project"}, status=status.HTTP_404_NOT_FOUND)
+
+        matrix = histograms.heatmap(endpoint_ids, since, until, step)
+        return Response({
+            'since': since,
+            'interval_seconds': int(step.total_seconds()),
+            'timestamps': [since + step * row for row in range(len(matrix))],
+            'bucket_bounds_ms': histograms.bucket_bounds(),
+            'counts': matrix.tolist(),
+        })
+
+
+class EndpointSearchView(APIView):
+    """
+    A read-only typeahead API endpoint that returns the project's endpoints
+    matching a search term. Prefix matches are listed before substring matches,
+    and both lookups are served by the trigram index on Endpoint.path.
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    MIN_QUERY_LENGTH = 3
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        query = request.query_params.get('q', '').strip()
+        if len(query) < self.MIN_QUERY_LENGTH:
+            return Response([])
+
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        endpoints = (
+            Endpoint.objects
+            .filter(project_id=project_id)
+            .exclude(path=Endpoint.OVERALL)
+            .order_by('path', 'method')
+        )
+
+        # Prefix matches first, then fill the remaining slots with substring matches.
+        matches = list(endpoints.filter(path__istartswith=query)[:limit])
+        if len(matches) < limit:
+            seen = [match.id for match in matches]
+            matches += list(
+                endpoints.filter(path__icontains=query).exclude(id__in=seen)[:limit - len(matches)]
+            )
+
+        return Response([{'url': match.path, 'method': match.method} for match in matches])
 
 
 class PerformanceLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     A read-only API endpoint to list raw performance logs,
-    filterable by URL.
+    filterable by URL. With compact storage the list also covers samples
+    already packed into blocks.
     """
     serializer_class = PerformanceLogInstanceSerializer
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['url']
+    filterset_class = PerformanceLogFilter
     
     RESULT_LIMIT = 100
 
@@ -180,10 +723,56 @@ class PerformanceLogViewSet(viewsets.ReadOnlyModelViewSet):
             return PerformanceLog.objects.none()
         
         # Return logs for this project, newest first
+        if settings.PERFORMANCE_STORAGE == STORAGE_COMPACT:
+            return PerformanceSample.objects.filter(
+                endpoint__project__api_key=api_key
+            ).order_by('-timestamp')
+
         return PerformanceLog.objects.filter(
             project__api_key=api_key
         ).order_by('-timestamp')
     
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if settings.PERFORMANCE_STORAGE == STORAGE_COMPACT:
+            # Samples older than a few minutes may already be packed into blocks.
+            api_key = self.request.headers.get("X-API-KEY")
+            blocks = self.filter_queryset(PerformanceBlock.objects.filter(endpoint__project__api_key=api_key))
+            queryset = latest_samples(queryset, blocks, self.RESULT_LIMIT)
+        elif self.RESULT_LIMIT:
+            queryset = queryset[:self.RESULT_LIMIT]
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class RegressionEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    A read-only API endpoint to list detected latency regressions and
+    recoveries for the authenticated project, newest first.
+    """
+    serializer_class = RegressionEventSerializer
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = RegressionEventFilter
+
+    RESULT_LIMIT = 100
+
+    def get_queryset(self):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return RegressionEvent.objects.none()
+
+        return RegressionEvent.objects.filter(
+            project__api_key=api_key
+        ).select_related('endpoint').order_by('-timestamp')
+
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
@@ -196,4 +785,187 @@ class PerformanceLogViewSet(viewsets.ReadOnlyModelViewSet):
             return self.get_paginated_response(serializer.data)
 
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+class ServiceLevelObjectiveViewSet(viewsets.ModelViewSet):
+    """
+    API endpoints to define the authenticated project's latency and
+    availability SLOs, and to evaluate them from the per-window counters.
+    """
+    serializer_class = ServiceLevelObjectiveSerializer
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    def get_queryset(self):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return ServiceLevelObjective.objects.none()
+
+        return ServiceLevelObjective.objects.filter(project__api_key=api_key).select_related('endpoint')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['project'] = getattr(self, 'project', None)
+        return context
+
+    def create(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            self.project = Project.objects.get(api_key=api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=status.HTTP_403_FORBIDDEN)
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(project=self.project)
+
+    def get_object(self):
+        objective = super().get_object()
+        self.project = objective.project
+        return objective
+
+    @action(detail=True, url_path='status')
+    def evaluate(self, request, pk=None):
+        """
+        Returns the objective's compliance and remaining error budget over the
+        compliance period (default the last 30 days), its burn rates over the
+        last 1h, 6h and 3d, and for latency objectives the Apdex score.
+        ?since=<iso>&until=<iso>
+        """
+        objective = self.get_object()
+        until = parse_datetime(request.query_params.get('until', '')) or timezone.now()
+        since = parse_datetime(request.query_params.get('since', '')) or until - slo.DEFAULT_COMPLIANCE_PERIOD
+        if since >= until:
+            return Response({"error": "since must be before until"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            **self.get_serializer(objective).data,
+            **slo.evaluate(objective, since, until),
+        })
+
+
+class ApdexView(APIView):
+    """
+    A read-only API endpoint that returns the Apdex score at APDEX_THRESHOLD_MS
+    for one endpoint, or the whole project when no URL is given.
+    ?url=<route>&method=<method>&since=<iso>&until=<iso>
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_PERIOD = timedelta(hours=24)
+
+    def get(self, request, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        until = parse_datetime(request.query_params.get('until', '')) or timezone.now()
+        since = parse_datetime(request.query_params.get('since', '')) or until - self.DEFAULT_PERIOD
+
+        url = request.query_params.get('url')
+        endpoint_ids = list(matching(project_id, url, request.query_params.get('method')).values_list('id', flat=True))
+        if url and not endpoint_ids:
+            return Response({"error": "No such endpoint in this project"}, status=status.HTTP_404_NOT_FOUND)
+
+        score = slo.apdex(endpoint_ids, settings.APDEX_THRESHOLD_MS, since, until)
+        return Response({
+            'threshold_ms': settings.APDEX_THRESHOLD_MS,
+            'since': since,
+            'until': until,
+            'apdex': round(score, 4) if score is not None else None,
+        })
+
+
+class ArchiveQueryView(APIView):
+    """
+    A read-only API endpoint for historical raw data that has been moved to
+    cold storage. Reads the project's archived segments for a time range,
+    optionally for one endpoint URL, oldest first.
+    ?start=<iso>&end=<iso>&url=<route>&method=<method>&limit=<n>
+    """
+    permission_classes = [AllowAny]  # Uses X-API-KEY authentication
+
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+    MAX_RANGE = timedelta(days=31)
+
+    def get(self, request, kind, *args, **kwargs):
+        api_key = self.request.headers.get("X-API-KEY")
+        if not api_key:
+            return Response({"error": "API key missing"}, status=401)
+
+        try:
+            project_id = resolve_project_id(api_key)
+        except Project.DoesNotExist:
+            return Response({"error": "Invalid API key"}, status=403)
+
+        if kind not in archive.COLUMNS:
+            return Response({"error": f"Unknown archive {kind!r}"}, status=status.HTTP_404_NOT_FOUND)
+
+        start = parse_datetime(request.query_params.get('start', ''))
+        end = parse_datetime(request.query_params.get('end', ''))
+        if start is None or end is None or timezone.is_naive(start) or timezone.is_naive(end) or start >= end:
+            return Response({"error": "start and end must be ISO 8601 datetimes with a timezone, start before end"}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start > self.MAX_RANGE:
+            return Response({"error": f"The range may span at most {self.MAX_RANGE.days} days"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        endpoint_ids = None
+        url = request.query_params.get('url')
+        if url:
+            endpoint_ids = list(matching(project_id, url, request.query_params.get('method')).values_list('id', flat=True))
+
+        columns = archive.query(project_id, kind, start, end, endpoint_ids)
+        count = len(columns['timestamp'])
+        endpoints = Endpoint.objects.in_bulk(set(columns['endpoint_id'][:limit].tolist()))
+
+        results = []
+        for i in range(min(count, limit)):
+            row = {
+                name: values[i] if isinstance(values, list) else values[i].item()
+                for name, values in columns.items()
+                if name not in ('timestamp', 'endpoint_id')
+            }
+            row['timestamp'] = archive.from_micros(columns['timestamp'][i])
+            endpoint = endpoints.get(int(columns['endpoint_id'][i]))
+            if kind == ArchiveSegment.ERRORS:
+                row['group_id'] = None if row['group_id'] < 0 else row['group_id']
+            else:
+                row['url'] = endpoint.path if endpoint else None
+                row['method'] = endpoint.method if endpoint else None
+            results.append(row)
+
+        return Response({'count': count, 'results': results})
+
+
+def metrics_view(request):
+    """
+    Exposes Pensieve's own instrumentation in the Prometheus text format.
+    When METRICS_AUTH_TOKEN is set, scrapers must send it as a bearer token.
+    """
+    token = settings.METRICS_AUTH_TOKEN
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode(),
+    ):
+        return HttpResponse(status=401)
+
+    try:
+        body = instrumentation.REGISTRY.render()
+    except instrumentation.MetricsUnavailable:
+        # Redis is down; scrapers record the target as down instead of seeing a 500
+        return HttpResponse("Metrics store unavailable\n", status=503, content_type="text/plain")
+
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
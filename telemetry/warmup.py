@@ -0,0 +1,80 @@
+# telemetry/warmup.py
+
+"""
+Start-up work done once, before a server forks its workers.
+
+gunicorn (with preload_app, see gunicorn.conf.py) and the Celery worker call
+these in the parent process, so imports, the compiled URL patterns, DRF's
+settings, the models' field caches, templates and the endpoint id cache are
+built once and shared copy-on-write by every worker, instead of
+being paid for by each worker's first requests. Only state that outlives the
+call is worth building here: serializer fields, for example, are rebuilt for
+every serializer instance. Database connections opened here are closed again
+before the fork.
+"""
+
+import importlib
+import time
+
+from django.conf import settings
+from django.db import connections
+
+# Modules only the Celery tasks use; telemetry/tasks.py imports them lazily.
+TASK_MODULES = (
+    'telemetry.aggregation', 'telemetry.anomaly', 'telemetry.clustering', 'telemetry.error_rates',
+    'telemetry.fulltext', 'telemetry.retention', 'telemetry.storage',
+)
+TEMPLATES = ('home.html', 'accounts/login.html', 'accounts/signup.html', 'accounts/dashboard.html')
+
+
+def _warm_model_meta():
+    from django.apps import apps
+
+    for model in apps.get_models():
+        # Cached on the model's Options: its forward and reverse fields, and the
+        # relation tree every model's reverse relations are resolved from.
+        model._meta.get_fields()
+
+
+def warm_web():
+    """Prepares everything the web views need before the first request."""
+    from django.template import TemplateDoesNotExist
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    started = time.perf_counter()
+
+    # Imports every view and compiles the URL patterns.
+    get_resolver().reverse_dict
+
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES'):
+        getattr(api_settings, name)
+    _warm_model_meta()
+
+    for template_name in TEMPLATES:
+        try:
+            get_template(template_name)
+        except TemplateDoesNotExist:
+            pass
+
+    if settings.DOGFOOD_ENABLED:
+        from .middleware import get_internal_project_id
+
+        get_internal_project_id()
+
+    connections.close_all()
+    print(f"Warmed up the web application in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+
+def warm_worker():
+    """Loads the task modules and the endpoint id cache before the worker pool starts."""
+    from .endpoints import warm as warm_endpoints
+
+    started = time.perf_counter()
+    for module_name in TASK_MODULES:
+        importlib.import_module(module_name)
+    cached = warm_endpoints()
+
+    connections.close_all()
+    print(f"Warmed up the worker in {(time.perf_counter() - started) * 1000:.0f} ms ({cached} endpoint ids cached).")